@@ -0,0 +1,198 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import UpdateOne
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+import logging
+import os
+
+from versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+# Daily buckets older than this are dropped from activity_stats.daily
+ACTIVITY_DAILY_DAYS = int(os.environ.get("ACTIVITY_DAILY_DAYS", "30"))
+# A rebuild is retried when counters moved while it was counting
+ACTIVITY_RECOMPUTE_ATTEMPTS = 3
+
+def activity_scope(user_id: str) -> str:
+    """Version scope covering a user's activity counters"""
+    return f"activity:{user_id}"
+
+def day_key(when: Optional[datetime] = None) -> str:
+    """Return the daily bucket key (UTC date) for a timestamp"""
+    return (when or datetime.utcnow()).strftime("%Y-%m-%d")
+
+class ActivityUpdate:
+    """
+    Activity counter deltas collected over one request. apply() writes them
+    as one $inc per user, all in a single bulk_write, and bumps the version
+    of every affected scope once.
+    """
+
+    def __init__(self, when: Optional[datetime] = None):
+        self.when = when or datetime.utcnow()
+        self.deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # Further version scopes the request changed, bumped with the counters
+        self.scopes = set()
+
+    def add(self, user_id: Optional[str], counters: Dict[str, int] = None, daily: Dict[str, int] = None):
+        """Add increments of activity_stats counters (and the day's bucket)"""
+        if not user_id:
+            return
+        deltas = self.deltas[user_id]
+        for key, value in (counters or {}).items():
+            deltas[f"activity_stats.{key}"] += value
+        bucket = day_key(self.when)
+        for key, value in (daily or {}).items():
+            deltas[f"activity_stats.daily.{bucket}.{key}"] += value
+
+    def add_visits(self, user_id: str, previous: Iterable[dict]):
+        """
+        Keep the daily "visits" bucket as the number of distinct voters whose
+        latest visit that day was by the user. previous holds, per voter just
+        visited, its visited_by/visited_date before this visit.
+        """
+        day_start = datetime.strptime(day_key(self.when), "%Y-%m-%d")
+        credit = 0
+        for voter in previous:
+            visited_by = voter.get("visited_by")
+            if voter.get("visited_date") and voter["visited_date"] >= day_start:
+                if visited_by == user_id:
+                    continue
+                # Taken over from an earlier visitor of the day
+                self.add(visited_by, daily={"visits": -1})
+            credit += 1
+        self.add(user_id, daily={"visits": credit})
+
+    async def apply(self, db: AsyncIOMotorDatabase):
+        ops = []
+        scopes = set(self.scopes)
+        for user_id, deltas in self.deltas.items():
+            inc = {key: value for key, value in deltas.items() if value}
+            if not inc:
+                continue
+            # rev lets recompute_activity_stats detect increments made while it counts
+            inc["activity_stats.rev"] = 1
+            ops.append(UpdateOne({"_id": ObjectId(user_id)}, {"$inc": inc}))
+            scopes.add(activity_scope(user_id))
+        if ops:
+            await db.users.bulk_write(ops, ordered=False)
+        await bump_version(db, *scopes)
+        self.deltas.clear()
+        self.scopes.clear()
+
+async def inc_activity(
+    db: AsyncIOMotorDatabase,
+    user_id: Optional[str],
+    counters: Dict[str, int] = None,
+    daily: Dict[str, int] = None,
+    when: Optional[datetime] = None,
+    scopes: Iterable[str] = ()
+):
+    """
+    Increment activity_stats counters (and today's bucket) for a user. scopes
+    are further version scopes the caller changed, bumped in the same call.
+    """
+    activity = ActivityUpdate(when)
+    activity.add(user_id, counters, daily)
+    activity.scopes.update(scopes)
+    await activity.apply(db)
+
+async def inc_activity_many(
+    db: AsyncIOMotorDatabase,
+    user_ids: Iterable[str],
+    counters: Dict[str, int],
+    scopes: Iterable[str] = ()
+):
+    """
+    Apply the same counter increments to several users with one update_many.
+    scopes are further version scopes the caller changed; they are bumped
+    together with the users' activity scopes.
+    """
+    user_ids = [uid for uid in set(user_ids) if uid]
+    inc = {f"activity_stats.{k}": v for k, v in counters.items() if v}
+    if not (user_ids and inc):
+        await bump_version(db, *scopes)
+        return
+    inc["activity_stats.rev"] = 1
+    await db.users.update_many({"_id": {"$in": [ObjectId(uid) for uid in user_ids]}}, {"$inc": inc})
+    await bump_version(db, *scopes, *[activity_scope(uid) for uid in user_ids])
+
+def stale_days(daily: dict) -> list:
+    """Keys of daily buckets older than ACTIVITY_DAILY_DAYS"""
+    cutoff = day_key(datetime.utcnow() - timedelta(days=ACTIVITY_DAILY_DAYS))
+    return [day for day in daily if day < cutoff]
+
+async def prune_activity_days(db: AsyncIOMotorDatabase, user_id: str, days: Iterable[str]):
+    """Drop the given daily buckets from a user's activity_stats"""
+    unset = {f"activity_stats.daily.{day}": "" for day in days}
+    if unset:
+        await db.users.update_one({"_id": ObjectId(user_id)}, {"$unset": unset})
+
+async def invalidate_activity_stats(db: AsyncIOMotorDatabase, user_ids: Iterable[str]):
+    """Mark counters as out of sync so the next dashboard read rebuilds them"""
+    user_ids = [uid for uid in set(user_ids) if uid]
+    if user_ids:
+        await db.users.update_many(
+            {"_id": {"$in": [ObjectId(uid) for uid in user_ids]}},
+            {"$set": {"activity_stats.counters_synced": False}, "$inc": {"activity_stats.rev": 1}}
+        )
+        await bump_version(db, *[activity_scope(uid) for uid in user_ids])
+
+async def _count_activity(db: AsyncIOMotorDatabase, user_id: str) -> dict:
+    """Counters of a user from the source collections, as activity_stats fields"""
+    query = {"assigned_to": user_id}
+    today = day_key()
+    today_start = datetime.strptime(today, "%Y-%m-%d")
+
+    assigned = await db.voters.count_documents(query)
+    visited = await db.voters.count_documents({**query, "visited_status": True})
+    voted = await db.voters.count_documents({**query, "voted_status": True})
+    surveys = await db.surveys.count_documents({"karyakarta_id": user_id})
+    pending_tasks = await db.tasks.count_documents({"assigned_to": user_id, "status": "pending"})
+    today_surveys = await db.surveys.count_documents({
+        "karyakarta_id": user_id,
+        "timestamp": {"$gte": today_start}
+    })
+    today_visits = await db.voters.count_documents({
+        "visited_by": user_id,
+        "visited_date": {"$gte": today_start}
+    })
+
+    return {
+        "activity_stats.assigned_voters": assigned,
+        "activity_stats.visited_voters": visited,
+        "activity_stats.voted_voters": voted,
+        "activity_stats.pending_tasks": pending_tasks,
+        "activity_stats.surveys_completed": surveys,
+        f"activity_stats.daily.{today}": {"surveys": today_surveys, "visits": today_visits},
+    }
+
+async def recompute_activity_stats(db: AsyncIOMotorDatabase, user_id: str) -> dict:
+    """
+    Rebuild a user's counters from the source collections and drop old daily
+    buckets. The counters are only written if no increment landed while
+    counting (activity_stats.rev unchanged); otherwise the rebuild is retried,
+    and after the last attempt the counters are left marked out of sync.
+    """
+    user_oid = ObjectId(user_id)
+    for _ in range(ACTIVITY_RECOMPUTE_ATTEMPTS):
+        user = await db.users.find_one({"_id": user_oid}, {"activity_stats": 1})
+        stats = (user or {}).get("activity_stats") or {}
+        counters = await _count_activity(db, user_id)
+        result = await db.users.update_one(
+            {"_id": user_oid, "activity_stats.rev": stats.get("rev")},
+            {"$set": {**counters, "activity_stats.counters_synced": True}}
+        )
+        if result.matched_count:
+            break
+    else:
+        logger.warning(f"Activity counters of user {user_id} kept changing during rebuild")
+    await prune_activity_days(db, user_id, stale_days(stats.get("daily") or {}))
+    await bump_version(db, activity_scope(user_id))
+    logger.info(f"Rebuilt activity counters for user {user_id}")
+
+    user = await db.users.find_one({"_id": user_oid}, {"activity_stats": 1})
+    return user["activity_stats"]
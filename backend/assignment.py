@@ -0,0 +1,139 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateMany
+from datetime import datetime
+from typing import Dict, List
+import heapq
+import logging
+import math
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Voter ids per UpdateMany and UpdateMany ops per bulk_write
+ASSIGN_BATCH_SIZE = int(os.environ.get("ASSIGN_BATCH_SIZE", "1000"))
+ASSIGN_OPS_PER_WRITE = 50
+
+# Auto-assignment splits a set of voters across karyakartas in units of
+# households (family_id, or the voter alone when it has none). Whole booths
+# (or turfs, for voters that have been cut into turfs) go to one karyakarta
+# where the balance allows; they are only split, at household boundaries,
+# when they do not fit. Households already held by one
+# of the chosen karyakartas stay with them and count towards their load.
+
+VOTER_FIELDS = {"_id": 1, "family_id": 1, "booth_number": 1, "turf_id": 1, "assigned_to": 1}
+
+async def load_voters(db: AsyncIOMotorDatabase, query: dict) -> pd.DataFrame:
+    """The fields the planner needs for every voter matching query"""
+    voters = await db.voters.find(query, VOTER_FIELDS).to_list(length=None)
+    frame = pd.DataFrame(voters, columns=list(VOTER_FIELDS))
+    return frame.astype(object).where(frame.notna(), None)
+
+def _fill_targets(loads: List[int], free: int) -> List[int]:
+    """
+    Target load of each karyakarta (same order as loads) after the free
+    households are added: the least loaded are filled up to a common level,
+    the remainder going one each to the lowest of them, so targets add up to
+    sum(loads) + free. Karyakartas already above the level keep their load.
+    """
+    order = sorted(range(len(loads)), key=lambda i: loads[i])
+    level = loads[order[0]]
+    for i in range(len(order)):
+        width = i + 1
+        ceiling = loads[order[i + 1]] if i + 1 < len(order) else math.inf
+        room = (ceiling - level) * width
+        if free <= room:
+            break
+        free -= room
+        level = ceiling
+    targets = list(loads)
+    for rank, k in enumerate(order[:width]):
+        targets[k] = level + free // width + (rank < free % width)
+    return targets
+
+def plan_assignment(voters: pd.DataFrame, karyakarta_ids: List[str], keep_existing: bool = True) -> pd.DataFrame:
+    """
+    Add household and target columns to voters (one row per voter) with the
+    karyakarta each voter should be assigned to.
+    """
+    voters = voters.copy()
+    family = voters["family_id"]
+    has_family = family.notna() & (family != "")
+    voters["household"] = family.where(has_family, "v:" + voters["_id"].astype(str))
+    voters["booth"] = voters["turf_id"].fillna(voters["booth_number"]).fillna("")
+
+    households = voters.groupby("household", sort=False).agg(
+        booth=("booth", "first"), size=("_id", "size")
+    )
+    owner = pd.Series(None, index=households.index, dtype=object)
+
+    # Households already held by a chosen karyakarta keep their (majority) owner
+    if keep_existing:
+        held = voters[voters["assigned_to"].isin(karyakarta_ids)]
+        if len(held):
+            majority = (
+                held.groupby(["household", "assigned_to"]).size().rename("n").reset_index()
+                .sort_values("n", ascending=False).drop_duplicates("household")
+                .set_index("household")["assigned_to"]
+            )
+            owner.loc[majority.index] = majority
+
+    loads = owner.value_counts().reindex(karyakarta_ids, fill_value=0)
+    targets = _fill_targets(loads.tolist(), int(owner.isna().sum()))
+
+    # Free households by booth, largest booth first, each to the karyakarta
+    # with the most room left
+    free = households[owner.isna()].sort_index()
+    booths = free.groupby("booth").groups
+    heap = [(int(loads[kid]) - target, i, kid) for i, (kid, target) in enumerate(zip(karyakarta_ids, targets))]
+    heapq.heapify(heap)
+
+    placed = {}
+    for booth in sorted(booths, key=lambda b: len(booths[b]), reverse=True):
+        remaining = booths[booth].tolist()
+        while remaining:
+            short, order, kid = heapq.heappop(heap)
+            room = -short
+            take = remaining if room <= 0 or len(remaining) <= room else remaining[:room]
+            placed.update(dict.fromkeys(take, kid))
+            remaining = remaining[len(take):]
+            heapq.heappush(heap, (short + len(take), order, kid))
+
+    owner = owner.fillna(pd.Series(placed, dtype=object))
+    voters["target"] = voters["household"].map(owner)
+    return voters
+
+def summarize_plan(plan: pd.DataFrame) -> Dict[str, dict]:
+    """Households, voters, booths and changes per karyakarta"""
+    plan = plan.assign(changed=plan["target"] != plan["assigned_to"])
+    summary = plan.groupby("target").agg(
+        households=("household", "nunique"),
+        voters=("_id", "size"),
+        booths=("booth", "nunique"),
+        changed=("changed", "sum"),
+    )
+    return {
+        kid: {key: int(value) for key, value in row.items()}
+        for kid, row in summary.to_dict("index").items()
+    }
+
+async def apply_plan(db: AsyncIOMotorDatabase, plan: pd.DataFrame, assigned_by: str) -> int:
+    """Write the plan with chunked unordered bulk_write; returns voters modified"""
+    changed = plan[plan["target"] != plan["assigned_to"]]
+    now = datetime.utcnow()
+
+    ops = []
+    for kid, ids in changed.groupby("target")["_id"]:
+        ids = ids.tolist()
+        for start in range(0, len(ids), ASSIGN_BATCH_SIZE):
+            ops.append(UpdateMany(
+                {"_id": {"$in": ids[start:start + ASSIGN_BATCH_SIZE]}},
+                {"$set": {"assigned_to": kid, "assigned_by": assigned_by, "assigned_date": now}}
+            ))
+
+    modified = 0
+    for start in range(0, len(ops), ASSIGN_OPS_PER_WRITE):
+        result = await db.voters.bulk_write(ops[start:start + ASSIGN_OPS_PER_WRITE], ordered=False)
+        modified += result.modified_count
+    return modified
@@ -1,22 +1,24 @@
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import os
 import asyncio
+import time
 from backend.database import connect_to_mongo, get_database
-import datetime
+from hashing import PoolFull, hash_pool, pwd_context
+from revocations import revocation_list
 
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production-2024")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+# Verified token claims kept in memory (LRU)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -27,6 +29,27 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+def _pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the hashing pool, off the event loop"""
+    try:
+        return await hash_pool.run(verify_password, plain_password, hashed_password)
+    except PoolFull:
+        raise _pool_busy()
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the hashing pool, off the event loop"""
+    try:
+        return await hash_pool.run(get_password_hash, password)
+    except PoolFull:
+        raise _pool_busy()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -34,7 +57,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -50,17 +73,51 @@ def decode_access_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+class TokenCache:
+    """Bounded LRU of token -> verified claims, so repeat requests skip the signature check"""
+
+    def __init__(self, size: int = TOKEN_CACHE_SIZE):
+        self.size = size
+        self._claims: "OrderedDict[str, dict]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[dict]:
+        payload = self._claims.get(token)
+        if payload is None:
+            return None
+        if payload["exp"] <= time.time():
+            del self._claims[token]
+            return None
+        self._claims.move_to_end(token)
+        return payload
+
+    def put(self, token: str, payload: dict):
+        self._claims[token] = payload
+        self._claims.move_to_end(token)
+        if len(self._claims) > self.size:
+            self._claims.popitem(last=False)
+
+token_cache = TokenCache()
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Dependency to get current authenticated user"""
     token = credentials.credentials
-    payload = decode_access_token(token)
-    user_id: str = payload.get("sub")
-    if user_id is None:
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_access_token(token)
+        if payload.get("sub") is None or "exp" not in payload:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+            )
+        token_cache.put(token, payload)
+    # Deactivated users: in-memory check, refreshed by the revocations poller
+    if revocation_list.is_revoked(payload):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    return payload
+    return dict(payload)
 
 def require_role(allowed_roles: list):
     """Dependency factory for role-based access control"""
@@ -88,7 +145,7 @@ async def create_user(db, username: str, password: str, role: str):
         "email": f"{username}@example.com",  # Add unique email field
         "password": hashed_password,
         "role": role,
-        "created_at": datetime.datetime.now(datetime.timezone.utc)  # Use timezone-aware datetime
+        "created_at": datetime.now(timezone.utc)  # Use timezone-aware datetime
     }
     result = await db.users.insert_one(user)
     return {"user_id": str(result.inserted_id), "username": username, "password": truncated_password, "role": role}
@@ -0,0 +1,183 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Filter-selected bulk writes are split into _id ranges of BULK_RANGE_SIZE
+# voters, found by walking the _id index, and applied with at most
+# BULK_CONCURRENCY update_many calls in flight. Selections larger than
+# BULK_BACKGROUND_THRESHOLD run in the background with progress recorded in
+# bulk_jobs. A running job renews a lease; a job whose lease expired lost
+# its server (restart, crash) and is marked failed.
+BULK_RANGE_SIZE = int(os.environ.get("BULK_RANGE_SIZE", "5000"))
+BULK_CONCURRENCY = int(os.environ.get("BULK_CONCURRENCY", "4"))
+BULK_BACKGROUND_THRESHOLD = int(os.environ.get("BULK_BACKGROUND_THRESHOLD", "20000"))
+BULK_JOB_LEASE_SECONDS = int(os.environ.get("BULK_JOB_LEASE_SECONDS", "120"))
+
+# Strong references to running background jobs
+_running = set()
+
+async def _id_ranges(db: AsyncIOMotorDatabase, query: dict, size: int):
+    """Yield _id range filters covering the voters matching query, size voters each"""
+    last: Optional[ObjectId] = None
+    while True:
+        after = {"_id": {"$gt": last}} if last is not None else {}
+        end = await db.voters.find(
+            {"$and": [query, after]}, {"_id": 1}
+        ).sort("_id", 1).skip(size - 1).limit(1).to_list(1)
+        if not end:
+            # Final, open-ended range
+            yield after
+            return
+        bounds = {"_id": {"$lte": end[0]["_id"]}}
+        if last is not None:
+            bounds["_id"]["$gt"] = last
+        yield bounds
+        last = end[0]["_id"]
+
+async def update_in_ranges(
+    db: AsyncIOMotorDatabase,
+    query: dict,
+    update: Union[dict, List[dict]],
+    report: Optional[Callable[[Dict[str, int]], Awaitable[None]]] = None
+) -> Dict[str, int]:
+    """Apply update_many to the voters matching query, one _id range at a time"""
+    totals = {"matched": 0, "modified": 0}
+    pending = set()
+
+    async def apply(bounds: dict):
+        result = await db.voters.update_many({"$and": [query, bounds]}, update)
+        totals["matched"] += result.matched_count
+        totals["modified"] += result.modified_count
+        if report:
+            await report(totals)
+
+    try:
+        async for bounds in _id_ranges(db, query, BULK_RANGE_SIZE):
+            if len(pending) >= BULK_CONCURRENCY:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            pending.add(asyncio.create_task(apply(bounds)))
+    except BaseException:
+        # Do not leave ranges writing after the caller has seen the failure
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise
+    for outcome in await asyncio.gather(*pending, return_exceptions=True):
+        if isinstance(outcome, Exception):
+            raise outcome
+    return totals
+
+class BulkJob:
+    """Progress record of a background bulk write in bulk_jobs"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, job_id: ObjectId):
+        self.db = db
+        self.id = job_id
+
+    @staticmethod
+    def _lease() -> datetime:
+        return datetime.utcnow() + timedelta(seconds=BULK_JOB_LEASE_SECONDS)
+
+    @classmethod
+    async def create(cls, db: AsyncIOMotorDatabase, kind: str, total: int, created_by: str) -> "BulkJob":
+        now = datetime.utcnow()
+        result = await db.bulk_jobs.insert_one({
+            "kind": kind,
+            "status": "running",
+            "total": total,
+            "matched": 0,
+            "modified": 0,
+            "created_by": created_by,
+            "created_at": now,
+            "updated_at": now,
+            "lease_until": cls._lease()
+        })
+        return cls(db, result.inserted_id)
+
+    async def heartbeat(self):
+        """Renew the lease while the job runs (cancelled when it ends)"""
+        while True:
+            await asyncio.sleep(BULK_JOB_LEASE_SECONDS / 4)
+            try:
+                await self.db.bulk_jobs.update_one(
+                    {"_id": self.id, "status": "running"}, {"$set": {"lease_until": self._lease()}}
+                )
+            except Exception as e:
+                logger.error(f"Bulk job lease renewal failed: {str(e)}")
+
+    async def report(self, totals: Dict[str, int]):
+        await self.db.bulk_jobs.update_one(
+            {"_id": self.id},
+            {"$set": {**totals, "updated_at": datetime.utcnow()}}
+        )
+
+    async def finish(self, status: str, **fields):
+        now = datetime.utcnow()
+        await self.db.bulk_jobs.update_one(
+            {"_id": self.id},
+            {"$set": {**fields, "status": status, "updated_at": now, "completed_at": now}}
+        )
+
+async def run_bulk_write(
+    db: AsyncIOMotorDatabase,
+    kind: str,
+    query: dict,
+    update: Union[dict, List[dict]],
+    created_by: str,
+    finalize: Callable[[], Awaitable[None]]
+) -> dict:
+    """
+    Run a filter-selected voter update. Small selections complete inline;
+    large ones are handed to a background task and the job id is returned.
+    finalize runs after the last range (counter and family upkeep).
+    """
+    total = await db.voters.count_documents(query)
+
+    if total <= BULK_BACKGROUND_THRESHOLD:
+        totals = await update_in_ranges(db, query, update)
+        await finalize()
+        return {"status": "completed", "total": total, **totals}
+
+    job = await BulkJob.create(db, kind, total, created_by)
+
+    async def run():
+        heartbeat = asyncio.create_task(job.heartbeat())
+        try:
+            totals = await update_in_ranges(db, query, update, job.report)
+            await finalize()
+            await job.finish("completed", **totals)
+            logger.info(f"Bulk {kind} {job.id} finished: {totals['modified']} of {total} voters modified")
+        except Exception as e:
+            logger.error(f"Bulk {kind} {job.id} failed: {str(e)}")
+            await job.finish("failed", error=str(e))
+        finally:
+            heartbeat.cancel()
+
+    task = asyncio.create_task(run())
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return {"status": "running", "job_id": str(job.id), "total": total, "matched": 0, "modified": 0}
+
+async def fail_abandoned_bulk_jobs(db: AsyncIOMotorDatabase, job_id: Optional[ObjectId] = None) -> int:
+    """Mark running jobs (or the given one) whose lease expired as failed"""
+    now = datetime.utcnow()
+    query = {"status": "running", "lease_until": {"$lt": now}}
+    if job_id is not None:
+        query["_id"] = job_id
+    result = await db.bulk_jobs.update_many(query, {"$set": {
+        "status": "failed",
+        "error": "The server running the job stopped before it finished",
+        "updated_at": now,
+        "completed_at": now
+    }})
+    if result.modified_count:
+        logger.warning(f"Marked {result.modified_count} abandoned bulk jobs as failed")
+    return result.modified_count
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """
+    Stale-while-revalidate cache for expensive read-only results.
+
+    Entries younger than ``fresh_for`` seconds are served as-is. Older entries
+    are still served immediately while a single background task recomputes
+    them; only entries older than ``max_stale`` (or missing entries) make the
+    caller wait. Concurrent misses for the same key share one computation.
+    """
+
+    def __init__(self, fresh_for: float, max_stale: float):
+        self.fresh_for = fresh_for
+        self.max_stale = max(max_stale, fresh_for)
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, float]:
+        """Return ``(value, age_seconds)`` for key, recomputing as needed"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = time.monotonic() - stored_at
+            if age < self.fresh_for:
+                return value, age
+            if age < self.max_stale:
+                self._refresh(key, compute)
+                return value, age
+
+        stored_at, value = await asyncio.shield(self._refresh(key, compute))
+        return value, time.monotonic() - stored_at
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one entry, or every entry when no key is given"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def _refresh(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start (or join) the single in-flight recomputation for key"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return task
+
+    async def _run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[float, Any]:
+        value = await compute()
+        entry = (time.monotonic(), value)
+        self._entries[key] = entry
+        return entry
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Snapshot refresh failed for {key!r}: {task.exception()}")
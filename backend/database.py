@@ -1,5 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT
+from pymongo import IndexModel, ASCENDING, DESCENDING, GEOSPHERE, TEXT
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 import os
 import logging
@@ -102,6 +102,24 @@ async def create_indexes():
         IndexModel([("booth_number", ASCENDING), ("voted_status", ASCENDING)]),
         IndexModel([("assigned_to", ASCENDING), ("visited_status", ASCENDING)]),
         IndexModel([("area", ASCENDING), ("favor_score", DESCENDING)]),
+        IndexModel([("visited_by", ASCENDING), ("visited_date", DESCENDING)]),
+        # Rollback of partially written import chunks on resume
+        IndexModel([("import_session_id", ASCENDING), ("import_chunk", ASCENDING)], sparse=True),
+        # GeoJSON copy of gps_coordinates for nearby queries (see geo.py)
+        IndexModel([("location", GEOSPHERE)]),
+        # Voters written since a point in time (influencer reach sync)
+        IndexModel([("admin_id", ASCENDING), ("updated_at", ASCENDING)]),
+        # Voters written by an import session (post-import family refresh)
+        IndexModel([("admin_id", ASCENDING), ("last_import_session_id", ASCENDING)]),
+        # Re-import lookups by stable row key (covered, includes the content hash)
+        IndexModel([("admin_id", ASCENDING), ("import_key", ASCENDING), ("import_hash", ASCENDING)]),
+        # Voters cut into turfs (see turfs.py)
+        IndexModel([("turf_id", ASCENDING)], sparse=True),
+    ])
+    
+    await db.turfs.create_indexes([
+        IndexModel([("admin_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("cut_id", ASCENDING)]),
     ])
     
     # Surveys collection indexes
@@ -110,6 +128,7 @@ async def create_indexes():
         IndexModel([("karyakarta_id", ASCENDING)]),
         IndexModel([("template_id", ASCENDING)]),
         IndexModel([("timestamp", DESCENDING)]),
+        IndexModel([("karyakarta_id", ASCENDING), ("timestamp", DESCENDING)]),
     ])
     
     # Survey templates collection indexes
@@ -124,6 +143,8 @@ async def create_indexes():
         IndexModel([("assigned_by", ASCENDING)]),
         IndexModel([("status", ASCENDING)]),
         IndexModel([("due_date", ASCENDING)]),
+        # Reverse index voter -> tasks targeting it (see task_progress.py)
+        IndexModel([("target_voters", ASCENDING), ("status", ASCENDING)]),
     ])
     
     # Families collection indexes
@@ -138,6 +159,40 @@ async def create_indexes():
         IndexModel([("voter_id", ASCENDING)]),
         IndexModel([("area", ASCENDING)]),
         IndexModel([("influence_level", DESCENDING)]),
+        IndexModel([("admin_id", ASCENDING), ("area", ASCENDING)]),
+    ])
+    
+    # Import jobs are claimed oldest first
+    await db.import_sessions.create_indexes([
+        IndexModel([("status", ASCENDING), ("queued_at", ASCENDING)]),
+    ])
+    
+    # Deleted voters, read by the influence index sync (kept well past its interval)
+    await db.voter_tombstones.create_indexes([
+        IndexModel([("admin_id", ASCENDING), ("deleted_at", ASCENDING)]),
+        IndexModel([("deleted_at", ASCENDING)], expireAfterSeconds=24 * 3600),
+    ])
+    
+    # Background bulk assign/update progress records
+    await db.bulk_jobs.create_indexes([
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ])
+    
+    # Daily walk lists are only read on their day; locks guard the nightly build
+    await db.walk_lists.create_indexes([
+        IndexModel([("generated_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ])
+    await db.job_locks.create_indexes([
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ])
+    
+    # Import staging chunks expire on their own if a session is abandoned
+    await db.temp_imports.create_indexes([
+        IndexModel([("session_id", ASCENDING), ("chunk_index", ASCENDING)]),
+        IndexModel(
+            [("created_at", ASCENDING)],
+            expireAfterSeconds=int(os.environ.get("IMPORT_STAGING_TTL_SECONDS", "86400"))
+        ),
     ])
     
     # Issues collection indexes
@@ -146,6 +201,16 @@ async def create_indexes():
         IndexModel([("reported_by", ASCENDING)]),
         IndexModel([("status", ASCENDING)]),
         IndexModel([("priority", DESCENDING)]),
+        # Keyset-paginated queues: (priority desc, _id asc) per area / booth
+        IndexModel([("admin_id", ASCENDING), ("status", ASCENDING), ("priority", DESCENDING), ("_id", ASCENDING)]),
+        IndexModel([("admin_id", ASCENDING), ("status", ASCENDING), ("area", ASCENDING), ("priority", DESCENDING), ("_id", ASCENDING)]),
+        IndexModel([("admin_id", ASCENDING), ("status", ASCENDING), ("booth_number", ASCENDING), ("priority", DESCENDING), ("_id", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("priority", DESCENDING), ("_id", ASCENDING)]),
+    ])
+    
+    # Issue counters per admin x area x issue_type (see hotspots.py)
+    await db.issue_hotspots.create_indexes([
+        IndexModel([("admin_id", ASCENDING), ("open", DESCENDING)]),
     ])
     
     logger.info("All database indexes created successfully")
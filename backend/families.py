@@ -0,0 +1,157 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime
+from typing import Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Family documents are materialized from voters with one $group + $merge per
+# batch of family ids, so the server never walks voters in Python.
+FAMILY_BATCH_SIZE = 5000
+# relation_to_head values that mark the head of the household
+HEAD_RELATIONS = ["self", "head", "स्वतः", "स्वत:", "कुटुंबप्रमुख"]
+
+# Rollup flags derived from the stored counters. Shared by the materializing
+# pipeline and the incremental updates so both agree on the definitions.
+ROLLUP_FIELDS = {
+    "all_visited": {"$and": [{"$gt": ["$total_members", 0]}, {"$gte": ["$visited_members", "$total_members"]}]},
+    "all_voted": {"$and": [{"$gt": ["$total_members", 0]}, {"$gte": ["$voted_members", "$total_members"]}]},
+    "family_favor_score": {"$cond": [
+        {"$gt": ["$total_members", 0]},
+        {"$divide": ["$favor_score_sum", "$total_members"]},
+        50.0
+    ]},
+}
+
+# Voter fields whose changes the family counters depend on
+FAMILY_VOTER_FIELDS = {"family_id", "visited_status", "voted_status", "favor_score", "removed_from_roll"}
+
+def scoped_family_id(admin_id: Optional[str], booth_number: Optional[str], family_id: Optional[str]) -> Optional[str]:
+    """
+    Family / house numbers entered by hand only identify a household within
+    one admin's booth, so they get the same admin:booth:number namespace as
+    imported ones. Ids that already carry a scope (contain ':') are kept.
+    """
+    if not family_id or ":" in family_id:
+        return family_id
+    return f"{admin_id or ''}:{booth_number or ''}:{family_id}"
+
+def scoped_family_id_expr(family_id: Optional[str]):
+    """Aggregation counterpart of scoped_family_id for pipeline updates."""
+    if not family_id or ":" in family_id:
+        return {"$literal": family_id}
+    return {"$concat": [
+        {"$ifNull": ["$admin_id", ""]}, ":", {"$ifNull": ["$booth_number", ""]}, ":", {"$literal": family_id}
+    ]}
+
+def _family_pipeline(match: dict, now: datetime) -> List[dict]:
+    return [
+        {"$match": match},
+        {"$addFields": {
+            "_is_head": {"$in": [{"$toLower": {"$ifNull": ["$relation_to_head", ""]}}, HEAD_RELATIONS]}
+        }},
+        # Head: the member marked as head, otherwise the eldest
+        {"$sort": {"family_id": 1, "_is_head": -1, "age": -1}},
+        {"$group": {
+            "_id": {"admin_id": "$admin_id", "family_id": "$family_id"},
+            "family_head_name": {"$first": {"$ifNull": ["$full_name", "$name"]}},
+            "family_head_voter_id": {"$first": {"$toString": "$_id"}},
+            "members": {"$push": {"$toString": "$_id"}},
+            "total_members": {"$sum": 1},
+            "visited_members": {"$sum": {"$cond": ["$visited_status", 1, 0]}},
+            "voted_members": {"$sum": {"$cond": ["$voted_status", 1, 0]}},
+            "favor_score_sum": {"$sum": {"$ifNull": ["$favor_score", 50.0]}},
+            "area": {"$first": "$area"},
+            "booth_number": {"$first": "$booth_number"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "family_id": "$_id.family_id",
+            "admin_id": "$_id.admin_id",
+            "family_head_name": 1,
+            "family_head_voter_id": 1,
+            "members": 1,
+            "total_members": 1,
+            "visited_members": 1,
+            "voted_members": 1,
+            "favor_score_sum": 1,
+            "area": 1,
+            "booth_number": 1,
+            "updated_at": {"$literal": now},
+        }},
+        {"$set": ROLLUP_FIELDS},
+        {"$merge": {"into": "families", "on": "family_id", "whenMatched": "merge", "whenNotMatched": "insert"}},
+    ]
+
+async def _rebuild(db: AsyncIOMotorDatabase, admin_id: Optional[str], family_ids: List[str], now: datetime):
+    for start in range(0, len(family_ids), FAMILY_BATCH_SIZE):
+        batch = family_ids[start:start + FAMILY_BATCH_SIZE]
+        match = {"admin_id": admin_id, "family_id": {"$in": batch}, "removed_from_roll": {"$ne": True}}
+        await db.voters.aggregate(_family_pipeline(match, now)).to_list(None)
+
+async def materialize_families(
+    db: AsyncIOMotorDatabase,
+    admin_id: str,
+    session_id: Optional[str] = None
+) -> int:
+    """
+    Build or refresh the families of an admin's voters. With session_id, only
+    families containing a voter last written by that import session are
+    rebuilt; otherwise every family is. Families left without members are
+    deleted. Returns the number of families refreshed.
+    """
+    now = datetime.utcnow()
+    scope = {"admin_id": admin_id, "family_id": {"$nin": [None, ""]}}
+    touched = {**scope, "last_import_session_id": session_id} if session_id else scope
+
+    family_ids = [
+        doc["_id"]
+        async for doc in db.voters.aggregate([{"$match": touched}, {"$group": {"_id": "$family_id"}}])
+    ]
+    await _rebuild(db, admin_id, family_ids, now)
+
+    # Families not refreshed above have no members left
+    stale = {"admin_id": admin_id, "updated_at": {"$lt": now}}
+    if session_id:
+        stale["family_id"] = {"$in": family_ids}
+    result = await db.families.delete_many(stale)
+
+    logger.info(f"Materialized {len(family_ids)} families for admin {admin_id}, removed {result.deleted_count} empty")
+    return len(family_ids)
+
+async def refresh_families(
+    db: AsyncIOMotorDatabase,
+    admin_id: Optional[str],
+    family_ids: Iterable[Optional[str]]
+):
+    """Rebuild specific families of an admin from their voters (after membership changes)"""
+    family_ids = [fid for fid in set(family_ids) if fid]
+    if not family_ids:
+        return
+    now = datetime.utcnow()
+    await _rebuild(db, admin_id, family_ids, now)
+    await db.families.delete_many({
+        "admin_id": admin_id, "family_id": {"$in": family_ids}, "updated_at": {"$lt": now}
+    })
+
+async def inc_family(
+    db: AsyncIOMotorDatabase,
+    family_id: Optional[str],
+    visited: int = 0,
+    voted: int = 0
+):
+    """
+    Apply a member's visited/voted change to the family counters and re-derive
+    the rollup flags in the same atomic update (no member scan). Only members
+    still on the roll are counted. favor_score only changes through bulk
+    updates, which rebuild the families they touch (refresh_families).
+    """
+    if not family_id or not (visited or voted):
+        return
+    await db.families.update_one({"family_id": family_id}, [
+        {"$set": {
+            "visited_members": {"$add": [{"$ifNull": ["$visited_members", 0]}, visited]},
+            "voted_members": {"$add": [{"$ifNull": ["$voted_members", 0]}, voted]},
+        }},
+        {"$set": ROLLUP_FIELDS},
+    ])
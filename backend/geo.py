@@ -0,0 +1,90 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Voter positions are kept twice: gps_coordinates ({latitude, longitude}) as
+# exposed by the API, and location, the same point as GeoJSON backing the
+# 2dsphere index used by nearby queries.
+
+def geo_point(latitude: float, longitude: float) -> dict:
+    """GeoJSON point (GeoJSON orders coordinates longitude first)"""
+    return {"type": "Point", "coordinates": [float(longitude), float(latitude)]}
+
+def to_metres(points: np.ndarray) -> np.ndarray:
+    """Local equirectangular projection of [lng, lat] rows to metres"""
+    lat0 = np.radians(points[:, 1].mean())
+    return np.column_stack((
+        points[:, 0] * 111320.0 * np.cos(lat0),
+        points[:, 1] * 110540.0,
+    ))
+
+def valid_coordinates(latitude: Optional[float], longitude: Optional[float]) -> bool:
+    return (
+        latitude is not None and longitude is not None
+        and -90 <= latitude <= 90 and -180 <= longitude <= 180
+    )
+
+def location_fields(gps: Optional[dict]) -> dict:
+    """gps_coordinates + location fields for a {latitude, longitude} dict"""
+    if not gps or not valid_coordinates(gps.get("latitude"), gps.get("longitude")):
+        return {}
+    return {
+        "gps_coordinates": {"latitude": gps["latitude"], "longitude": gps["longitude"]},
+        "location": geo_point(gps["latitude"], gps["longitude"]),
+    }
+
+# Aggregation expression building the GeoJSON point from gps_coordinates
+_POINT_FROM_GPS = {
+    "type": "Point",
+    "coordinates": ["$gps_coordinates.longitude", "$gps_coordinates.latitude"],
+}
+
+_HAS_VALID_GPS = {
+    "gps_coordinates.latitude": {"$gte": -90, "$lte": 90},
+    "gps_coordinates.longitude": {"$gte": -180, "$lte": 180},
+}
+
+async def backfill_voter_locations(db: AsyncIOMotorDatabase) -> dict:
+    """
+    Fill location for voters that have none, in two server-side passes:
+    from the voter's own gps_coordinates, then from the latest survey GPS
+    fix taken for the voter. Existing locations are never overwritten.
+    """
+    result = await db.voters.update_many(
+        {"location": {"$exists": False}, **_HAS_VALID_GPS},
+        [{"$set": {"location": _POINT_FROM_GPS}}]
+    )
+    from_voters = result.modified_count
+
+    before = await db.voters.count_documents({"location": {"$exists": True}})
+    await db.surveys.aggregate([
+        {"$match": {
+            "gps_location.latitude": {"$gte": -90, "$lte": 90},
+            "gps_location.longitude": {"$gte": -180, "$lte": 180},
+        }},
+        {"$sort": {"timestamp": -1}},
+        {"$group": {"_id": "$voter_id", "gps": {"$first": "$gps_location"}}},
+        {"$project": {
+            "_id": {"$convert": {"input": "$_id", "to": "objectId", "onError": None, "onNull": None}},
+            "gps_coordinates": {"latitude": "$gps.latitude", "longitude": "$gps.longitude"},
+            "location": {"type": "Point", "coordinates": ["$gps.longitude", "$gps.latitude"]},
+        }},
+        {"$match": {"_id": {"$ne": None}}},
+        {"$merge": {
+            "into": "voters",
+            "on": "_id",
+            "whenMatched": [{"$set": {
+                "gps_coordinates": {"$ifNull": ["$gps_coordinates", "$$new.gps_coordinates"]},
+                "location": {"$ifNull": ["$location", "$$new.location"]},
+            }}],
+            "whenNotMatched": "discard",
+        }},
+    ]).to_list(None)
+    from_surveys = await db.voters.count_documents({"location": {"$exists": True}}) - before
+
+    logger.info(f"Backfilled voter locations: {from_voters} from gps_coordinates, {from_surveys} from surveys")
+    return {"from_gps_coordinates": from_voters, "from_surveys": from_surveys}
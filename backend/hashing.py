@@ -0,0 +1,137 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from typing import Any, Callable, List, Optional
+from passlib.context import CryptContext
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# bcrypt takes a few hundred ms per hash/verify and releases the GIL while
+# it works, so it runs on a dedicated thread pool instead of the event loop.
+# At most HASH_WORKERS run at once and HASH_MAX_QUEUE more may wait; beyond
+# that calls are refused (PoolFull) rather than queueing without bound.
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_MAX_QUEUE = int(os.environ.get("HASH_MAX_QUEUE", "256"))
+# Samples kept for the wait/run time percentiles
+METRICS_WINDOW = 1000
+# Bulk hashing (user onboarding) runs on one long-lived process pool shared by
+# every request. It never takes HASH_WORKERS slots and by default uses half of
+# the cores, leaving the rest to logins.
+BULK_HASH_WORKERS = int(os.environ.get("BULK_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class PoolFull(Exception):
+    """The hashing queue is at HASH_MAX_QUEUE"""
+
+def _timed(fn: Callable, args: tuple) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, start, time.perf_counter()
+
+def _percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class HashPool:
+    """Bounded executor for CPU-heavy password work, with queue metrics"""
+
+    def __init__(self, workers: int = HASH_WORKERS, max_queue: int = HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash")
+        self.in_flight = 0
+        self.peak_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self._waits = deque(maxlen=METRICS_WINDOW)
+        self._runs = deque(maxlen=METRICS_WINDOW)
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) on the pool; raises PoolFull when the queue is full"""
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise PoolFull()
+        self.in_flight += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _timed, fn, args
+            )
+        finally:
+            self.in_flight -= 1
+        self.completed += 1
+        self._waits.append(started - submitted)
+        self._runs.append(finished - started)
+        return result
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms_p50": round(_percentile(self._waits, 0.5) * 1000, 1),
+            "wait_ms_p99": round(_percentile(self._waits, 0.99) * 1000, 1),
+            "run_ms_p50": round(_percentile(self._runs, 0.5) * 1000, 1),
+            "run_ms_p99": round(_percentile(self._runs, 0.99) * 1000, 1),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+hash_pool = HashPool()
+
+def _hash_batch(passwords: List[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+class BulkHasher:
+    """Process pool for hashing many passwords at once, started on first use"""
+
+    def __init__(self, workers: int = BULK_HASH_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash passwords across the pool's processes (same order)"""
+        if not passwords:
+            return []
+        if self._executor is None:
+            # spawn: the server process runs driver threads, which fork does not mix well with
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        parts = max(1, min(self.workers, len(passwords)))
+        batches = [passwords[i::parts] for i in range(parts)]
+        loop = asyncio.get_running_loop()
+        hashed = await asyncio.gather(*[loop.run_in_executor(self._executor, _hash_batch, batch) for batch in batches])
+        # Undo the round-robin split
+        out = [None] * len(passwords)
+        for i, batch in enumerate(hashed):
+            out[i::parts] = batch
+        return out
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+bulk_hasher = BulkHasher()
+
+async def hash_many(passwords: List[str]) -> List[str]:
+    """Hash many passwords in parallel on the shared bulk pool (same order)"""
+    return await bulk_hasher.hash_many(passwords)
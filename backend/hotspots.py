@@ -0,0 +1,87 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime
+from typing import Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Issue counters per admin x area x issue_type, kept in issue_hotspots and
+# incremented as issues are created and resolved, so the hotspots view reads
+# a handful of counter documents instead of aggregating issues.
+
+def hotspot_id(admin_id: Optional[str], area: Optional[str], issue_type: str) -> str:
+    return f"{admin_id or ''}|{area or ''}|{issue_type}"
+
+async def inc_hotspot(
+    db: AsyncIOMotorDatabase,
+    issue: dict,
+    opened: int = 0,
+    resolved: int = 0
+):
+    """Apply an issue being opened or resolved to its hotspot counters"""
+    inc = {"open": opened - resolved, "resolved": resolved, "total": opened}
+    await db.issue_hotspots.update_one(
+        {"_id": hotspot_id(issue.get("admin_id"), issue.get("area"), issue["issue_type"])},
+        {
+            "$inc": {k: v for k, v in inc.items() if v},
+            "$set": {"updated_at": datetime.utcnow()},
+            "$setOnInsert": {
+                "admin_id": issue.get("admin_id"),
+                "area": issue.get("area"),
+                "issue_type": issue["issue_type"],
+            },
+        },
+        upsert=True
+    )
+
+async def adopt_issues(db: AsyncIOMotorDatabase, voter_ids: List[str], admin_id: str) -> int:
+    """
+    Give the issues of voters that had no admin (now owned by admin_id) that
+    admin. Returns the number of issues moved; the caller rebuilds the
+    hotspots of admin_id and of the unowned bucket (None) once it is done.
+    """
+    if not voter_ids:
+        return 0
+    result = await db.issues.update_many(
+        {"voter_id": {"$in": voter_ids}, "admin_id": None}, {"$set": {"admin_id": admin_id}}
+    )
+    return result.modified_count
+
+async def rebuild_hotspots(db: AsyncIOMotorDatabase, admin_ids: Optional[Iterable[Optional[str]]] = None) -> int:
+    """
+    Recompute the counters from the issues of the given admins, where a None
+    entry is the bucket of issues without an admin. admin_ids=None rebuilds
+    every admin.
+    """
+    now = datetime.utcnow()
+    match = {} if admin_ids is None else {"admin_id": {"$in": list(set(admin_ids))}}
+    await db.issues.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {"admin_id": "$admin_id", "area": "$area", "issue_type": "$issue_type"},
+            "open": {"$sum": {"$cond": [{"$eq": ["$status", "open"]}, 1, 0]}},
+            "resolved": {"$sum": {"$cond": [{"$eq": ["$status", "resolved"]}, 1, 0]}},
+            "total": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": {"$concat": [
+                {"$ifNull": ["$_id.admin_id", ""]}, "|",
+                {"$ifNull": ["$_id.area", ""]}, "|",
+                "$_id.issue_type",
+            ]},
+            "admin_id": "$_id.admin_id",
+            "area": "$_id.area",
+            "issue_type": "$_id.issue_type",
+            "open": 1,
+            "resolved": 1,
+            "total": 1,
+            "updated_at": {"$literal": now},
+        }},
+        {"$merge": {"into": "issue_hotspots", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]).to_list(None)
+
+    # Counters whose issues are all gone
+    result = await db.issue_hotspots.delete_many({**match, "updated_at": {"$lt": now}})
+    count = await db.issue_hotspots.count_documents(match)
+    logger.info(f"Rebuilt {count} issue hotspot counters, removed {result.deleted_count}")
+    return count
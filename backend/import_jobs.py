@@ -0,0 +1,322 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from bson import ObjectId
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import logging
+import os
+import socket
+
+from families import materialize_families
+from import_pipeline import (
+    IMPORT_BATCH_SIZE, ImportWriter, StagedChunk,
+    chunk_keys, classify_docs, find_removed, map_chunk, mark_removed
+)
+
+logger = logging.getLogger(__name__)
+
+# Imports run as jobs recorded in import_sessions. A worker claims a queued
+# job with a lease, processes staged chunks in order and checkpoints after
+# every chunk it has fully written (next_chunk + counts). While a job runs a
+# heartbeat keeps renewing the lease, so the phases without checkpoints (the
+# removed-voter scan of a sync, the family rebuild) cannot outlive it. If the
+# process dies the lease runs out and the next worker resumes from the
+# checkpoint, first removing any voters the interrupted chunk had already
+# inserted.
+IMPORT_WORKER_POLL_SECONDS = float(os.environ.get("IMPORT_WORKER_POLL_SECONDS", "2"))
+IMPORT_JOB_LEASE_SECONDS = int(os.environ.get("IMPORT_JOB_LEASE_SECONDS", "120"))
+
+ACTIVE_STATUSES = ["queued", "running"]
+FINISHED_STATUSES = ["completed", "failed", "cancelled"]
+# Statuses from which map-columns may (re)start a job; "diffed" is a finished dry run
+STARTABLE_STATUSES = ["pending_mapping", "diffed", "failed"]
+IMPORT_MODES = ["insert", "sync"]
+DIFF_SAMPLE_SIZE = 10
+
+class ImportCancelled(Exception):
+    pass
+
+class LeaseLost(Exception):
+    pass
+
+def progress_view(session: dict) -> dict:
+    """Progress summary of an import session (rows done, errors, ETA)"""
+    total = session.get("total_rows", 0)
+    processed = session.get("processed_rows", 0)
+    status = session.get("status")
+
+    rate = None
+    eta = None
+    started = session.get("run_started_at")
+    updated = session.get("updated_at")
+    if status == "running" and started and updated and updated > started:
+        done_this_run = processed - session.get("run_start_rows", 0)
+        if done_this_run > 0:
+            rate = done_this_run / (updated - started).total_seconds()
+            eta = round(max(total - processed, 0) / rate, 1)
+
+    return {
+        "session_id": str(session["_id"]),
+        "status": status,
+        "total_rows": total,
+        "processed_rows": processed,
+        "imported_count": session.get("imported_count", 0),
+        "updated_count": session.get("updated_count", 0),
+        "error_count": session.get("error_count", 0),
+        "percent": round(100.0 * processed / total, 1) if total else 0.0,
+        "rows_per_second": round(rate, 1) if rate else None,
+        "eta_seconds": eta,
+        "cancel_requested": session.get("cancel_requested", False),
+        "queued_at": session.get("queued_at"),
+        "updated_at": updated,
+        "completed_at": session.get("completed_at"),
+        "mode": session.get("mode", "insert"),
+        "dry_run": session.get("dry_run", False),
+        "diff": session.get("diff"),
+        "error": session.get("error"),
+        "errors": (session.get("errors") or [])[:10]
+    }
+
+def new_diff() -> dict:
+    return {
+        "new": 0, "changed": 0, "unchanged": 0, "removed": 0,
+        # Row numbers (new/changed/unchanged) and voter ids (removed)
+        "samples": {"new": [], "changed": [], "unchanged": [], "removed": []}
+    }
+
+class ImportWorker:
+    """Background worker that runs queued import jobs one at a time"""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{ObjectId()}"
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    def start(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Import worker {self.worker_id} started")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Hand unfinished jobs back right away instead of waiting for the lease
+        await self.db.import_sessions.update_many(
+            {"worker_id": self.worker_id, "status": "running"},
+            {"$set": {"lease_until": None}}
+        )
+
+    def notify(self):
+        """Wake the worker after a job was queued"""
+        self._wake.set()
+
+    async def _loop(self):
+        while True:
+            try:
+                job = await self._claim()
+                if job is not None:
+                    await self._run(job)
+                    continue
+            except Exception as e:
+                logger.error(f"Import worker error: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), IMPORT_WORKER_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _lease(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=IMPORT_JOB_LEASE_SECONDS)
+
+    async def _claim(self) -> Optional[dict]:
+        """Take the oldest queued job, or a running one whose lease expired"""
+        now = datetime.utcnow()
+        return await self.db.import_sessions.find_one_and_update(
+            {
+                "status": {"$in": ACTIVE_STATUSES},
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+            },
+            [{"$set": {
+                "status": "running",
+                "worker_id": self.worker_id,
+                "lease_until": self._lease(),
+                "run_started_at": now,
+                "run_start_rows": {"$ifNull": ["$processed_rows", 0]},
+                "updated_at": now
+            }}],
+            sort=[("queued_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _checkpoint(self, session_id: ObjectId, fields: dict) -> dict:
+        """Persist progress and renew the lease; raises if the job moved on"""
+        session = await self.db.import_sessions.find_one_and_update(
+            {"_id": session_id, "worker_id": self.worker_id, "status": "running"},
+            {"$set": {**fields, "lease_until": self._lease(), "updated_at": datetime.utcnow()}},
+            projection={"cancel_requested": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if session is None:
+            raise LeaseLost()
+        return session
+
+    async def _heartbeat(self, session_id: ObjectId):
+        """Renew the lease until the job leaves running or another worker holds it"""
+        while True:
+            await asyncio.sleep(IMPORT_JOB_LEASE_SECONDS / 4)
+            try:
+                result = await self.db.import_sessions.update_one(
+                    {"_id": session_id, "worker_id": self.worker_id, "status": "running"},
+                    {"$set": {"lease_until": self._lease()}}
+                )
+            except Exception as e:
+                logger.error(f"Import lease renewal failed: {str(e)}")
+                continue
+            if result.matched_count == 0:
+                return
+
+    async def _finish(self, session_id: ObjectId, fields: dict):
+        await self.db.import_sessions.update_one(
+            {"_id": session_id, "worker_id": self.worker_id},
+            {"$set": {**fields, "lease_until": None, "updated_at": datetime.utcnow()}}
+        )
+
+    async def _file_keys(self, session_id: str, column_mapping: dict) -> set:
+        """Keys of every valid row in the staged file"""
+        keys = set()
+        async for staged_doc in self.db.temp_imports.find({"session_id": session_id}):
+            keys.update(await asyncio.to_thread(chunk_keys, StagedChunk(staged_doc), column_mapping))
+        return keys
+
+    async def _run(self, job: dict):
+        db = self.db
+        session_oid = job["_id"]
+        session_id = str(session_oid)
+        next_chunk = job.get("next_chunk", 0)
+        admin_id = job["admin_id"]
+
+        if next_chunk:
+            logger.info(f"Resuming import {session_id} from chunk {next_chunk}")
+        # Drop rows an interrupted run wrote past the last checkpoint
+        await db.voters.delete_many({"import_session_id": session_id, "import_chunk": {"$gte": next_chunk}})
+
+        writer = ImportWriter(db, job.get("batch_size") or IMPORT_BATCH_SIZE)
+        writer.restore(job)
+        now = job.get("queued_at") or datetime.utcnow()
+        column_mapping = job["column_mapping"]
+        sync = job.get("mode") == "sync"
+        dry_run = job.get("dry_run", False)
+        diff = job.get("diff") or new_diff()
+        heartbeat = asyncio.create_task(self._heartbeat(session_oid))
+
+        try:
+            if job.get("cancel_requested"):
+                raise ImportCancelled()
+
+            staged = db.temp_imports.find(
+                {"session_id": session_id, "chunk_index": {"$gte": next_chunk}}
+            ).sort("chunk_index", 1)
+
+            async for staged_doc in staged:
+                chunk = StagedChunk(staged_doc)
+                extra = {
+                    "import_session_id": session_id,
+                    "import_chunk": chunk.chunk_index,
+                    "last_import_session_id": session_id
+                }
+                # Whole-chunk vectorized transform; run it off the event loop
+                docs, invalid = await asyncio.to_thread(
+                    map_chunk, chunk, column_mapping, admin_id, now, extra
+                )
+                for pos, message in invalid:
+                    writer.record_chunk_error(chunk, pos, message)
+
+                if sync:
+                    # Re-import: only new and changed rows are written
+                    classes = await classify_docs(db, admin_id, docs) if docs else {}
+                    for name, rows in classes.items():
+                        diff[name] += len(rows)
+                        samples = diff["samples"][name]
+                        samples.extend(chunk.row_number(pos) for pos, _ in rows[:DIFF_SAMPLE_SIZE - len(samples)])
+                    if not dry_run:
+                        for pos, voter_data in classes.get("new", []):
+                            await writer.add(chunk, pos, voter_data)
+                        for pos, voter_data in classes.get("changed", []):
+                            await writer.update(chunk, pos, admin_id, voter_data)
+                else:
+                    for pos, voter_data in docs:
+                        await writer.add(chunk, pos, voter_data)
+                await writer.flush()
+
+                state = await self._checkpoint(session_oid, {
+                    "next_chunk": chunk.chunk_index + 1,
+                    "processed_rows": chunk.row_offset + chunk.size,
+                    "imported_count": writer.imported_count,
+                    "updated_count": writer.updated_count,
+                    "error_count": writer.error_count,
+                    "errors": writer.errors,
+                    "diff": diff
+                })
+                if state.get("cancel_requested"):
+                    raise ImportCancelled()
+
+            if sync:
+                # Voters of this admin whose key no longer appears in the roll
+                file_keys = await self._file_keys(session_id, column_mapping)
+                removed = await find_removed(db, admin_id, file_keys)
+                diff["removed"] = len(removed)
+                diff["samples"]["removed"] = [str(v) for v in removed[:DIFF_SAMPLE_SIZE]]
+                # Stop here if the job was taken over while scanning
+                await self._checkpoint(session_oid, {"diff": diff})
+                if not dry_run:
+                    await mark_removed(db, removed, now, session_id)
+
+            if not dry_run:
+                # Voters inserted, updated or removed by this job carry its session id
+                await materialize_families(db, admin_id, session_id=session_id)
+
+            await self._finish(session_oid, {
+                "status": "diffed" if dry_run else "completed",
+                "processed_rows": job.get("total_rows", 0),
+                "imported_count": writer.imported_count,
+                "updated_count": writer.updated_count,
+                "error_count": writer.error_count,
+                "errors": writer.errors,  # First MAX_STORED_ERRORS errors
+                "diff": diff if sync else None,
+                "completed_at": datetime.utcnow()
+            })
+            if dry_run:
+                logger.info(f"Import {session_id} dry run: {diff['new']} new, {diff['changed']} changed, "
+                            f"{diff['unchanged']} unchanged, {diff['removed']} removed")
+                return
+            await db.temp_imports.delete_many({"session_id": session_id})
+            logger.info(f"Imported {writer.imported_count} voters and updated {writer.updated_count} "
+                        f"for admin {admin_id} (session {session_id})")
+
+        except ImportCancelled:
+            # Rows from checkpointed chunks stay imported
+            await self._finish(session_oid, {"status": "cancelled", "completed_at": datetime.utcnow()})
+            await db.temp_imports.delete_many({"session_id": session_id})
+            logger.info(f"Import {session_id} cancelled after {writer.imported_count} rows")
+
+        except LeaseLost:
+            logger.warning(f"Import {session_id} was taken over by another worker")
+
+        except Exception as e:
+            # Staging is kept so the job can be resubmitted and resume
+            logger.error(f"Import {session_id} failed: {str(e)}")
+            await self._finish(session_oid, {"status": "failed", "error": str(e)})
+
+        finally:
+            heartbeat.cancel()
+
+import_worker = ImportWorker()
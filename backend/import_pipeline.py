@@ -0,0 +1,485 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "1000"))
+MAX_STORED_ERRORS = 100
+DEFAULT_AGE = 18
+
+# Normalized gender tokens (English and Marathi) -> Gender value
+GENDER_TOKENS = {
+    "m": "male", "male": "male", "man": "male", "पु": "male", "पुरुष": "male", "पुरूष": "male",
+    "f": "female", "female": "female", "woman": "female", "स्त्री": "female", "स्री": "female",
+    "महिला": "female",
+    "o": "other", "other": "other", "t": "other", "तृतीयपंथी": "other", "इतर": "other",
+}
+# Fallback for free-text values; female tokens are tried first so "female" never reads as "male"
+GENDER_FEMALE_PATTERN = re.compile(r"\b(?:female|woman|f)\b|स्त्री|स्री|महिला")
+GENDER_MALE_PATTERN = re.compile(r"\b(?:male|man|m)\b|पुरुष|पुरूष|पु")
+
+# Optional text fields copied as-is (mapping key -> default when the cell is empty)
+OPTIONAL_TEXT_FIELDS = {"ward": "", "phone": "", "caste": "", "address": "", "relation_to_head": ""}
+# Columns with few distinct values per roll, cleaned once per distinct value
+REPEATED_TEXT_FIELDS = {"age", "area_english", "area_marathi", "booth_number", "ward", "caste", "relation_to_head"}
+
+# Fields set by the campaign rather than the roll; re-imports never overwrite them
+CAMPAIGN_FIELDS = {
+    "favor_score", "favor_category", "visited_status", "visited_by", "visited_date",
+    "visit_count", "voted_status", "voted_timestamp", "assigned_to", "assigned_by",
+    "assigned_date", "gps_coordinates", "tags", "notes", "survey_history",
+    "created_at", "imported_at", "import_session_id", "import_chunk",
+}
+
+class StagedChunk:
+    """
+    One staged chunk of an upload. Chunks are stored column-wise
+    (column_names + one value list per column) so the mapping stage can
+    work on whole columns without touching individual rows.
+    """
+
+    def __init__(self, doc: dict):
+        self.chunk_index = doc["chunk_index"]
+        self.row_offset = doc["row_offset"]
+        self.column_names: List[str] = doc["column_names"]
+        self.values: List[list] = doc["values"]
+        self.size = doc["row_count"]
+        self._by_name = dict(zip(self.column_names, self.values))
+
+    @staticmethod
+    def from_frame(frame: pd.DataFrame) -> Dict[str, Any]:
+        """Column-wise staging payload for a parsed chunk (NaN -> None)"""
+        frame = frame.astype(object).where(frame.notna(), None)
+        return {
+            "column_names": [str(c) for c in frame.columns],
+            "values": [frame[c].tolist() for c in frame.columns],
+            "row_count": len(frame),
+        }
+
+    def column(self, name: str) -> np.ndarray:
+        values = self._by_name.get(name)
+        if values is None:
+            return np.full(self.size, None, dtype=object)
+        column = np.empty(self.size, dtype=object)
+        column[:] = values
+        return column
+
+    def row(self, pos: int) -> dict:
+        """Original cells of one row (for error reports)"""
+        return {name: values[pos] for name, values in self._by_name.items()}
+
+    def row_number(self, pos: int) -> int:
+        """1-based row number in the uploaded file"""
+        return self.row_offset + pos + 1
+
+def _factorized(values: np.ndarray, transform) -> np.ndarray:
+    """
+    Apply transform to each distinct value only. Roll columns repeat heavily
+    (areas, booths, gender tokens), so this is O(n) in C plus O(unique) in Python.
+    Missing cells are passed to transform as None.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    mapped = np.array([transform(u) for u in uniques] + [transform(None)], dtype=object)
+    return mapped[codes]  # code -1 (missing) picks the trailing transform(None)
+
+def _clean(value) -> str:
+    return "" if value is None else str(value).strip()
+
+def _text(chunk: StagedChunk, column: str, default: str = "", repeated: bool = False) -> np.ndarray:
+    """
+    Column as stripped strings with empty cells replaced by default.
+    With repeated, only the distinct values are cleaned (areas, booths, ages).
+    """
+    if not column:
+        return np.full(chunk.size, default, dtype=object)
+    if repeated:
+        return _factorized(chunk.column(column), lambda value: _clean(value) or default)
+    # Mostly-unique columns (names, addresses): cells arrive and leave as
+    # Python strings, so one flat pass beats pandas .str (about 2x here)
+    values = np.empty(chunk.size, dtype=object)
+    values[:] = ["" if v is None else str(v).strip() for v in chunk.column(column)]
+    if default:
+        values[values == ""] = default
+    return values
+
+def _column_hash(column: np.ndarray, repeated: bool = False) -> np.ndarray:
+    """
+    pd.util.hash_array of a column (categorize=False: a value's hash must not
+    depend on its chunk). Repeated columns hash their distinct values only.
+    """
+    if not repeated or column.dtype != object:
+        return pd.util.hash_array(column, categorize=False)
+    codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    # Missing cells (code -1) pick the trailing hash of None, as unfactorized
+    uniques = np.append(np.asarray(uniques, dtype=object), None)
+    return pd.util.hash_array(uniques, categorize=False)[codes]
+
+def _row_digests(columns: List[np.ndarray], prefix: str) -> np.ndarray:
+    """
+    Stable 64-bit hash of every row across columns, as prefix + 16 hex
+    characters. columns are either value columns or their _column_hash;
+    the column hashes are folded together, so no per-row Python work is done.
+    """
+    digests = pd.util.hash_array(np.array([prefix], dtype=object), categorize=False)
+    digests = np.broadcast_to(digests, len(columns[0]))
+    for column in columns:
+        hashed = column if column.dtype == np.uint64 else _column_hash(column)
+        digests = digests * np.uint64(1000003) ^ hashed
+    # One hex string for the whole column, cut into fixed-width rows
+    hexed = np.frombuffer(digests.astype(">u8").tobytes().hex().encode("ascii"), dtype="S16")
+    hexed = hexed.astype(str).astype(object)
+    return prefix + hexed if prefix else hexed
+
+def _gender_token(value) -> str:
+    token = _clean(value).lower()
+    gender = GENDER_TOKENS.get(token)
+    if gender:
+        return gender
+    if GENDER_FEMALE_PATTERN.search(token):
+        return "female"
+    if GENDER_MALE_PATTERN.search(token):
+        return "male"
+    return "other"
+
+def _map_columns(chunk: StagedChunk, column_mapping: Dict[str, str]) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Mapped voter columns of a chunk plus the per-row error message ("" if valid)"""
+    out: Dict[str, np.ndarray] = {}
+    invalid = np.full(chunk.size, "", dtype=object)
+
+    def text(field: str, default: str = "") -> np.ndarray:
+        return _text(chunk, column_mapping.get(field, ""), default, field in REPEATED_TEXT_FIELDS)
+
+    # Required fields
+    out["name"] = text("name_english")
+    no_english = out["name"] == ""
+    if no_english.any():
+        out["name"][no_english] = text("name_marathi")[no_english]
+    invalid[out["name"] == ""] = "Missing name"
+
+    # Age
+    age_field = column_mapping.get("age")
+    if age_field:
+        raw_age = text("age")
+        codes, uniques = pd.factorize(raw_age)
+        age = np.asarray(pd.to_numeric(uniques, errors="coerce"), dtype=float)[codes]
+        bad_age = np.isnan(age) & (raw_age != "")
+        invalid[bad_age & (invalid == "")] = "Invalid age"
+        out["age"] = np.trunc(np.nan_to_num(age, nan=DEFAULT_AGE)).astype(int)
+
+    # Gender
+    gender_field = column_mapping.get("gender")
+    if gender_field:
+        out["gender"] = _factorized(chunk.column(gender_field), _gender_token)
+    else:
+        out["gender"] = np.full(chunk.size, "male", dtype=object)
+
+    # Area
+    area_en = text("area_english")
+    area_mr = text("area_marathi", "Unknown")
+    out["area"] = np.where(area_en != "", area_en, area_mr)
+
+    # Optional fields
+    out["booth_number"] = text("booth_number", "1")
+    for field, default in OPTIONAL_TEXT_FIELDS.items():
+        if field in column_mapping:
+            out[field] = text(field, default)
+    if column_mapping.get("voter_id"):
+        epic = text("voter_id")
+        out["voter_id"] = np.array([e.upper() if e else None for e in epic], dtype=object)
+
+    if column_mapping.get("family_id"):
+        family = text("family_id")
+        out["family_id"] = np.where(family != "", family, None)
+
+    out["full_name"] = out["name"]
+    return out, invalid
+
+def _row_keys(out: Dict[str, np.ndarray], invalid: np.ndarray) -> Tuple[List[str], List[str]]:
+    """
+    Stable key and content hash of every row. The key is the EPIC number when
+    present, otherwise a digest of name, gender, booth and address; the hash
+    covers every mapped roll field. Repeated keys within a chunk are flagged
+    as invalid.
+    """
+    size = len(invalid)
+    epic = out.get("voter_id", np.full(size, None, dtype=object))
+    has_epic = pd.notna(epic)
+    keys = np.empty(size, dtype=object)
+    keys[has_epic] = "epic:" + epic[has_epic]
+    # Composite keys only for the rows without an EPIC number
+    if not has_epic.all():
+        composite = [
+            np.array([v.lower() for v in out[field][~has_epic]], dtype=object)
+            for field in ("name", "gender", "booth_number", "address") if field in out
+        ]
+        keys[~has_epic] = _row_digests(composite, "row:")
+
+    # Low-cardinality columns hash their distinct values; full_name is name
+    column_hashes = {}
+    for field in sorted(out):
+        column = out[field]
+        if id(column) not in column_hashes:
+            column_hashes[id(column)] = _column_hash(column, field in REPEATED_TEXT_FIELDS or field == "gender")
+    hashes = _row_digests([column_hashes[id(out[field])] for field in sorted(out)], "")
+
+    # Repeats of a key among the valid rows (the first one stays valid)
+    valid = np.flatnonzero(invalid == "")
+    repeated = valid[pd.Series(keys[valid]).duplicated().to_numpy()]
+    invalid[repeated] = "Duplicate row key"
+    return keys.tolist(), hashes.tolist()
+
+def _scoped_family_ids(out: Dict[str, np.ndarray], admin_id: str) -> np.ndarray:
+    """
+    Explicit family / house numbers only identify a household within a booth
+    (every booth has a house "12"), so they are namespaced by admin and booth.
+    """
+    family = out["family_id"]
+    ids = np.full(len(family), None, dtype=object)
+    present = pd.notna(family)
+    ids[present] = f"{admin_id}:" + out["booth_number"][present] + ":" + family[present]
+    return ids
+
+def _household_ids(out: Dict[str, np.ndarray], admin_id: str) -> np.ndarray:
+    """
+    Family ids for rolls without a family column: voters of one admin sharing
+    booth and address form a household (rows without an address get none).
+    """
+    address = out["address"]
+    ids = np.full(len(address), None, dtype=object)
+    has_address = address != ""
+    if not has_address.any():
+        return ids
+    booth = out["booth_number"][has_address]
+    address = np.array([v.lower() for v in address[has_address]], dtype=object)
+    # Same admin, booth and address give the same digest, in any chunk
+    ids[has_address] = _row_digests([np.full(len(booth), admin_id, dtype=object), booth, address], "hh:")
+    return ids
+
+def chunk_keys(chunk: StagedChunk, column_mapping: Dict[str, str]) -> List[str]:
+    """
+    Stable keys of every row of a chunk, invalid ones included: a voter whose
+    row is still on the roll but fails validation is not removed by a sync.
+    """
+    out, invalid = _map_columns(chunk, column_mapping)
+    keys, _ = _row_keys(out, invalid)
+    return list(dict.fromkeys(keys))
+
+def map_chunk(
+    chunk: StagedChunk,
+    column_mapping: Dict[str, str],
+    admin_id: str,
+    now: datetime,
+    extra: Dict[str, Any] = None
+) -> Tuple[List[Tuple[int, dict]], List[Tuple[int, str]]]:
+    """
+    Map a chunk of staged rows to voter documents in one vectorized pass.
+    Returns ([(position, voter_doc)], [(position, error_message)]) where
+    position is the row's index within the chunk. Fields in extra are set
+    on every document.
+    """
+    out, invalid = _map_columns(chunk, column_mapping)
+    if "family_id" in out:
+        # Before hashing, so re-imports rewrite ids stored unscoped
+        out["family_id"] = _scoped_family_ids(out, admin_id)
+    keys, hashes = _row_keys(out, invalid)
+    if "family_id" not in out and "address" in out:
+        out["family_id"] = _household_ids(out, admin_id)
+    out["import_key"] = np.array(keys, dtype=object)
+    out["import_hash"] = np.array(hashes, dtype=object)
+
+    defaults = {
+        "favor_score": 50.0,
+        "favor_category": "neutral",
+        "visited_status": False,
+        "voted_status": False,
+        "visit_count": 0,
+        "created_at": now,
+        "updated_at": now,
+        "imported_at": now,
+        # IMPORTANT: Assign to admin
+        "admin_id": admin_id,
+        "assigned_to": None,  # Not assigned to karyakarta yet
+        **(extra or {}),
+    }
+
+    valid_mask = invalid == ""
+    positions = np.flatnonzero(valid_mask).tolist()
+
+    # Build documents from the masked columns on top of a shared template
+    # BSON encodes tuples as arrays, so the empty arrays can share one ()
+    # instead of allocating three lists per voter for the collector to track
+    columns = list(out)
+    values = [out[c][valid_mask].tolist() for c in columns]
+    template = {**dict.fromkeys(columns), **defaults, "tags": (), "notes": (), "survey_history": ()}
+    docs = []
+    for pos, row in zip(positions, zip(*values)):
+        doc = template.copy()
+        doc.update(zip(columns, row))
+        docs.append((pos, doc))
+    errors = [(pos, invalid[pos]) for pos in np.flatnonzero(~valid_mask).tolist()]
+    return docs, errors
+
+def roll_fields(doc: dict) -> Dict[str, Any]:
+    """Fields of a mapped voter document that come from the roll itself"""
+    return {key: doc[key] for key in doc if key not in CAMPAIGN_FIELDS}
+
+class ImportWriter:
+    """
+    Buffer mapped voter documents and write them with unordered insert_many
+    (and, for re-imports, unordered bulk updates of changed voters).
+    Failed writes are reported against the row numbers of the source file.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.docs: List[dict] = []
+        self.sources: List[tuple] = []  # (chunk, position) per buffered doc
+        self.updates: List[UpdateOne] = []
+        self.update_sources: List[tuple] = []
+        self.imported_count = 0
+        self.updated_count = 0
+        self.error_count = 0
+        self.errors: List[dict] = []
+
+    def restore(self, session: dict):
+        """Carry counts over from a checkpointed import session"""
+        self.imported_count = session.get("imported_count", 0)
+        self.updated_count = session.get("updated_count", 0)
+        self.error_count = session.get("error_count", 0)
+        self.errors = list(session.get("errors") or [])
+
+    def record_error(self, row_number: int, message: str, row: dict):
+        self.error_count += 1
+        if len(self.errors) < MAX_STORED_ERRORS:
+            self.errors.append({
+                "row_number": row_number,
+                "error_message": message,
+                "row_data": row
+            })
+
+    def record_chunk_error(self, chunk: StagedChunk, pos: int, message: str):
+        self.record_error(chunk.row_number(pos), message, chunk.row(pos))
+
+    async def add(self, chunk: StagedChunk, pos: int, doc: dict):
+        self.docs.append(doc)
+        self.sources.append((chunk, pos))
+        if len(self.docs) >= self.batch_size:
+            await self._flush_inserts()
+
+    async def update(self, chunk: StagedChunk, pos: int, admin_id: str, doc: dict):
+        """Overwrite the roll fields of the stored voter with doc's import_key"""
+        self.updates.append(UpdateOne(
+            {"admin_id": admin_id, "import_key": doc["import_key"]},
+            {"$set": {**roll_fields(doc), "removed_from_roll": False}}
+        ))
+        self.update_sources.append((chunk, pos))
+        if len(self.updates) >= self.batch_size:
+            await self._flush_updates()
+
+    async def flush(self):
+        await self._flush_inserts()
+        await self._flush_updates()
+
+    async def _flush_inserts(self):
+        if not self.docs:
+            return
+        docs, sources = self.docs, self.sources
+        self.docs, self.sources = [], []
+        try:
+            result = await self.db.voters.insert_many(docs, ordered=False)
+            self.imported_count += len(result.inserted_ids)
+        except BulkWriteError as e:
+            details = e.details
+            self.imported_count += details.get("nInserted", 0)
+            for write_error in details.get("writeErrors", []):
+                chunk, pos = sources[write_error["index"]]
+                self.record_chunk_error(chunk, pos, write_error.get("errmsg", "Insert failed"))
+
+    async def _flush_updates(self):
+        if not self.updates:
+            return
+        updates, sources = self.updates, self.update_sources
+        self.updates, self.update_sources = [], []
+        try:
+            result = await self.db.voters.bulk_write(updates, ordered=False)
+            self.updated_count += result.matched_count
+        except BulkWriteError as e:
+            details = e.details
+            self.updated_count += details.get("nMatched", 0)
+            for write_error in details.get("writeErrors", []):
+                chunk, pos = sources[write_error["index"]]
+                self.record_chunk_error(chunk, pos, write_error.get("errmsg", "Update failed"))
+
+async def classify_docs(
+    db: AsyncIOMotorDatabase,
+    admin_id: str,
+    docs: List[Tuple[int, dict]]
+) -> Dict[str, List[Tuple[int, dict]]]:
+    """
+    Split mapped docs into new / changed / unchanged against the admin's
+    stored voters, with one index-covered lookup per chunk.
+    """
+    stored = {}
+    cursor = db.voters.find(
+        {"admin_id": admin_id, "import_key": {"$in": [doc["import_key"] for _, doc in docs]}},
+        {"_id": 0, "import_key": 1, "import_hash": 1}
+    )
+    async for voter in cursor:
+        stored[voter["import_key"]] = voter.get("import_hash")
+
+    classes = {"new": [], "changed": [], "unchanged": []}
+    for pos, doc in docs:
+        key = doc["import_key"]
+        if key not in stored:
+            classes["new"].append((pos, doc))
+        elif stored[key] != doc["import_hash"]:
+            classes["changed"].append((pos, doc))
+        else:
+            classes["unchanged"].append((pos, doc))
+    return classes
+
+async def find_removed(db: AsyncIOMotorDatabase, admin_id: str, file_keys: set) -> List[ObjectId]:
+    """Ids of the admin's roll voters whose key is missing from the new roll"""
+    removed = []
+    cursor = db.voters.find(
+        {"admin_id": admin_id, "import_key": {"$exists": True}, "import_hash": {"$ne": None}},
+        {"import_key": 1}
+    )
+    async for voter in cursor:
+        if voter["import_key"] not in file_keys:
+            removed.append(voter["_id"])
+    return removed
+
+async def mark_removed(
+    db: AsyncIOMotorDatabase,
+    voter_ids: List[ObjectId],
+    now: datetime,
+    session_id: str,
+    batch_size: int = IMPORT_BATCH_SIZE
+):
+    """
+    Flag voters dropped from the roll by import session_id. Campaign data is
+    kept; clearing the hash makes the voter count as changed if a later roll
+    lists it again.
+    """
+    for start in range(0, len(voter_ids), batch_size):
+        await db.voters.update_many(
+            {"_id": {"$in": voter_ids[start:start + batch_size]}},
+            {"$set": {
+                "removed_from_roll": True,
+                "import_hash": None,
+                "updated_at": now,
+                "last_import_session_id": session_id
+            }}
+        )
@@ -0,0 +1,190 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Influencer reach walks a voter graph: an influencer reaches its
+# linked_voters and its own voter (hop 1), and everyone in those voters'
+# households (hop 2). A household is the (admin_id, family_id) pair, as
+# family ids are only unique per admin. The graph is cached in memory per
+# admin, holding only the voters reachable from influencers; the least
+# recently used indexes are dropped beyond INFLUENCE_MAX_INDEXES. Unknown
+# voters are loaded on first use and changes are pulled by updated_at every
+# INFLUENCE_SYNC_SECONDS, so ranking influencers reads influencer documents
+# but not their voters. Deleted voters leave a tombstone that the sync reads.
+INFLUENCE_SYNC_SECONDS = int(os.environ.get("INFLUENCE_SYNC_SECONDS", "60"))
+INFLUENCE_MAX_INDEXES = int(os.environ.get("INFLUENCE_MAX_INDEXES", "64"))
+# updated_at is set by the app server, allow for clock skew between servers
+SYNC_OVERLAP = timedelta(seconds=5)
+
+REACH_VOTER_FIELDS = {"_id": 1, "admin_id": 1, "family_id": 1, "favor_category": 1, "removed_from_roll": 1}
+
+Household = Tuple[Optional[str], str]
+
+def household_of(voter: dict) -> Optional[Household]:
+    family = voter.get("family_id")
+    return (voter.get("admin_id"), family) if family else None
+
+def _households_query(households: Iterable[Household]) -> List[dict]:
+    """$or clauses matching the members of households, one per admin"""
+    by_admin = defaultdict(list)
+    for admin_id, family in households:
+        by_admin[admin_id].append(family)
+    return [{"admin_id": admin_id, "family_id": {"$in": families}} for admin_id, families in by_admin.items()]
+
+def influencer_seeds(influencer: dict) -> List[str]:
+    """Voter ids an influencer reaches directly"""
+    seeds = list(influencer.get("linked_voters") or [])
+    if influencer.get("voter_id"):
+        seeds.append(influencer["voter_id"])
+    return [vid for vid in seeds if ObjectId.is_valid(vid)]
+
+class ReachIndex:
+    """Voter -> household and household -> members adjacency for one admin"""
+
+    def __init__(self, admin_id: Optional[str]):
+        self.admin_id = admin_id
+        self.family_of: Dict[str, Optional[Household]] = {}
+        self.members: Dict[Household, Set[str]] = defaultdict(set)
+        self.category: Dict[str, Optional[str]] = {}
+        self.loaded_families: Set[Household] = set()
+        self.synced_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    def _forget(self, vid: str):
+        """Drop a deleted voter, keeping the id known so it is not looked up again"""
+        old_family = self.family_of.get(vid)
+        if old_family:
+            self.members[old_family].discard(vid)
+        self.family_of[vid] = None
+        self.category[vid] = None
+
+    def _put(self, voter: dict):
+        vid = str(voter["_id"])
+        old_family = self.family_of.get(vid)
+        if old_family:
+            self.members[old_family].discard(vid)
+        if voter.get("removed_from_roll"):
+            # Kept (with no category) so it is not looked up again
+            self.family_of[vid] = None
+            self.category[vid] = None
+            return
+        family = household_of(voter)
+        self.family_of[vid] = family
+        self.category[vid] = voter.get("favor_category") or "neutral"
+        if family:
+            self.members[family].add(vid)
+
+    async def _load_families(self, db: AsyncIOMotorDatabase, families: Set[Optional[Household]]):
+        families = families - self.loaded_families - {None}
+        if not families:
+            return
+        housemates = await db.voters.find(
+            {"$or": _households_query(families)}, REACH_VOTER_FIELDS
+        ).to_list(None)
+        for voter in housemates:
+            self._put(voter)
+        self.loaded_families |= families
+
+    async def _load(self, db: AsyncIOMotorDatabase, voter_ids: Iterable[str]):
+        """Index voters not seen yet, together with their whole households"""
+        missing = [ObjectId(vid) for vid in set(voter_ids) if vid not in self.family_of]
+        if not missing:
+            return
+        voters = await db.voters.find({"_id": {"$in": missing}}, REACH_VOTER_FIELDS).to_list(None)
+        for voter in voters:
+            self._put(voter)
+        await self._load_families(db, {household_of(voter) for voter in voters})
+
+    async def _sync(self, db: AsyncIOMotorDatabase):
+        """Apply voter changes made since the last sync to the indexed voters and households"""
+        now = datetime.utcnow()
+        since = self.synced_at - SYNC_OVERLAP
+        query = {"updated_at": {"$gt": since}}
+        deleted = {"deleted_at": {"$gt": since}}
+        if self.admin_id:
+            # Served by the (admin_id, updated_at) index; irrelevant voters are skipped
+            # below. Voters never given an admin can still be linked, so they are read too.
+            query["admin_id"] = deleted["admin_id"] = {"$in": [self.admin_id, None]}
+        for tombstone in await db.voter_tombstones.find(deleted, {"voter_id": 1}).to_list(None):
+            if tombstone["voter_id"] in self.family_of:
+                self._forget(tombstone["voter_id"])
+        else:
+            query["$or"] = [
+                {"_id": {"$in": [ObjectId(vid) for vid in self.family_of]}},
+                *_households_query(self.loaded_families),
+            ]
+        changed = [
+            voter for voter in await db.voters.find(query, REACH_VOTER_FIELDS).to_list(None)
+            if str(voter["_id"]) in self.family_of or household_of(voter) in self.loaded_families
+        ]
+        for voter in changed:
+            self._put(voter)
+        # Voters that moved into a household not indexed yet
+        await self._load_families(db, {household_of(voter) for voter in changed})
+        self.synced_at = now
+
+    async def ensure(self, db: AsyncIOMotorDatabase, voter_ids: Iterable[str]):
+        """Make sure the index is fresh and holds voter_ids and their households"""
+        async with self._lock:
+            if self.synced_at is None:
+                self.synced_at = datetime.utcnow()
+            elif datetime.utcnow() - self.synced_at > timedelta(seconds=INFLUENCE_SYNC_SECONDS):
+                await self._sync(db)
+            await self._load(db, voter_ids)
+
+    def reach(self, seeds: Iterable[str], hops: int = 2) -> dict:
+        """Distinct voters within hops of the seed voters, by favor category"""
+        reached = {vid for vid in seeds if self.category.get(vid)}
+        if hops >= 2:
+            for family in {self.family_of[vid] for vid in reached} - {None}:
+                reached |= self.members[family]
+        counts = defaultdict(int)
+        for vid in reached:
+            counts[self.category[vid]] += 1
+        return {
+            "voters": len(reached),
+            "supporters": counts["supporter"],
+            "neutrals": counts["neutral"],
+            "opposition": counts["opposition"],
+        }
+
+async def record_voter_deleted(db: AsyncIOMotorDatabase, voter: dict):
+    """Leave a tombstone so every server's cached indexes drop the voter at their next sync"""
+    await db.voter_tombstones.insert_one({
+        "voter_id": str(voter["_id"]),
+        "admin_id": voter.get("admin_id"),
+        "deleted_at": datetime.utcnow(),
+    })
+
+_indexes: "OrderedDict[Optional[str], ReachIndex]" = OrderedDict()
+
+def _index_for(admin_id: Optional[str]) -> ReachIndex:
+    """The cached index of an admin, evicting the least recently used ones"""
+    index = _indexes.get(admin_id)
+    if index is None:
+        index = _indexes[admin_id] = ReachIndex(admin_id)
+        while len(_indexes) > INFLUENCE_MAX_INDEXES:
+            _indexes.popitem(last=False)
+    _indexes.move_to_end(admin_id)
+    return index
+
+async def influencer_reach(db: AsyncIOMotorDatabase, influencers: List[dict], hops: int = 2) -> List[dict]:
+    """Reach of each influencer (same order), through the cached index of its admin"""
+    by_admin = defaultdict(list)
+    for influencer in influencers:
+        by_admin[influencer.get("admin_id")].append(influencer)
+    indexes = {}
+    for admin_id, group in by_admin.items():
+        indexes[admin_id] = _index_for(admin_id)
+        await indexes[admin_id].ensure(db, [vid for influencer in group for vid in influencer_seeds(influencer)])
+    return [
+        indexes[influencer.get("admin_id")].reach(influencer_seeds(influencer), hops)
+        for influencer in influencers
+    ]
@@ -38,10 +38,21 @@ class QuestionType(str, Enum):
     PHONE = "phone"
 
 # User Models
+class DailyActivity(BaseModel):
+    surveys: int = 0
+    visits: int = 0
+
 class ActivityStats(BaseModel):
     surveys_completed: int = 0
     voters_visited: int = 0
     coverage_percentage: float = 0.0
+    # Denormalized counters maintained on write (see activity.py)
+    assigned_voters: int = 0
+    visited_voters: int = 0
+    voted_voters: int = 0
+    pending_tasks: int = 0
+    daily: Dict[str, DailyActivity] = Field(default_factory=dict)  # keyed by YYYY-MM-DD
+    counters_synced: bool = False
 
 class UserBase(BaseModel):
     username: str
@@ -55,6 +66,17 @@ class UserCreate(UserBase):
     created_by: Optional[str] = None
     assigned_admin_id: Optional[str] = None
 
+class UserBulkCreate(BaseModel):
+    """Rows for bulk registration, each validated as a UserCreate on its own"""
+    users: List[Dict[str, Any]]
+
+class UserBulkResult(BaseModel):
+    index: int
+    username: Optional[str] = None
+    status: str  # created / error
+    user_id: Optional[str] = None
+    error: Optional[str] = None
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -129,6 +151,7 @@ class Voter(VoterBase):
     assigned_by: Optional[str] = None
     assigned_date: Optional[datetime] = None
     gps_coordinates: Optional[GPSCoordinates] = None
+    turf_id: Optional[str] = None
     tags: List[str] = Field(default_factory=list)
     notes: List[VoterNote] = Field(default_factory=list)
     survey_history: List[str] = Field(default_factory=list)
@@ -148,6 +171,7 @@ class VoterFilter(BaseModel):
     booth_number: Optional[str] = None
     caste: Optional[str] = None
     family_id: Optional[str] = None
+    turf_id: Optional[str] = None
     favor_score_min: Optional[float] = None
     favor_score_max: Optional[float] = None
     survey_completed: Optional[bool] = None
@@ -158,13 +182,21 @@ class VoterFilter(BaseModel):
     tags: Optional[List[str]] = None
 
 class VoterBulkUpdate(BaseModel):
-    voter_ids: List[str]
+    voter_ids: List[str] = Field(default_factory=list)
     updates: Dict[str, Any]
+    # Select voters server-side instead of (or narrowed by) voter_ids
+    filter: Optional[VoterFilter] = None
 
 class VoterAssignment(BaseModel):
-    voter_ids: List[str]
-    karyakarta_id: str
+    voter_ids: List[str] = Field(default_factory=list)
+    karyakarta_id: Optional[str] = None
     mode: str = "manual"  # manual or auto
+    # Select voters server-side instead of (or narrowed by) voter_ids. Auto
+    # mode splits them across karyakarta_ids (default: the admin's karyakartas)
+    filter: Optional[VoterFilter] = None
+    karyakarta_ids: Optional[List[str]] = None
+    keep_existing: bool = True
+    dry_run: bool = False
 
 # Survey Models
 class ConditionalLogic(BaseModel):
@@ -229,11 +261,30 @@ class TaskCreate(BaseModel):
     target_booth: Optional[str] = None
     due_date: Optional[datetime] = None
 
+class TaskBulkCreate(BaseModel):
+    """One task per assignee, from the same template"""
+    task_type: str
+    description: str
+    target_area: Optional[str] = None
+    target_booth: Optional[str] = None
+    due_date: Optional[datetime] = None
+    # Assignees: explicit karyakarta ids and/or the karyakartas holding
+    # voters in a booth/area
+    assigned_to: List[str] = Field(default_factory=list)
+    booth_number: Optional[str] = None
+    area: Optional[str] = None
+    # Fill each task's target_voters with the assignee's unvisited voters
+    # (within the booth/area when given)
+    fill_targets: bool = False
+    max_targets: Optional[int] = Field(default=None, ge=1)
+
 class Task(TaskCreate):
     id: str = Field(alias="_id")
     assigned_by: str
     status: TaskStatus = TaskStatus.PENDING
     completion_percentage: float = 0.0
+    # Targets visited so far (maintained by task_progress.py)
+    visited_targets: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
 
@@ -251,12 +302,39 @@ class Family(BaseModel):
     family_favor_score: float = 50.0
     area: Optional[str] = None
     booth_number: Optional[str] = None
+    admin_id: Optional[str] = None
+    # Counters maintained as member voters change; the flags derive from them
+    visited_members: int = 0
+    voted_members: int = 0
+    favor_score_sum: float = 0.0
     all_visited: bool = False
     all_voted: bool = False
 
     class Config:
         populate_by_name = True
 
+# Turf Models
+class TurfCut(BaseModel):
+    filter: Optional[VoterFilter] = None
+    turfs: int = Field(ge=1)
+    name_prefix: str = "Turf"
+    dry_run: bool = False
+
+class Turf(BaseModel):
+    id: str = Field(alias="_id")
+    name: str
+    cut_id: str
+    admin_id: Optional[str] = None
+    household_count: int = 0
+    voter_count: int = 0
+    centroid: Optional[Dict[str, Any]] = None  # GeoJSON point
+    radius_m: float = 0.0
+    created_by: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        populate_by_name = True
+
 # Influencer Models
 class InfluencerCreate(BaseModel):
     name: str
@@ -270,7 +348,9 @@ class InfluencerCreate(BaseModel):
 
 class Influencer(InfluencerCreate):
     id: str = Field(alias="_id")
+    admin_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
 
     class Config:
         populate_by_name = True
@@ -286,8 +366,13 @@ class Issue(IssueCreate):
     id: str = Field(alias="_id")
     reported_by: str
     status: IssueStatus = IssueStatus.OPEN
+    # Copied from the voter when reported, for area/booth queues and hotspots
+    area: Optional[str] = None
+    booth_number: Optional[str] = None
+    admin_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     resolved_at: Optional[datetime] = None
+    resolved_by: Optional[str] = None
 
     class Config:
         populate_by_name = True
@@ -0,0 +1,72 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Access tokens live for days, so deactivating a user records a revocation
+# ({_id: user_id, revoked_at}) instead. Every server process keeps the whole
+# (small) revocations collection in memory, reloaded every
+# REVOCATION_POLL_SECONDS, and rejects tokens issued before revoked_at, so
+# checking a request costs a dict lookup and no database round trip.
+REVOCATION_POLL_SECONDS = float(os.environ.get("REVOCATION_POLL_SECONDS", "5"))
+
+class RevocationList:
+    """In-memory copy of the revocations collection, kept fresh by a poller"""
+
+    def __init__(self):
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self.revoked: Dict[str, float] = {}  # user id -> revoked_at (epoch seconds)
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, payload: dict) -> bool:
+        """Whether a token's user was revoked after the token was issued"""
+        revoked_at = self.revoked.get(payload.get("sub"))
+        return revoked_at is not None and payload.get("iat", 0) <= revoked_at
+
+    async def revoke(self, db: AsyncIOMotorDatabase, user_id: str, reason: str = "deactivated"):
+        """Revoke every token issued to a user so far"""
+        now = datetime.utcnow()
+        await db.revocations.update_one(
+            {"_id": user_id},
+            {"$set": {"revoked_at": now, "reason": reason}},
+            upsert=True
+        )
+        # Effective in this process at once, in the others by the next poll
+        self.revoked[user_id] = _epoch(now)
+
+    async def reload(self):
+        docs = await self.db.revocations.find({}, {"revoked_at": 1}).to_list(None)
+        self.revoked = {doc["_id"]: _epoch(doc["revoked_at"]) for doc in docs}
+
+    def start(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.reload()
+            except Exception as e:
+                # Keep serving the last known list
+                logger.error(f"Reloading revocations failed: {str(e)}")
+            await asyncio.sleep(REVOCATION_POLL_SECONDS)
+
+def _epoch(when: datetime) -> float:
+    """Naive UTC datetime (as stored by Mongo) to epoch seconds"""
+    return (when - datetime(1970, 1, 1)).total_seconds()
+
+revocation_list = RevocationList()
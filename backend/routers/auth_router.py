@@ -1,21 +1,38 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, UploadFile, File
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
+from pydantic import ValidationError
 from bson import ObjectId
 from datetime import datetime
+from typing import List
+import pandas as pd
 import logging
+import io
+import os
 
 from models import (
-    User, UserCreate, UserLogin, Token, UserRole, ActivityStats
+    User, UserCreate, UserBulkCreate, UserBulkResult, UserLogin, Token, UserRole, ActivityStats
 )
 from auth import (
-    get_password_hash, verify_password, create_access_token,
+    get_password_hash_async, verify_password_async, create_access_token,
     get_current_user, require_role
 )
+from hashing import hash_many
+from revocations import revocation_list
 from database import get_database
+from serialization import DocumentProjector, fast_response, wants_columnar
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 logger = logging.getLogger(__name__)
 
+user_projector = DocumentProjector(User)
+USER_DICTIONARY_COLUMNS = ("role", "created_by", "assigned_admin_id")
+# Rows accepted per bulk registration request
+BULK_REGISTER_MAX_ROWS = int(os.environ.get("BULK_REGISTER_MAX_ROWS", "2000"))
+
+# The one role each creator may register
+CREATABLE_ROLE = {"super_admin": UserRole.ADMIN, "admin": UserRole.KARYAKARTA}
+
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_data: UserCreate,
@@ -54,7 +71,7 @@ async def register_user(
     
     # Create user document
     user_dict = user_data.model_dump(exclude={"password"})
-    user_dict["password_hash"] = get_password_hash(user_data.password)
+    user_dict["password_hash"] = await get_password_hash_async(user_data.password)
     user_dict["created_by"] = current_user["sub"]
     user_dict["created_at"] = datetime.utcnow()
     user_dict["last_login"] = None
@@ -72,6 +89,136 @@ async def register_user(
     logger.info(f"User {user_data.username} registered successfully by {current_user['username']}")
     return User(**user_dict)
 
+async def _register_rows(rows: List[dict], current_user: dict, db: AsyncIOMotorDatabase) -> dict:
+    """
+    Register many users with per-row results. Rows are validated and checked
+    for duplicates up front (one query for the whole batch), passwords are
+    hashed in parallel across processes and the users go in with one insert_many
+    """
+    if len(rows) > BULK_REGISTER_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_REGISTER_MAX_ROWS} users per request"
+        )
+    
+    allowed_role = CREATABLE_ROLE[current_user["role"]]
+    results = [UserBulkResult(index=i, username=row.get("username"), status="error") for i, row in enumerate(rows)]
+    valid = []  # (index, UserCreate)
+    seen_usernames, seen_emails = set(), set()
+    for i, row in enumerate(rows):
+        try:
+            user_data = UserCreate.model_validate({"role": allowed_role, **row})
+        except ValidationError as e:
+            results[i].error = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            continue
+        if user_data.role != allowed_role:
+            results[i].error = f"{current_user['role']} can only create {allowed_role.value} users"
+        elif user_data.username in seen_usernames or user_data.email in seen_emails:
+            results[i].error = "Duplicate username or email in this batch"
+        else:
+            valid.append((i, user_data))
+        seen_usernames.add(user_data.username)
+        seen_emails.add(user_data.email)
+    
+    # One lookup for every username/email in the batch
+    if valid:
+        existing = await db.users.find(
+            {"$or": [
+                {"username": {"$in": [u.username for _, u in valid]}},
+                {"email": {"$in": [u.email for _, u in valid]}}
+            ]},
+            {"username": 1, "email": 1}
+        ).to_list(None)
+        taken_usernames = {u["username"] for u in existing}
+        taken_emails = {u["email"] for u in existing}
+        for i, user_data in valid:
+            if user_data.username in taken_usernames or user_data.email in taken_emails:
+                results[i].error = "Username or email already registered"
+        valid = [(i, u) for i, u in valid if results[i].error is None]
+    
+    if valid:
+        hashes = await hash_many([u.password for _, u in valid])
+        now = datetime.utcnow()
+        docs = []
+        for (i, user_data), password_hash in zip(valid, hashes):
+            user_dict = user_data.model_dump(exclude={"password"})
+            user_dict["password_hash"] = password_hash
+            user_dict["created_by"] = current_user["sub"]
+            user_dict["created_at"] = now
+            user_dict["last_login"] = None
+            user_dict["active_status"] = True
+            user_dict["activity_stats"] = ActivityStats().model_dump()
+            if user_data.role == UserRole.KARYAKARTA:
+                user_dict["assigned_admin_id"] = current_user["sub"]
+            docs.append(user_dict)
+        
+        # Unique indexes still reject users registered since the lookup
+        failed = {}
+        try:
+            await db.users.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                failed[write_error["index"]] = write_error.get("errmsg", "Insert failed")
+        for pos, ((i, _), doc) in enumerate(zip(valid, docs)):
+            if pos in failed:
+                results[i].error = "Username or email already registered" if "E11000" in failed[pos] else failed[pos]
+            else:
+                results[i].status = "created"
+                results[i].user_id = str(doc["_id"])
+    
+    created = sum(1 for r in results if r.status == "created")
+    logger.info(f"Bulk registration by {current_user['username']}: {created} of {len(rows)} users created")
+    return {
+        "created": created,
+        "failed": len(rows) - created,
+        "results": [r.model_dump() for r in results]
+    }
+
+@router.post("/register/bulk")
+async def register_users_bulk(
+    bulk_data: UserBulkCreate,
+    current_user: dict = Depends(require_role(["super_admin", "admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Register many users at once (same role rules as /register); role defaults
+    to the one the caller may create. Returns a result per row
+    """
+    return await _register_rows(bulk_data.users, current_user, db)
+
+@router.post("/register/bulk-csv")
+async def register_users_bulk_csv(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(require_role(["super_admin", "admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Register users from a CSV with username, email, full_name, password and
+    optional phone/role columns. Returns a result per row
+    """
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only CSV files are supported"
+        )
+    
+    try:
+        df = pd.read_csv(io.BytesIO(await file.read()), dtype=str, keep_default_na=False)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read CSV: {str(e)}"
+        )
+    
+    # Blank cells are missing values
+    rows = [
+        {k.strip(): v.strip() for k, v in record.items() if v.strip()}
+        for record in df.to_dict("records")
+    ]
+    return await _register_rows(rows, current_user, db)
+
 @router.post("/login", response_model=Token)
 async def login(
     login_data: UserLogin,
@@ -90,7 +237,7 @@ async def login(
         )
     
     # Verify password
-    if not verify_password(login_data.password, user["password_hash"]):
+    if not await verify_password_async(login_data.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
@@ -147,7 +294,9 @@ async def get_current_user_info(
 
 @router.get("/users", response_model=list[User])
 async def get_users(
+    request: Request,
     role: str = None,
+    layout: str = None,
     current_user: dict = Depends(require_role(["super_admin", "admin"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -164,13 +313,12 @@ async def get_users(
     if role:
         query["role"] = role
     
-    users = await db.users.find(query).to_list(1000)
-    
-    for user in users:
-        user["_id"] = str(user["_id"])
-        user.pop("password_hash", None)
+    # Projection never reads password_hash
+    users = await db.users.find(query, user_projector.projection).to_list(1000)
     
-    return [User(**user) for user in users]
+    if wants_columnar(request, layout):
+        return fast_response(user_projector.columnar(users, USER_DICTIONARY_COLUMNS))
+    return fast_response(user_projector.project_many(users))
 
 @router.put("/users/{user_id}/deactivate")
 async def deactivate_user(
@@ -203,6 +351,8 @@ async def deactivate_user(
         {"_id": ObjectId(user_id)},
         {"$set": {"active_status": False}}
     )
+    # Existing tokens stop working within seconds on every server
+    await revocation_list.revoke(db, user_id)
     
     return {"message": "User deactivated successfully"}
 
@@ -234,7 +384,7 @@ async def create_initial_super_admin(
         "full_name": full_name,
         "phone": None,
         "role": UserRole.SUPER_ADMIN,
-        "password_hash": get_password_hash(password),
+        "password_hash": await get_password_hash_async(password),
         "created_by": None,
         "assigned_admin_id": None,
         "created_at": datetime.utcnow(),
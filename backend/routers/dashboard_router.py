@@ -1,69 +1,98 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from datetime import datetime, timedelta
 import logging
+import os
 
+from activity import activity_scope, day_key, prune_activity_days, recompute_activity_stats, stale_days
 from auth import get_current_user, require_role
+from cache import SnapshotCache
 from database import get_database
+from versions import check_versions, make_etag, not_modified
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 logger = logging.getLogger(__name__)
 
+# Admin/super-admin dashboards are served from a stale-while-revalidate cache
+dashboard_cache = SnapshotCache(
+    fresh_for=float(os.environ.get("DASHBOARD_CACHE_FRESH_SECONDS", "30")),
+    max_stale=float(os.environ.get("DASHBOARD_CACHE_MAX_STALE_SECONDS", "300")),
+)
+
+async def _cached_dashboard(key, compute, request: Request, response: Response):
+    """Serve a dashboard snapshot from cache and report its age"""
+    async def stamped():
+        return {**await compute(), "generated_at": datetime.utcnow()}
+    
+    snapshot, age = await dashboard_cache.get(key, stamped)
+    # A snapshot never changes once built, so its timestamp is its version
+    cached = not_modified(request, response, make_etag(key, snapshot["generated_at"]))
+    if cached:
+        return cached
+    return {**snapshot, "snapshot_age_seconds": round(age, 3)}
+
 @router.get("/karyakarta")
 async def get_karyakarta_dashboard(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(require_role(["karyakarta"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get karyakarta dashboard data"""
-    query = {"assigned_to": current_user["sub"]}
+    cached = await check_versions(
+        request, response, db, [activity_scope(current_user["sub"])], day_key()
+    )
+    if cached:
+        return cached
     
-    # Voter stats
-    total_assigned = await db.voters.count_documents(query)
-    visited = await db.voters.count_documents({**query, "visited_status": True})
-    voted = await db.voters.count_documents({**query, "voted_status": True})
-    
-    # Survey stats
-    total_surveys = await db.surveys.count_documents({"karyakarta_id": current_user["sub"]})
+    user = await db.users.find_one(
+        {"_id": ObjectId(current_user["sub"])},
+        {"activity_stats": 1}
+    )
+    stats = (user or {}).get("activity_stats") or {}
     
-    # Tasks
-    pending_tasks = await db.tasks.count_documents({
-        "assigned_to": current_user["sub"],
-        "status": "pending"
-    })
+    # Counters are maintained on write; rebuild once if they are missing or stale
+    if not stats.get("counters_synced"):
+        stats = await recompute_activity_stats(db, current_user["sub"])
+    else:
+        await prune_activity_days(db, current_user["sub"], stale_days(stats.get("daily") or {}))
     
-    # Today's activity
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_surveys = await db.surveys.count_documents({
-        "karyakarta_id": current_user["sub"],
-        "timestamp": {"$gte": today_start}
-    })
-    
-    today_visits = await db.voters.count_documents({
-        "visited_by": current_user["sub"],
-        "visited_date": {"$gte": today_start}
-    })
+    total_assigned = stats.get("assigned_voters", 0)
+    visited = stats.get("visited_voters", 0)
+    today = stats.get("daily", {}).get(day_key(), {})
     
     return {
         "assigned_voters": total_assigned,
         "visited_voters": visited,
-        "voted_voters": voted,
+        "voted_voters": stats.get("voted_voters", 0),
         "coverage_percentage": (visited / total_assigned * 100) if total_assigned > 0 else 0,
-        "total_surveys": total_surveys,
-        "pending_tasks": pending_tasks,
-        "today_surveys": today_surveys,
-        "today_visits": today_visits
+        "total_surveys": stats.get("surveys_completed", 0),
+        "pending_tasks": stats.get("pending_tasks", 0),
+        "today_surveys": today.get("surveys", 0),
+        "today_visits": today.get("visits", 0)
     }
 
 @router.get("/admin")
 async def get_admin_dashboard(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(require_role(["admin"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get admin dashboard data"""
+    admin_id = current_user["sub"]
+    return await _cached_dashboard(
+        ("admin", admin_id),
+        lambda: _compute_admin_dashboard(db, admin_id),
+        request, response
+    )
+
+async def _compute_admin_dashboard(db: AsyncIOMotorDatabase, admin_id: str) -> dict:
+    """Compute admin dashboard data"""
     # Get all karyakartas under this admin
     karyakartas = await db.users.find({
-        "assigned_admin_id": current_user["sub"],
+        "assigned_admin_id": admin_id,
         "role": "karyakarta"
     }).to_list(1000)
     
@@ -107,10 +136,20 @@ async def get_admin_dashboard(
 
 @router.get("/super-admin")
 async def get_super_admin_dashboard(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(require_role(["super_admin"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get super admin dashboard data"""
+    return await _cached_dashboard(
+        "super_admin",
+        lambda: _compute_super_admin_dashboard(db),
+        request, response
+    )
+
+async def _compute_super_admin_dashboard(db: AsyncIOMotorDatabase) -> dict:
+    """Compute super admin dashboard data"""
     # Overall stats
     total_voters = await db.voters.count_documents({})
     visited = await db.voters.count_documents({"visited_status": True})
@@ -0,0 +1,159 @@
+from fastapi import APIRouter, HTTPException, Depends, Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from datetime import datetime
+from typing import Optional
+from collections import defaultdict
+from pymongo import ReturnDocument
+import logging
+
+from models import Family, Voter
+from activity import ActivityUpdate
+from auth import get_current_user, require_role
+from database import get_database
+from families import inc_family, materialize_families
+from task_progress import record_target_visits
+from serialization import DocumentProjector, MsgPackRoute, fast_response
+
+router = APIRouter(prefix="/families", tags=["families"], route_class=MsgPackRoute)
+logger = logging.getLogger(__name__)
+
+family_projector = DocumentProjector(Family)
+member_projector = DocumentProjector(Voter)
+
+async def _family_scope(current_user: dict, db: AsyncIOMotorDatabase) -> dict:
+    """Query restricting families to what the current user may see"""
+    if current_user["role"] == "admin":
+        return {"admin_id": current_user["sub"]}
+    if current_user["role"] == "karyakarta":
+        # Households with at least one voter assigned to the karyakarta
+        family_ids = await db.voters.distinct(
+            "family_id", {"assigned_to": current_user["sub"], "family_id": {"$ne": None}}
+        )
+        return {"family_id": {"$in": family_ids}}
+    return {}
+
+async def _get_family(family_id: str, current_user: dict, db: AsyncIOMotorDatabase) -> dict:
+    """Look a family up by document id or family_id, enforcing access"""
+    key = {"_id": ObjectId(family_id)} if ObjectId.is_valid(family_id) else {"family_id": family_id}
+    family = await db.families.find_one({**key, **await _family_scope(current_user, db)})
+    if not family:
+        raise HTTPException(status_code=404, detail="Family not found")
+    return family
+
+@router.get("/")
+async def get_families(
+    request: Request,
+    area: Optional[str] = None,
+    booth_number: Optional[str] = None,
+    all_visited: Optional[bool] = None,
+    all_voted: Optional[bool] = None,
+    page: int = 1,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get families with their visit/vote rollups"""
+    query = await _family_scope(current_user, db)
+    if area:
+        query["area"] = area
+    if booth_number:
+        query["booth_number"] = booth_number
+    if all_visited is not None:
+        query["all_visited"] = all_visited
+    if all_voted is not None:
+        query["all_voted"] = all_voted
+    
+    skip = (page - 1) * limit
+    cursor = db.families.find(query, family_projector.projection).sort("family_id", 1).skip(skip).limit(limit)
+    families = await cursor.to_list(length=limit)
+    
+    return fast_response(family_projector.project_many(families), request=request)
+
+@router.post("/rebuild")
+async def rebuild_families(
+    admin_id: Optional[str] = None,
+    current_user: dict = Depends(require_role(["super_admin", "admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Rebuild all families of an admin from their voters"""
+    if current_user["role"] == "admin":
+        admin_id = current_user["sub"]
+    if not admin_id:
+        raise HTTPException(status_code=400, detail="admin_id is required")
+    
+    count = await materialize_families(db, admin_id)
+    return {"message": f"{count} families rebuilt"}
+
+@router.get("/{family_id}")
+async def get_family(
+    family_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get a specific family"""
+    family = await _get_family(family_id, current_user, db)
+    return fast_response(family_projector.project(family), request=request)
+
+@router.get("/{family_id}/members")
+async def get_family_members(
+    family_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get the voters of a family"""
+    family = await _get_family(family_id, current_user, db)
+    
+    cursor = db.voters.find(
+        {"family_id": family["family_id"], "removed_from_roll": {"$ne": True}},
+        member_projector.projection
+    ).sort("age", -1)
+    members = await cursor.to_list(length=None)
+    
+    return fast_response(member_projector.project_many(members), request=request)
+
+@router.post("/{family_id}/mark-visited")
+async def mark_family_visited(
+    family_id: str,
+    current_user: dict = Depends(require_role(["karyakarta", "admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Mark every not yet visited member of a household as visited"""
+    family = await _get_family(family_id, current_user, db)
+    now = datetime.utcnow()
+    
+    pending = {"family_id": family["family_id"], "visited_status": {"$ne": True}, "removed_from_roll": {"$ne": True}}
+    members = await db.voters.find(pending, {"_id": 1}).to_list(None)
+    
+    # Flip each member on its own, so only the request that actually flips a
+    # member counts it (a concurrent visit of the same voter finds it visited)
+    flipped = []
+    owners = defaultdict(int)
+    for member in members:
+        previous = await db.voters.find_one_and_update(
+            {"_id": member["_id"], **pending},
+            {
+                "$set": {"visited_status": True, "visited_by": current_user["sub"], "visited_date": now},
+                "$inc": {"visit_count": 1}
+            },
+            projection={"assigned_to": 1, "visited_by": 1, "visited_date": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous:
+            flipped.append(previous)
+            owners[previous.get("assigned_to")] += 1
+    visited = len(flipped)
+    
+    if visited:
+        await inc_family(db, family["family_id"], visited=visited)
+        activity = ActivityUpdate(now)
+        activity.add(current_user["sub"], {"voters_visited": visited})
+        activity.add_visits(current_user["sub"], flipped)
+        for owner, count in owners.items():
+            activity.add(owner, {"visited_voters": count})
+        await record_target_visits(db, [str(voter["_id"]) for voter in flipped], activity)
+        await activity.apply(db)
+    
+    return {"message": f"{visited} household members marked as visited"}
@@ -1,215 +1,272 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 from bson import ObjectId
 from datetime import datetime
 import pandas as pd
-import io
+import asyncio
 import logging
-from typing import Dict, List
+import os
+import tempfile
+from typing import Dict
 
 from auth import get_current_user, require_role
 from database import get_database
+from import_jobs import FINISHED_STATUSES, IMPORT_MODES, STARTABLE_STATUSES, import_worker, progress_view
+from import_pipeline import IMPORT_BATCH_SIZE, StagedChunk
 
 router = APIRouter(prefix="/import", tags=["import"])
 logger = logging.getLogger(__name__)
 
+# Uploads are spooled to disk and staged in chunks of this many rows
+IMPORT_CHUNK_ROWS = int(os.environ.get("IMPORT_CHUNK_ROWS", "5000"))
+IMPORT_SPOOL_DIR = os.environ.get("IMPORT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "voter_imports"))
+UPLOAD_BLOCK_BYTES = 1024 * 1024
+
+def _spool_path(session_id: str, filename: str) -> str:
+    os.makedirs(IMPORT_SPOOL_DIR, exist_ok=True)
+    suffix = os.path.splitext(filename or "")[1].lower()
+    return os.path.join(IMPORT_SPOOL_DIR, f"{session_id}{suffix}")
+
+async def _spool_upload(file: UploadFile, path: str) -> int:
+    """Stream the upload to disk without holding it in memory"""
+    size = 0
+    with open(path, "wb") as out:
+        while True:
+            block = await file.read(UPLOAD_BLOCK_BYTES)
+            if not block:
+                break
+            out.write(block)
+            size += len(block)
+    return size
+
+def _iter_chunks(path: str):
+    """
+    Yield DataFrame chunks of IMPORT_CHUNK_ROWS rows (CSV streamed, Excel sliced).
+    Cells are kept as text; typing happens in the vectorized mapping stage.
+    """
+    if not path.endswith((".xls", ".xlsx")):
+        try:
+            reader = pd.read_csv(path, chunksize=IMPORT_CHUNK_ROWS, dtype=str)
+            first = next(reader, None)
+        except (UnicodeDecodeError, pd.errors.ParserError):
+            reader, first = None, None
+        if reader is not None:
+            if first is not None:
+                yield first
+                yield from reader
+            return
+    # Excel cannot be read incrementally; slice it so staging stays chunked
+    df = pd.read_excel(path, dtype=str)
+    for start in range(0, len(df), IMPORT_CHUNK_ROWS):
+        yield df.iloc[start:start + IMPORT_CHUNK_ROWS]
+
 @router.post("/upload-csv")
 async def upload_csv_file(
     file: UploadFile = File(...),
     current_user: dict = Depends(require_role(["super_admin"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Upload CSV file and return preview with column headers"""
+    """
+    Upload CSV/Excel file and return preview with column headers.
+    The file is streamed to disk, parsed in chunks and staged in temp_imports
+    as one column-wise document per chunk (expired by TTL if the session is
+    abandoned).
+    """
+    session_id = ObjectId()
+    path = _spool_path(str(session_id), file.filename)
     try:
-        contents = await file.read()
+        await _spool_upload(file, path)
         
-        # Try to read as CSV
-        try:
-            df = pd.read_csv(io.BytesIO(contents))
-        except:
-            # Try Excel
-            df = pd.read_excel(io.BytesIO(contents))
+        chunks = _iter_chunks(path)
+        columns = None
+        preview = []
+        total_rows = 0
+        chunk_index = 0
         
-        # Get column headers
-        columns = df.columns.tolist()
+        while True:
+            # pandas parsing is blocking; keep it off the event loop
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            staged = await asyncio.to_thread(StagedChunk.from_frame, chunk)
+            if columns is None:
+                columns = staged["column_names"]
+                preview = [
+                    dict(zip(columns, row))
+                    for row in zip(*[values[:5] for values in staged["values"]])
+                ]
+            
+            await db.temp_imports.insert_one({
+                "session_id": str(session_id),
+                "chunk_index": chunk_index,
+                "row_offset": total_rows,
+                **staged,
+                "created_at": datetime.utcnow()
+            })
+            total_rows += staged["row_count"]
+            chunk_index += 1
         
-        # Get first 5 rows as preview
-        preview = df.head(5).to_dict('records')
+        if columns is None:
+            raise ValueError("File contains no rows")
         
-        # Store temporary file info in database
+        # Store import session info in database
         import_session = {
+            "_id": session_id,
             "uploaded_by": current_user["sub"],
             "filename": file.filename,
-            "total_rows": len(df),
+            "total_rows": total_rows,
+            "total_chunks": chunk_index,
             "columns": columns,
             "preview": preview,
             "status": "pending_mapping",
             "created_at": datetime.utcnow()
         }
-        
-        result = await db.import_sessions.insert_one(import_session)
-        import_session["_id"] = str(result.inserted_id)
-        
-        # Store the dataframe as JSON temporarily
-        df_json = df.to_dict('records')
-        await db.temp_imports.insert_one({
-            "session_id": str(result.inserted_id),
-            "data": df_json,
-            "created_at": datetime.utcnow()
-        })
+        await db.import_sessions.insert_one(import_session)
         
         return {
-            "session_id": str(result.inserted_id),
+            "session_id": str(session_id),
             "columns": columns,
             "preview": preview,
-            "total_rows": len(df)
+            "total_rows": total_rows
         }
     except Exception as e:
         logger.error(f"Error uploading CSV: {str(e)}")
+        await db.temp_imports.delete_many({"session_id": str(session_id)})
         raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
 
-@router.post("/map-columns")
+@router.post("/map-columns", status_code=202)
 async def map_columns(
     session_id: str,
     column_mapping: Dict[str, str],
     admin_id: str,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    mode: str = "insert",
+    dry_run: bool = False,
     current_user: dict = Depends(require_role(["super_admin"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Map CSV columns to voter fields and import data for specific admin"""
+    """
+    Map CSV columns to voter fields and queue the import for a specific admin.
+    The import runs in the background; poll /import/sessions/{id}/progress.
+    Resubmitting a queued, running or finished session returns its progress,
+    and resubmitting a failed one resumes it from its last checkpoint.
+    
+    mode="sync" re-imports a revised roll: rows are matched to the admin's
+    voters by EPIC number (or a name/gender/booth/address key) and only new
+    or changed rows are written, keeping campaign data on existing voters.
+    dry_run=true only computes the new/changed/unchanged/removed diff; the
+    session can then be submitted again to apply it.
+    """
     try:
+        if dry_run:
+            mode = "sync"
+        if mode not in IMPORT_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid import mode: {mode}")
+        
         # Get admin user
         admin = await db.users.find_one({"_id": ObjectId(admin_id)})
         if not admin or admin["role"] != "admin":
             raise HTTPException(status_code=400, detail="Invalid admin user")
         
-        # Get temp data
-        temp_data = await db.temp_imports.find_one({"session_id": session_id})
-        if not temp_data:
+        session = await db.import_sessions.find_one({"_id": ObjectId(session_id)})
+        if not session:
             raise HTTPException(status_code=404, detail="Import session not found")
         
-        df_data = temp_data["data"]
-        
-        # Process and import voters
-        imported_count = 0
-        error_count = 0
-        errors = []
-        
-        for idx, row in enumerate(df_data):
-            try:
-                # Map columns
-                voter_data = {}
-                
-                # Required fields
-                name_en = row.get(column_mapping.get("name_english", ""), "")
-                name_mr = row.get(column_mapping.get("name_marathi", ""), "")
-                voter_data["name"] = name_en or name_mr
-                
-                # Age
-                age_field = column_mapping.get("age")
-                if age_field:
-                    try:
-                        voter_data["age"] = int(row.get(age_field, 18))
-                    except:
-                        voter_data["age"] = 18
-                
-                # Gender
-                gender_field = column_mapping.get("gender")
-                if gender_field:
-                    gender_val = str(row.get(gender_field, "")).lower()
-                    if "male" in gender_val or "पु" in gender_val:
-                        voter_data["gender"] = "male"
-                    elif "female" in gender_val or "स्त्री" in gender_val:
-                        voter_data["gender"] = "female"
-                    else:
-                        voter_data["gender"] = "other"
-                else:
-                    voter_data["gender"] = "male"
-                
-                # Area
-                area_en = row.get(column_mapping.get("area_english", ""), "")
-                area_mr = row.get(column_mapping.get("area_marathi", ""), "")
-                voter_data["area"] = area_en or area_mr or "Unknown"
-                
-                # Optional fields
-                if "booth_number" in column_mapping:
-                    voter_data["booth_number"] = str(row.get(column_mapping["booth_number"], "1"))
-                else:
-                    voter_data["booth_number"] = "1"
-                
-                if "ward" in column_mapping:
-                    voter_data["ward"] = str(row.get(column_mapping["ward"], ""))
-                
-                if "phone" in column_mapping:
-                    voter_data["phone"] = str(row.get(column_mapping["phone"], ""))
-                
-                if "caste" in column_mapping:
-                    voter_data["caste"] = str(row.get(column_mapping["caste"], ""))
-                
-                if "address" in column_mapping:
-                    voter_data["address"] = str(row.get(column_mapping["address"], ""))
-                
-                # Set defaults
-                voter_data["full_name"] = voter_data["name"]
-                voter_data["favor_score"] = 50.0
-                voter_data["favor_category"] = "neutral"
-                voter_data["visited_status"] = False
-                voter_data["voted_status"] = False
-                voter_data["visit_count"] = 0
-                voter_data["tags"] = []
-                voter_data["notes"] = []
-                voter_data["survey_history"] = []
-                voter_data["created_at"] = datetime.utcnow()
-                voter_data["updated_at"] = datetime.utcnow()
-                voter_data["imported_at"] = datetime.utcnow()
-                
-                # IMPORTANT: Assign to admin
-                voter_data["admin_id"] = admin_id
-                voter_data["assigned_to"] = None  # Not assigned to karyakarta yet
-                
-                # Insert voter
-                await db.voters.insert_one(voter_data)
-                imported_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                errors.append({
-                    "row_number": idx + 1,
-                    "error_message": str(e),
-                    "row_data": row
-                })
-        
-        # Update import session
-        await db.import_sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {
-                "$set": {
-                    "status": "completed",
-                    "imported_count": imported_count,
-                    "error_count": error_count,
-                    "errors": errors[:100],  # Store first 100 errors
-                    "admin_id": admin_id,
-                    "completed_at": datetime.utcnow()
-                }
+        if session["status"] in STARTABLE_STATUSES:
+            # Staged chunks for this session
+            if not await db.temp_imports.find_one({"session_id": session_id}, {"_id": 1}):
+                raise HTTPException(status_code=404, detail="Import data expired, please upload again")
+            
+            job = {
+                "status": "queued",
+                "column_mapping": column_mapping,
+                "admin_id": admin_id,
+                "batch_size": batch_size,
+                "mode": mode,
+                "dry_run": dry_run,
+                "cancel_requested": False,
+                "lease_until": None,
+                "error": None,
+                "queued_at": datetime.utcnow()
             }
-        )
-        
-        # Clean up temp data
-        await db.temp_imports.delete_one({"session_id": session_id})
-        
-        logger.info(f"Imported {imported_count} voters for admin {admin['username']}")
+            if session["status"] != "failed":
+                job.update({
+                    "next_chunk": 0,
+                    "processed_rows": 0,
+                    "imported_count": 0,
+                    "updated_count": 0,
+                    "error_count": 0,
+                    "errors": [],
+                    "diff": None
+                })
+            # Status filter makes a retried request a no-op
+            session = await db.import_sessions.find_one_and_update(
+                {"_id": session["_id"], "status": session["status"]},
+                {"$set": job},
+                return_document=ReturnDocument.AFTER
+            ) or await db.import_sessions.find_one({"_id": session["_id"]})
+            import_worker.notify()
+            logger.info(f"Queued {mode} import {session_id} for admin {admin['username']}")
         
         return {
-            "message": "Import completed",
-            "imported_count": imported_count,
-            "error_count": error_count,
-            "errors": errors[:10]  # Return first 10 errors
+            "message": "Import queued",
+            **progress_view(session)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error mapping columns: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/sessions/{session_id}/progress")
+async def get_import_progress(
+    session_id: str,
+    current_user: dict = Depends(require_role(["super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get progress of an import job (rows done, errors, ETA)"""
+    session = await db.import_sessions.find_one({"_id": ObjectId(session_id)}, {"preview": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Import session not found")
+    
+    return progress_view(session)
+
+@router.post("/sessions/{session_id}/cancel")
+async def cancel_import(
+    session_id: str,
+    current_user: dict = Depends(require_role(["super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Cancel a queued or running import; rows already imported are kept"""
+    session_oid = ObjectId(session_id)
+    
+    # Not picked up yet: cancel directly
+    result = await db.import_sessions.update_one(
+        {"_id": session_oid, "status": {"$in": STARTABLE_STATUSES + ["queued"]}},
+        {"$set": {"status": "cancelled", "completed_at": datetime.utcnow()}}
+    )
+    if result.modified_count:
+        await db.temp_imports.delete_many({"session_id": session_id})
+    else:
+        # Running: the worker stops at its next checkpoint
+        result = await db.import_sessions.update_one(
+            {"_id": session_oid, "status": "running"},
+            {"$set": {"cancel_requested": True}}
+        )
+    
+    session = await db.import_sessions.find_one({"_id": session_oid}, {"preview": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Import session not found")
+    if not result.modified_count and session["status"] in FINISHED_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Import already {session['status']}")
+    
+    return progress_view(session)
+
 @router.get("/sessions")
 async def get_import_sessions(
     current_user: dict = Depends(require_role(["super_admin"])),
@@ -0,0 +1,182 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from datetime import datetime
+from typing import Optional
+from pymongo import ReturnDocument
+import logging
+
+from models import Influencer, InfluencerCreate
+from auth import require_role
+from database import get_database
+from influence import influencer_reach
+from serialization import DocumentProjector, MsgPackRoute, fast_response
+
+router = APIRouter(prefix="/influencers", tags=["influencers"], route_class=MsgPackRoute)
+logger = logging.getLogger(__name__)
+
+influencer_projector = DocumentProjector(Influencer)
+
+def _influencer_scope(current_user: dict) -> dict:
+    """Query restricting influencers to what the current user may see"""
+    if current_user["role"] == "admin":
+        return {"admin_id": current_user["sub"]}
+    return {}
+
+async def _get_influencer(influencer_id: str, current_user: dict, db: AsyncIOMotorDatabase) -> dict:
+    if not ObjectId.is_valid(influencer_id):
+        raise HTTPException(status_code=404, detail="Influencer not found")
+    influencer = await db.influencers.find_one({"_id": ObjectId(influencer_id), **_influencer_scope(current_user)})
+    if not influencer:
+        raise HTTPException(status_code=404, detail="Influencer not found")
+    return influencer
+
+async def _validate_links(influencer_data: InfluencerCreate, admin_id: Optional[str], db: AsyncIOMotorDatabase):
+    """Linked voters must exist and, for an admin's influencer, belong to that admin (or to no admin yet)"""
+    ids = set(influencer_data.linked_voters + ([influencer_data.voter_id] if influencer_data.voter_id else []))
+    if not all(ObjectId.is_valid(vid) for vid in ids):
+        raise HTTPException(status_code=400, detail="Invalid voter id")
+    if not 1 <= influencer_data.influence_level <= 5:
+        raise HTTPException(status_code=400, detail="influence_level must be between 1 and 5")
+    if not ids:
+        return
+    query = {"_id": {"$in": [ObjectId(vid) for vid in ids]}}
+    if admin_id:
+        query["admin_id"] = {"$in": [admin_id, None]}
+    if await db.voters.count_documents(query) != len(ids):
+        raise HTTPException(status_code=400, detail="Linked voters not found")
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_influencer(
+    influencer_data: InfluencerCreate,
+    request: Request,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Create a new influencer"""
+    admin_id = current_user["sub"] if current_user["role"] == "admin" else None
+    await _validate_links(influencer_data, admin_id, db)
+    
+    influencer_dict = influencer_data.model_dump()
+    influencer_dict["linked_voters"] = list(dict.fromkeys(influencer_dict["linked_voters"]))
+    influencer_dict["admin_id"] = admin_id
+    influencer_dict["created_at"] = datetime.utcnow()
+    influencer_dict["updated_at"] = influencer_dict["created_at"]
+    
+    result = await db.influencers.insert_one(influencer_dict)
+    influencer_dict["_id"] = result.inserted_id
+    
+    logger.info(f"Influencer {influencer_data.name} created by {current_user['username']}")
+    return fast_response(influencer_projector.project(influencer_dict), status_code=status.HTTP_201_CREATED, request=request)
+
+@router.get("/")
+async def get_influencers(
+    request: Request,
+    area: Optional[str] = None,
+    min_level: Optional[int] = None,
+    page: int = 1,
+    limit: int = 50,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get influencers, highest influence level first"""
+    query = _influencer_scope(current_user)
+    if area:
+        query["area"] = area
+    if min_level is not None:
+        query["influence_level"] = {"$gte": min_level}
+    
+    skip = (page - 1) * limit
+    cursor = db.influencers.find(query, influencer_projector.projection).sort(
+        [("influence_level", -1), ("_id", 1)]
+    ).skip(skip).limit(limit)
+    influencers = await cursor.to_list(length=limit)
+    
+    return fast_response(influencer_projector.project_many(influencers), request=request)
+
+@router.get("/top")
+async def get_top_influencers(
+    request: Request,
+    area: Optional[str] = None,
+    hops: int = Query(2, ge=1, le=2),
+    limit: int = 10,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Rank influencers (optionally in one area) by the number of voters they reach"""
+    query = _influencer_scope(current_user)
+    if area:
+        query["area"] = area
+    influencers = await db.influencers.find(query, influencer_projector.projection).to_list(None)
+    reaches = await influencer_reach(db, influencers, hops)
+    
+    ranked = sorted(
+        zip(influencers, reaches),
+        key=lambda pair: (pair[1]["voters"], pair[1]["supporters"], pair[0].get("influence_level", 1)),
+        reverse=True
+    )[:limit]
+    return fast_response([
+        {**influencer_projector.project(influencer), "reach": reach} for influencer, reach in ranked
+    ], request=request)
+
+@router.get("/{influencer_id}")
+async def get_influencer(
+    influencer_id: str,
+    request: Request,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get a specific influencer"""
+    influencer = await _get_influencer(influencer_id, current_user, db)
+    return fast_response(influencer_projector.project(influencer), request=request)
+
+@router.get("/{influencer_id}/reach")
+async def get_influencer_reach(
+    influencer_id: str,
+    hops: int = Query(2, ge=1, le=2),
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Distinct voters an influencer reaches: linked voters (1 hop), plus
+    everyone in their households (2 hops), split by favor category
+    """
+    influencer = await _get_influencer(influencer_id, current_user, db)
+    reach = (await influencer_reach(db, [influencer], hops))[0]
+    return {"influencer_id": influencer_id, "hops": hops, **reach}
+
+@router.put("/{influencer_id}")
+async def update_influencer(
+    influencer_id: str,
+    influencer_data: InfluencerCreate,
+    request: Request,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Update an influencer"""
+    existing = await _get_influencer(influencer_id, current_user, db)
+    await _validate_links(influencer_data, existing.get("admin_id"), db)
+    
+    update_data = influencer_data.model_dump()
+    update_data["linked_voters"] = list(dict.fromkeys(update_data["linked_voters"]))
+    update_data["updated_at"] = datetime.utcnow()
+    
+    influencer = await db.influencers.find_one_and_update(
+        {"_id": ObjectId(influencer_id)},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    return fast_response(influencer_projector.project(influencer), request=request)
+
+@router.delete("/{influencer_id}")
+async def delete_influencer(
+    influencer_id: str,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Delete an influencer"""
+    await _get_influencer(influencer_id, current_user, db)
+    await db.influencers.delete_one({"_id": ObjectId(influencer_id)})
+    
+    logger.info(f"Influencer {influencer_id} deleted by {current_user['username']}")
+    return {"message": "Influencer deleted successfully"}
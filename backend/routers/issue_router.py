@@ -0,0 +1,212 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from datetime import datetime
+from typing import Optional
+from pymongo import ReturnDocument
+import logging
+
+from models import Issue, IssueCreate, IssueStatus
+from auth import get_current_user, require_role
+from database import get_database
+from hotspots import inc_hotspot, rebuild_hotspots
+from serialization import DocumentProjector, MsgPackRoute, fast_response
+
+router = APIRouter(prefix="/issues", tags=["issues"], route_class=MsgPackRoute)
+logger = logging.getLogger(__name__)
+
+issue_projector = DocumentProjector(Issue)
+
+def _issue_scope(current_user: dict) -> dict:
+    """Query restricting issues to what the current user may see"""
+    if current_user["role"] == "admin":
+        return {"admin_id": current_user["sub"]}
+    if current_user["role"] == "karyakarta":
+        return {"reported_by": current_user["sub"]}
+    return {}
+
+def _encode_cursor(issue: dict) -> str:
+    return f"{issue['priority']}:{issue['_id']}"
+
+def _after_cursor(cursor: str) -> dict:
+    """Issues after cursor in (priority desc, _id asc) order"""
+    try:
+        priority, last_id = cursor.split(":")
+        priority, last_id = int(priority), ObjectId(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"priority": {"$lt": priority}},
+        {"priority": priority, "_id": {"$gt": last_id}}
+    ]}
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_issue(
+    issue_data: IssueCreate,
+    request: Request,
+    current_user: dict = Depends(require_role(["karyakarta", "admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Report an issue raised by a voter"""
+    if not 1 <= issue_data.priority <= 5:
+        raise HTTPException(status_code=400, detail="priority must be between 1 and 5")
+    if not ObjectId.is_valid(issue_data.voter_id):
+        raise HTTPException(status_code=400, detail="Invalid voter id")
+    voter = await db.voters.find_one(
+        {"_id": ObjectId(issue_data.voter_id)},
+        {"area": 1, "booth_number": 1, "admin_id": 1, "assigned_to": 1}
+    )
+    if not voter:
+        raise HTTPException(status_code=404, detail="Voter not found")
+    if current_user["role"] == "karyakarta" and voter.get("assigned_to") != current_user["sub"]:
+        raise HTTPException(status_code=403, detail="Not authorized to report for this voter")
+    # Same ownership as the voter lists; voters created before they carried an
+    # admin_id get one from POST /voters/admins/backfill
+    if current_user["role"] == "admin" and voter.get("admin_id") != current_user["sub"]:
+        raise HTTPException(status_code=403, detail="Not authorized to report for this voter")
+    
+    issue_dict = issue_data.model_dump()
+    issue_dict["reported_by"] = current_user["sub"]
+    issue_dict["status"] = IssueStatus.OPEN.value
+    issue_dict["area"] = voter.get("area")
+    issue_dict["booth_number"] = voter.get("booth_number")
+    issue_dict["admin_id"] = voter.get("admin_id")
+    issue_dict["created_at"] = datetime.utcnow()
+    
+    result = await db.issues.insert_one(issue_dict)
+    issue_dict["_id"] = result.inserted_id
+    await inc_hotspot(db, issue_dict, opened=1)
+    
+    logger.info(f"Issue {issue_data.issue_type} reported by {current_user['username']}")
+    return fast_response(issue_projector.project(issue_dict), status_code=status.HTTP_201_CREATED, request=request)
+
+@router.get("/")
+async def get_issues(
+    request: Request,
+    response: Response,
+    status: Optional[IssueStatus] = IssueStatus.OPEN,
+    area: Optional[str] = None,
+    booth_number: Optional[str] = None,
+    issue_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Issue queue, highest priority first (oldest first within a priority).
+    Keyset paginated: pass the X-Next-Cursor response header back as cursor.
+    """
+    query = _issue_scope(current_user)
+    if status:
+        query["status"] = status.value
+    if area:
+        query["area"] = area
+    if booth_number:
+        query["booth_number"] = booth_number
+    if issue_type:
+        query["issue_type"] = issue_type
+    if cursor:
+        query.update(_after_cursor(cursor))
+    
+    issues = await db.issues.find(query, issue_projector.projection).sort(
+        [("priority", -1), ("_id", 1)]
+    ).limit(limit).to_list(length=limit)
+    
+    if len(issues) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(issues[-1])
+    return fast_response(issue_projector.project_many(issues), response, request=request)
+
+@router.get("/hotspots")
+async def get_hotspots(
+    request: Request,
+    area: Optional[str] = None,
+    issue_type: Optional[str] = None,
+    limit: int = 20,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Open issue counts by area and issue type, largest first (precomputed counters)"""
+    query = {"open": {"$gt": 0}}
+    if area:
+        query["area"] = area
+    if issue_type:
+        query["issue_type"] = issue_type
+    
+    if current_user["role"] == "admin":
+        query["admin_id"] = current_user["sub"]
+        hotspots = await db.issue_hotspots.find(
+            query, {"_id": 0, "area": 1, "issue_type": 1, "open": 1, "resolved": 1, "total": 1}
+        ).sort("open", -1).limit(limit).to_list(limit)
+    else:
+        # Counters are kept per admin; summing them is cheap
+        hotspots = await db.issue_hotspots.aggregate([
+            {"$match": query},
+            {"$group": {
+                "_id": {"area": "$area", "issue_type": "$issue_type"},
+                "open": {"$sum": "$open"},
+                "resolved": {"$sum": "$resolved"},
+                "total": {"$sum": "$total"}
+            }},
+            {"$sort": {"open": -1}},
+            {"$limit": limit},
+            {"$project": {"_id": 0, "area": "$_id.area", "issue_type": "$_id.issue_type", "open": 1, "resolved": 1, "total": 1}}
+        ]).to_list(limit)
+    
+    return fast_response(hotspots, request=request)
+
+@router.post("/hotspots/rebuild")
+async def rebuild_issue_hotspots(
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Recompute hotspot counters from the issues"""
+    admin_ids = [current_user["sub"]] if current_user["role"] == "admin" else None
+    count = await rebuild_hotspots(db, admin_ids)
+    return {"message": f"{count} hotspot counters rebuilt"}
+
+@router.get("/{issue_id}")
+async def get_issue(
+    issue_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get a specific issue"""
+    if not ObjectId.is_valid(issue_id):
+        raise HTTPException(status_code=404, detail="Issue not found")
+    issue = await db.issues.find_one({"_id": ObjectId(issue_id), **_issue_scope(current_user)})
+    if not issue:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    return fast_response(issue_projector.project(issue), request=request)
+
+@router.put("/{issue_id}/resolve")
+async def resolve_issue(
+    issue_id: str,
+    request: Request,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Resolve an open issue"""
+    if not ObjectId.is_valid(issue_id):
+        raise HTTPException(status_code=404, detail="Issue not found")
+    scope = {"_id": ObjectId(issue_id), **_issue_scope(current_user)}
+    
+    # Only the open -> resolved transition counts, so a repeated resolve is a no-op
+    issue = await db.issues.find_one_and_update(
+        {**scope, "status": IssueStatus.OPEN.value},
+        {"$set": {
+            "status": IssueStatus.RESOLVED.value,
+            "resolved_at": datetime.utcnow(),
+            "resolved_by": current_user["sub"]
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+    if issue:
+        await inc_hotspot(db, issue, resolved=1)
+    else:
+        issue = await db.issues.find_one(scope)
+        if not issue:
+            raise HTTPException(status_code=404, detail="Issue not found")
+    
+    return fast_response(issue_projector.project(issue), request=request)
@@ -1,19 +1,32 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 import logging
 
 from models import (
     SurveyTemplate, SurveyTemplateCreate, Survey, SurveySubmit
 )
+from activity import inc_activity
+from geo import location_fields
 from auth import get_current_user, require_role
 from database import get_database
+from serialization import DocumentProjector, MsgPackRoute, fast_response, wants_columnar
+from versions import bump_version, check_versions
 
-router = APIRouter(prefix="/surveys", tags=["surveys"])
+router = APIRouter(prefix="/surveys", tags=["surveys"], route_class=MsgPackRoute)
 logger = logging.getLogger(__name__)
 
+survey_projector = DocumentProjector(Survey)
+SURVEY_DICTIONARY_COLUMNS = ("voter_id", "template_id", "karyakarta_id", "device_id")
+
+def _survey_list(request: Request, layout: Optional[str], surveys: List[dict]):
+    """Encode a survey list in the layout the client asked for"""
+    if wants_columnar(request, layout):
+        return fast_response(survey_projector.columnar(surveys, SURVEY_DICTIONARY_COLUMNS), request=request)
+    return fast_response(survey_projector.project_many(surveys), request=request)
+
 @router.post("/templates", response_model=SurveyTemplate)
 async def create_survey_template(
     template_data: SurveyTemplateCreate,
@@ -28,16 +41,25 @@ async def create_survey_template(
     
     result = await db.survey_templates.insert_one(template_dict)
     template_dict["_id"] = str(result.inserted_id)
+    await bump_version(db, "survey_templates")
     
     logger.info(f"Survey template '{template_data.template_name}' created by {current_user['username']}")
     return SurveyTemplate(**template_dict)
 
 @router.get("/templates", response_model=List[SurveyTemplate])
 async def get_survey_templates(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get all survey templates"""
+    cached = await check_versions(
+        request, response, db, ["survey_templates"], current_user["role"], current_user["sub"]
+    )
+    if cached:
+        return cached
+    
     query = {"active_status": True}
     
     # Super Admin sees all, Admin sees default + their own
@@ -74,11 +96,12 @@ async def get_survey_template(
 
 @router.post("/submit", response_model=Survey)
 async def submit_survey(
+    request: Request,
     survey_data: SurveySubmit,
     current_user: dict = Depends(require_role(["karyakarta", "admin"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Submit a completed survey"""
+    """Submit a completed survey (JSON or application/msgpack body and response)"""
     # Verify voter exists
     voter = await db.voters.find_one({"_id": ObjectId(survey_data.voter_id)})
     if not voter:
@@ -106,42 +129,53 @@ async def submit_survey(
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
+    # First GPS fix taken at the voter's door locates the voter
+    located = location_fields(survey_dict.get("gps_location"))
+    if located:
+        await db.voters.update_one(
+            {"_id": ObjectId(survey_data.voter_id), "location": {"$exists": False}},
+            {"$set": located}
+        )
     
     # Update user stats
-    await db.users.update_one(
-        {"_id": ObjectId(current_user["sub"])},
-        {"$inc": {"activity_stats.surveys_completed": 1}}
+    await inc_activity(
+        db, current_user["sub"],
+        {"surveys_completed": 1},
+        daily={"surveys": 1},
+        when=survey_dict["timestamp"]
     )
     
     logger.info(f"Survey submitted for voter {voter.get('full_name')} by {current_user['username']}")
-    return Survey(**survey_dict)
+    return fast_response(survey_projector.project(survey_dict), request=request)
 
 @router.get("/voter/{voter_id}", response_model=List[Survey])
 async def get_voter_surveys(
+    request: Request,
     voter_id: str,
+    layout: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get all surveys for a voter"""
-    surveys = await db.surveys.find({"voter_id": voter_id}).sort("timestamp", -1).to_list(100)
+    surveys = await db.surveys.find(
+        {"voter_id": voter_id}, survey_projector.projection
+    ).sort("timestamp", -1).to_list(100)
     
-    for survey in surveys:
-        survey["_id"] = str(survey["_id"])
-    
-    return [Survey(**s) for s in surveys]
+    return _survey_list(request, layout, surveys)
 
 @router.get("/my-surveys", response_model=List[Survey])
 async def get_my_surveys(
+    request: Request,
+    layout: Optional[str] = None,
     current_user: dict = Depends(require_role(["karyakarta"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get all surveys submitted by current karyakarta"""
-    surveys = await db.surveys.find({"karyakarta_id": current_user["sub"]}).sort("timestamp", -1).to_list(100)
-    
-    for survey in surveys:
-        survey["_id"] = str(survey["_id"])
+    surveys = await db.surveys.find(
+        {"karyakarta_id": current_user["sub"]}, survey_projector.projection
+    ).sort("timestamp", -1).to_list(100)
     
-    return [Survey(**s) for s in surveys]
+    return _survey_list(request, layout, surveys)
 
 @router.get("/statistics")
 async def get_survey_statistics(
@@ -1,17 +1,23 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from datetime import datetime
 from typing import List, Optional
 import logging
 
-from models import Task, TaskCreate, TaskStatus
+from models import Task, TaskBulkCreate, TaskCreate, TaskStatus
+from activity import inc_activity, inc_activity_many
 from auth import get_current_user, require_role
 from database import get_database
+from serialization import DocumentProjector, fast_response
+from task_progress import initial_progress, task_scope
+from versions import check_versions
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 logger = logging.getLogger(__name__)
 
+task_projector = DocumentProjector(Task)
+
 @router.post("/", response_model=Task)
 async def create_task(
     task_data: TaskCreate,
@@ -29,30 +35,123 @@ async def create_task(
     task_dict["status"] = TaskStatus.PENDING
     task_dict["completion_percentage"] = 0.0
     task_dict["created_at"] = datetime.utcnow()
+    task_dict["target_voters"] = list(dict.fromkeys(task_dict["target_voters"]))
+    # Targets visited before the task was created already count
+    task_dict.update(await initial_progress(db, task_dict["target_voters"]))
     
     result = await db.tasks.insert_one(task_dict)
     task_dict["_id"] = str(result.inserted_id)
     
+    pending = 1 if task_dict["status"] == TaskStatus.PENDING else 0
+    await inc_activity(db, task_data.assigned_to, {"pending_tasks": pending}, scopes=[task_scope(task_data.assigned_to)])
+    
     logger.info(f"Task assigned to {user['username']} by {current_user['username']}")
     return Task(**task_dict)
 
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def create_tasks_bulk(
+    bulk: TaskBulkCreate,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Create the same task for many karyakartas (a team, or everyone working a booth/area)"""
+    selector = {}
+    if bulk.booth_number:
+        selector["booth_number"] = bulk.booth_number
+    if bulk.area:
+        selector["area"] = bulk.area
+    if current_user["role"] == "admin":
+        selector["admin_id"] = current_user["sub"]
+    
+    explicit = list(dict.fromkeys(bulk.assigned_to))
+    if not all(ObjectId.is_valid(uid) for uid in explicit):
+        raise HTTPException(status_code=400, detail="Invalid user id")
+    working = []
+    if bulk.booth_number or bulk.area:
+        holders = await db.voters.distinct("assigned_to", {**selector, "assigned_to": {"$ne": None}})
+        working = [uid for uid in holders if uid not in explicit and ObjectId.is_valid(uid)]
+    if not explicit and not working:
+        raise HTTPException(status_code=400, detail="No assignees selected")
+    
+    # Validate every assignee with one query
+    user_query = {"_id": {"$in": [ObjectId(uid) for uid in explicit + working]}, "role": "karyakarta"}
+    if current_user["role"] == "admin":
+        user_query["assigned_admin_id"] = current_user["sub"]
+    found = {str(u["_id"]) for u in await db.users.find(user_query, {"_id": 1}).to_list(None)}
+    missing = [uid for uid in explicit if uid not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Karyakartas not found: {', '.join(missing)}")
+    # Voters of the booth/area may still be held by karyakartas outside the team
+    skipped = [uid for uid in working if uid not in found]
+    assignee_ids = explicit + [uid for uid in working if uid in found]
+    if not assignee_ids:
+        raise HTTPException(status_code=400, detail="No assignees selected")
+    
+    targets = {}
+    if bulk.fill_targets:
+        pipeline = [
+            {"$match": {
+                **selector,
+                "assigned_to": {"$in": assignee_ids},
+                "visited_status": {"$ne": True},
+                "removed_from_roll": {"$ne": True}
+            }},
+            {"$sort": {"booth_number": 1, "_id": 1}},
+            {"$group": {"_id": "$assigned_to", "voter_ids": {"$push": {"$toString": "$_id"}}}}
+        ]
+        if bulk.max_targets:
+            pipeline.append({"$project": {"voter_ids": {"$slice": ["$voter_ids", bulk.max_targets]}}})
+        targets = {doc["_id"]: doc["voter_ids"] async for doc in db.voters.aggregate(pipeline)}
+    
+    now = datetime.utcnow()
+    template = bulk.model_dump(include={"task_type", "description", "target_area", "target_booth", "due_date"})
+    tasks = [
+        {
+            **template,
+            "assigned_to": uid,
+            "target_voters": targets.get(uid, []),
+            "assigned_by": current_user["sub"],
+            "status": TaskStatus.PENDING,
+            "completion_percentage": 0.0,
+            "visited_targets": 0,
+            "created_at": now
+        }
+        for uid in assignee_ids
+    ]
+    result = await db.tasks.insert_many(tasks, ordered=False)
+    
+    await inc_activity_many(db, assignee_ids, {"pending_tasks": 1}, [task_scope(uid) for uid in assignee_ids])
+    
+    logger.info(f"{len(tasks)} {bulk.task_type} tasks created by {current_user['username']}")
+    return {
+        "message": f"{len(tasks)} tasks created successfully",
+        "created": len(tasks),
+        "task_ids": [str(tid) for tid in result.inserted_ids],
+        "skipped": skipped
+    }
+
 @router.get("/assigned-to-me", response_model=List[Task])
 async def get_my_tasks(
+    request: Request,
+    response: Response,
     status: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Get tasks assigned to current user"""
+    cached = await check_versions(
+        request, response, db, [task_scope(current_user["sub"])], status
+    )
+    if cached:
+        return cached
+    
     query = {"assigned_to": current_user["sub"]}
     if status:
         query["status"] = status
     
-    tasks = await db.tasks.find(query).sort("created_at", -1).to_list(100)
-    
-    for task in tasks:
-        task["_id"] = str(task["_id"])
+    tasks = await db.tasks.find(query, task_projector.projection).sort("created_at", -1).to_list(100)
     
-    return [Task(**t) for t in tasks]
+    return fast_response(task_projector.project_many(tasks), response)
 
 @router.put("/{task_id}", response_model=Task)
 async def update_task_status(
@@ -83,6 +182,13 @@ async def update_task_status(
         {"$set": update_data}
     )
     
+    # Keep the assignee's pending task counter in step with status changes
+    was_pending = task.get("status") == TaskStatus.PENDING
+    is_pending = status == TaskStatus.PENDING
+    await inc_activity(
+        db, task["assigned_to"], {"pending_tasks": is_pending - was_pending}, scopes=[task_scope(task["assigned_to"])]
+    )
+    
     updated_task = await db.tasks.find_one({"_id": ObjectId(task_id)})
     updated_task["_id"] = str(updated_task["_id"])
     
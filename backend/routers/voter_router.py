@@ -1,21 +1,102 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Request, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from datetime import datetime
 from typing import List, Optional
+from pymongo import ReturnDocument
 import pandas as pd
 import io
 import logging
 
 from models import (
-    Voter, VoterCreate, VoterFilter, VoterBulkUpdate, VoterAssignment, Gender
+    Voter, VoterCreate, VoterFilter, VoterBulkUpdate, VoterAssignment, Gender, Turf, TurfCut
 )
+from activity import ActivityUpdate, inc_activity, invalidate_activity_stats
+from assignment import apply_plan, load_voters, plan_assignment, summarize_plan
+from bulk_ops import fail_abandoned_bulk_jobs, run_bulk_write
+from geo import backfill_voter_locations, geo_point, valid_coordinates
+from hotspots import adopt_issues, rebuild_hotspots
+from influence import record_voter_deleted
+from families import FAMILY_VOTER_FIELDS, inc_family, refresh_families, scoped_family_id, scoped_family_id_expr
+from task_progress import record_target_visits
+from turfs import cut_turfs
 from auth import get_current_user, require_role
 from database import get_database
+from serialization import DocumentProjector, MsgPackRoute, fast_response, wants_columnar
 
-router = APIRouter(prefix="/voters", tags=["voters"])
+router = APIRouter(prefix="/voters", tags=["voters"], route_class=MsgPackRoute)
 logger = logging.getLogger(__name__)
 
+voter_projector = DocumentProjector(Voter)
+turf_projector = DocumentProjector(Turf)
+
+# Low-cardinality strings dictionary-coded in the columnar layout
+VOTER_DICTIONARY_COLUMNS = (
+    "gender", "caste", "sub_caste", "religion", "area", "ward", "booth_number",
+    "booth_name", "pincode", "favor_category", "assigned_to", "assigned_by", "visited_by",
+)
+
+# Voter fields that feed the per-karyakarta activity counters
+COUNTED_VOTER_FIELDS = {"assigned_to", "visited_status", "voted_status"}
+
+def voter_filter_query(voter_filter: Optional[VoterFilter], current_user: dict) -> dict:
+    """Mongo query for a VoterFilter, restricted to what the user may see"""
+    query = {}
+    f = voter_filter or VoterFilter()
+    
+    if f.search:
+        query["$text"] = {"$search": f.search}
+    if f.gender:
+        query["gender"] = f.gender
+    if f.age_min is not None or f.age_max is not None:
+        query["age"] = {}
+        if f.age_min is not None:
+            query["age"]["$gte"] = f.age_min
+        if f.age_max is not None:
+            query["age"]["$lte"] = f.age_max
+    for field in ("area", "ward", "booth_number", "caste", "family_id", "turf_id"):
+        value = getattr(f, field)
+        if value:
+            query[field] = value
+    if f.favor_score_min is not None or f.favor_score_max is not None:
+        query["favor_score"] = {}
+        if f.favor_score_min is not None:
+            query["favor_score"]["$gte"] = f.favor_score_min
+        if f.favor_score_max is not None:
+            query["favor_score"]["$lte"] = f.favor_score_max
+    if f.survey_completed is not None:
+        query["survey_history.0"] = {"$exists": f.survey_completed}
+    if f.visited is not None:
+        query["visited_status"] = f.visited
+    if f.voted is not None:
+        query["voted_status"] = f.voted
+    if f.assigned_user:
+        query["assigned_to"] = f.assigned_user
+    if f.tags:
+        query["tags"] = {"$all": f.tags}
+    
+    # Role-based filtering last so it cannot be overridden by the filter
+    if current_user["role"] == "karyakarta":
+        query["assigned_to"] = current_user["sub"]
+    elif current_user["role"] == "admin":
+        query["admin_id"] = current_user["sub"]
+    return query
+
+def _selection_query(voter_ids: List[str], voter_filter: Optional[VoterFilter], current_user: dict) -> dict:
+    """Query for a bulk selection given by a filter and/or explicit ids"""
+    if voter_filter is None and not voter_ids:
+        raise HTTPException(status_code=400, detail="voter_ids or filter is required")
+    query = voter_filter_query(voter_filter, current_user)
+    if voter_ids:
+        query["_id"] = {"$in": [ObjectId(vid) for vid in voter_ids]}
+    return query
+
+def _bulk_response(response: Response, result: dict, verb: str) -> dict:
+    if result["status"] == "running":
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": f"{result['total']} voters are being {verb} in the background", **result}
+    return {"message": f"{result['modified']} voters {verb} successfully", **result}
+
 @router.post("/", response_model=Voter, status_code=status.HTTP_201_CREATED)
 async def create_voter(
     voter_data: VoterCreate,
@@ -24,6 +105,11 @@ async def create_voter(
 ):
     """Create a new voter"""
     voter_dict = voter_data.model_dump()
+    # Same ownership as imported voters, so admin-scoped queries find it
+    voter_dict["admin_id"] = current_user["sub"] if current_user["role"] == "admin" else None
+    voter_dict["family_id"] = scoped_family_id(
+        voter_dict["admin_id"], voter_dict.get("booth_number"), voter_dict.get("family_id")
+    )
     voter_dict["created_at"] = datetime.utcnow()
     voter_dict["updated_at"] = datetime.utcnow()
     voter_dict["favor_score"] = 50.0
@@ -44,16 +130,18 @@ async def create_voter(
     
     result = await db.voters.insert_one(voter_dict)
     voter_dict["_id"] = str(result.inserted_id)
+    await refresh_families(db, voter_dict.get("admin_id"), [voter_dict.get("family_id")])
     
     logger.info(f"Voter {voter_dict['full_name']} created by {current_user['username']}")
     return Voter(**voter_dict)
 
 @router.get("/", response_model=dict)
 async def get_voters(
+    request: Request,
     page: int = 1,
     limit: int = 50,
     search: Optional[str] = None,
-    gender: Optional[str] = None,
+    gender: Optional[Gender] = None,
     age_min: Optional[int] = None,
     age_max: Optional[int] = None,
     area: Optional[str] = None,
@@ -61,64 +149,28 @@ async def get_voters(
     booth_number: Optional[str] = None,
     caste: Optional[str] = None,
     family_id: Optional[str] = None,
+    turf_id: Optional[str] = None,
     favor_score_min: Optional[float] = None,
     favor_score_max: Optional[float] = None,
     visited: Optional[bool] = None,
     voted: Optional[bool] = None,
     assigned_to: Optional[str] = None,
+    layout: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get voters with advanced filtering and pagination"""
-    query = {}
-    
-    # Role-based filtering - CRITICAL: Data isolation
-    if current_user["role"] == "karyakarta":
-        # Karyakarta sees only assigned voters
-        query["assigned_to"] = current_user["sub"]
-    elif current_user["role"] == "admin":
-        # Admin sees only their voters (assigned by Super Admin)
-        query["admin_id"] = current_user["sub"]
-        if assigned_to:
-            # Can filter by karyakarta within their team
-            query["assigned_to"] = assigned_to
-    # Super Admin sees all voters (no query restriction)
-    
-    # Text search
-    if search:
-        query["$text"] = {"$search": search}
-    
-    # Filters
-    if gender:
-        query["gender"] = gender
-    if age_min is not None or age_max is not None:
-        query["age"] = {}
-        if age_min is not None:
-            query["age"]["$gte"] = age_min
-        if age_max is not None:
-            query["age"]["$lte"] = age_max
-    if area:
-        query["area"] = area
-    if ward:
-        query["ward"] = ward
-    if booth_number:
-        query["booth_number"] = booth_number
-    if caste:
-        query["caste"] = caste
-    if family_id:
-        query["family_id"] = family_id
-    if favor_score_min is not None or favor_score_max is not None:
-        query["favor_score"] = {}
-        if favor_score_min is not None:
-            query["favor_score"]["$gte"] = favor_score_min
-        if favor_score_max is not None:
-            query["favor_score"]["$lte"] = favor_score_max
-    if visited is not None:
-        query["visited_status"] = visited
-    if voted is not None:
-        query["voted_status"] = voted
-    if assigned_to:
-        query["assigned_to"] = assigned_to
+    """
+    Get voters with advanced filtering and pagination
+    Pass layout=columnar (or Accept: application/vnd.columnar+json) for the compact layout;
+    Accept: application/msgpack switches the wire format to MessagePack
+    """
+    query = voter_filter_query(VoterFilter(
+        search=search, gender=gender, age_min=age_min, age_max=age_max,
+        area=area, ward=ward, booth_number=booth_number, caste=caste,
+        family_id=family_id, turf_id=turf_id,
+        favor_score_min=favor_score_min, favor_score_max=favor_score_max,
+        visited=visited, voted=voted, assigned_user=assigned_to
+    ), current_user)
     
     # Get total count
     total = await db.voters.count_documents(query)
@@ -127,19 +179,162 @@ async def get_voters(
     skip = (page - 1) * limit
     
     # Get voters
-    cursor = db.voters.find(query).skip(skip).limit(limit).sort("created_at", -1)
+    cursor = db.voters.find(query, voter_projector.projection).skip(skip).limit(limit).sort("created_at", -1)
     voters = await cursor.to_list(length=limit)
     
-    for voter in voters:
-        voter["_id"] = str(voter["_id"])
+    if wants_columnar(request, layout):
+        rows = voter_projector.columnar(voters, VOTER_DICTIONARY_COLUMNS)
+    else:
+        rows = voter_projector.project_many(voters)
     
-    return {
-        "voters": [Voter(**v) for v in voters],
+    return fast_response({
+        "voters": rows,
         "total": total,
         "page": page,
         "limit": limit,
         "pages": (total + limit - 1) // limit
-    }
+    }, request=request)
+
+@router.get("/nearby", response_model=dict)
+async def get_nearby_voters(
+    request: Request,
+    lat: float,
+    lng: float,
+    radius: float = 500,
+    limit: int = 50,
+    visited: Optional[bool] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get voters within radius metres of a point, nearest first (distance_m per voter)"""
+    if not valid_coordinates(lat, lng):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    
+    query = voter_filter_query(VoterFilter(visited=visited), current_user)
+    voters = await db.voters.aggregate([
+        {"$geoNear": {
+            "near": geo_point(lat, lng),
+            "distanceField": "distance_m",
+            "maxDistance": radius,
+            "query": query,
+            "spherical": True
+        }},
+        {"$limit": min(limit, 500)},
+        {"$project": {**voter_projector.projection, "distance_m": 1}}
+    ]).to_list(None)
+    
+    rows = []
+    for voter in voters:
+        row = voter_projector.project(voter)
+        row["distance_m"] = round(voter["distance_m"], 1)
+        rows.append(row)
+    
+    return fast_response({"voters": rows, "total": len(rows)}, request=request)
+
+@router.post("/geo/backfill")
+async def backfill_locations(
+    current_user: dict = Depends(require_role(["super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Build GeoJSON locations from voter GPS coordinates and survey GPS fixes"""
+    return await backfill_voter_locations(db)
+
+@router.post("/admins/backfill")
+async def backfill_voter_admins(
+    current_user: dict = Depends(require_role(["super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Give voters created without an admin_id (and their issues) the admin of
+    the karyakarta they are assigned to. Unassigned ones cannot be attributed
+    and are counted.
+    """
+    unowned = {"admin_id": None, "assigned_to": {"$nin": [None, ""]}}
+    karyakarta_ids = [ObjectId(k) for k in await db.voters.distinct("assigned_to", unowned) if ObjectId.is_valid(k)]
+    karyakartas = await db.users.find(
+        {"_id": {"$in": karyakarta_ids}, "assigned_admin_id": {"$nin": [None, ""]}},
+        {"assigned_admin_id": 1}
+    ).to_list(None)
+    
+    now = datetime.utcnow()
+    updated = 0
+    adopted_by = set()  # admins that took over issues
+    for karyakarta in karyakartas:
+        admin_id = karyakarta["assigned_admin_id"]
+        query = {"admin_id": None, "assigned_to": str(karyakarta["_id"])}
+        family_ids = await db.voters.distinct("family_id", query)
+        voter_ids = [str(vid) for vid in await db.voters.distinct("_id", query)]
+        # Manual family ids of unowned voters carry an empty admin scope
+        # (":booth:number"); give them the admin's
+        result = await db.voters.update_many(query, [{"$set": {
+            "admin_id": admin_id,
+            "updated_at": now,
+            "family_id": {"$cond": [
+                {"$eq": [{"$substrCP": [{"$ifNull": ["$family_id", ""]}, 0, 1]}, ":"]},
+                {"$concat": [admin_id, "$family_id"]},
+                "$family_id"
+            ]},
+        }}])
+        updated += result.modified_count
+        if await adopt_issues(db, voter_ids, admin_id):
+            adopted_by.add(admin_id)
+        # The families move from the unowned pool to the admin's
+        await refresh_families(db, None, family_ids)
+        await refresh_families(db, admin_id, [
+            f"{admin_id}{fid}" if fid and fid.startswith(":") else fid for fid in family_ids
+        ])
+    
+    if adopted_by:
+        # Moved issues leave the unowned bucket for their admins' counters
+        await rebuild_hotspots(db, [None, *adopted_by])
+    
+    unattributed = await db.voters.count_documents({"admin_id": None})
+    logger.info(f"Backfilled admin_id on {updated} voters, {unattributed} left without an admin")
+    return {"updated": updated, "unattributed": unattributed}
+
+@router.post("/turfs/cut")
+async def cut_voter_turfs(
+    cut: TurfCut,
+    request: Request,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Cluster the filtered, geolocated voters into compact turfs of nearly equal
+    household counts and tag the voters with their turf_id
+    """
+    query = voter_filter_query(cut.filter, current_user)
+    admin_id = query.get("admin_id")
+    try:
+        result = await cut_turfs(
+            db, query, cut.turfs, admin_id, current_user["sub"], cut.name_prefix, cut.dry_run
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return fast_response({
+        "message": f"{result['households']} households cut into {len(result['turfs'])} turfs",
+        "dry_run": cut.dry_run,
+        **result,
+        "turfs": turf_projector.project_many(result["turfs"])
+    }, request=request)
+
+@router.get("/turfs")
+async def get_turfs(
+    request: Request,
+    cut_id: Optional[str] = None,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get turfs, most recent cut first"""
+    query = {}
+    if current_user["role"] == "admin":
+        query["admin_id"] = current_user["sub"]
+    if cut_id:
+        query["cut_id"] = cut_id
+    
+    turfs = await db.turfs.find(query, turf_projector.projection).sort([("created_at", -1), ("name", 1)]).to_list(None)
+    return fast_response(turf_projector.project_many(turfs), request=request)
 
 @router.get("/{voter_id}", response_model=Voter)
 async def get_voter(
@@ -184,12 +379,20 @@ async def update_voter(
         if surname:
             parts.append(surname)
         update_data["full_name"] = " ".join(parts)
+    if update_data.get("family_id"):
+        update_data["family_id"] = scoped_family_id(
+            voter.get("admin_id"), update_data.get("booth_number", voter.get("booth_number")), update_data["family_id"]
+        )
     
     await db.voters.update_one(
         {"_id": ObjectId(voter_id)},
         {"$set": update_data}
     )
     
+    # Moving to another household changes both families' membership
+    if "family_id" in update_data and update_data["family_id"] != voter.get("family_id"):
+        await refresh_families(db, voter.get("admin_id"), [voter.get("family_id"), update_data["family_id"]])
+    
     updated_voter = await db.voters.find_one({"_id": ObjectId(voter_id)})
     updated_voter["_id"] = str(updated_voter["_id"])
     
@@ -202,27 +405,64 @@ async def delete_voter(
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Delete a voter"""
-    result = await db.voters.delete_one({"_id": ObjectId(voter_id)})
-    if result.deleted_count == 0:
+    voter = await db.voters.find_one_and_delete({"_id": ObjectId(voter_id)})
+    if not voter:
         raise HTTPException(status_code=404, detail="Voter not found")
     
+    await record_voter_deleted(db, voter)
+    await inc_activity(db, voter.get("assigned_to"), {
+        "assigned_voters": -1,
+        "visited_voters": -1 if voter.get("visited_status") else 0,
+        "voted_voters": -1 if voter.get("voted_status") else 0
+    })
+    await refresh_families(db, voter.get("admin_id"), [voter.get("family_id")])
+    
     return {"message": "Voter deleted successfully"}
 
 @router.post("/assign")
 async def assign_voters(
     assignment: VoterAssignment,
+    response: Response,
     current_user: dict = Depends(require_role(["super_admin", "admin"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Assign voters to a karyakarta"""
+    """
+    Assign voters to a karyakarta.
+    mode="auto" splits the voters selected by filter (or voter_ids) across
+    several karyakartas, keeping households and booths together.
+    """
+    if assignment.mode == "auto":
+        return await _auto_assign(assignment, current_user, db)
+    if assignment.mode != "manual":
+        raise HTTPException(status_code=400, detail=f"Invalid assignment mode: {assignment.mode}")
+    if not assignment.karyakarta_id:
+        raise HTTPException(status_code=400, detail="karyakarta_id is required")
+    
     # Verify karyakarta exists
     karyakarta = await db.users.find_one({"_id": ObjectId(assignment.karyakarta_id)})
     if not karyakarta or karyakarta["role"] != "karyakarta":
         raise HTTPException(status_code=400, detail="Invalid karyakarta")
     
+    if assignment.filter is not None:
+        return await _assign_by_filter(assignment, current_user, db, response)
+    
+    # Same admin scope as the filter path
+    query = _selection_query(assignment.voter_ids, None, current_user)
+    
+    # Tally the voters that change owner so per-karyakarta counters stay in sync
+    moved = await db.voters.aggregate([
+        {"$match": {"$and": [query, {"assigned_to": {"$ne": assignment.karyakarta_id}}]}},
+        {"$group": {
+            "_id": "$assigned_to",
+            "count": {"$sum": 1},
+            "visited": {"$sum": {"$cond": ["$visited_status", 1, 0]}},
+            "voted": {"$sum": {"$cond": ["$voted_status", 1, 0]}}
+        }}
+    ]).to_list(None)
+    
     # Update voters
     result = await db.voters.update_many(
-        {"_id": {"$in": [ObjectId(vid) for vid in assignment.voter_ids]}},
+        query,
         {
             "$set": {
                 "assigned_to": assignment.karyakarta_id,
@@ -232,25 +472,171 @@ async def assign_voters(
         }
     )
     
+    activity = ActivityUpdate()
+    for group in moved:
+        activity.add(group["_id"], {
+            "assigned_voters": -group["count"],
+            "visited_voters": -group["visited"],
+            "voted_voters": -group["voted"]
+        })
+        activity.add(assignment.karyakarta_id, {
+            "assigned_voters": group["count"],
+            "visited_voters": group["visited"],
+            "voted_voters": group["voted"]
+        })
+    await activity.apply(db)
+    
     logger.info(f"{result.modified_count} voters assigned to {karyakarta['username']}")
     return {"message": f"{result.modified_count} voters assigned successfully"}
 
+async def _assign_by_filter(
+    assignment: VoterAssignment,
+    current_user: dict,
+    db: AsyncIOMotorDatabase,
+    response: Response
+) -> dict:
+    """Manual assignment of a filter-selected set, resolved server-side in _id ranges"""
+    karyakarta_id = assignment.karyakarta_id
+    query = {"$and": [
+        _selection_query(assignment.voter_ids, assignment.filter, current_user),
+        {"assigned_to": {"$ne": karyakarta_id}}
+    ]}
+    previous_owners = await db.voters.distinct("assigned_to", query)
+    
+    async def finalize():
+        await invalidate_activity_stats(db, previous_owners + [karyakarta_id])
+    
+    result = await run_bulk_write(db, "assign", query, {
+        "$set": {
+            "assigned_to": karyakarta_id,
+            "assigned_by": current_user["sub"],
+            "assigned_date": datetime.utcnow()
+        }
+    }, current_user["sub"], finalize)
+    
+    return _bulk_response(response, result, "assigned")
+
+async def _auto_assign(assignment: VoterAssignment, current_user: dict, db: AsyncIOMotorDatabase) -> dict:
+    """Plan and apply a balanced household-level assignment"""
+    if not all(ObjectId.is_valid(vid) for vid in assignment.voter_ids):
+        raise HTTPException(status_code=400, detail="Invalid voter id")
+    if assignment.karyakarta_ids:
+        if not all(ObjectId.is_valid(kid) for kid in assignment.karyakarta_ids):
+            raise HTTPException(status_code=400, detail="Invalid karyakarta id")
+        user_query = {"_id": {"$in": [ObjectId(kid) for kid in assignment.karyakarta_ids]}, "role": "karyakarta"}
+        # Admins can only hand voters to their own team
+        if current_user["role"] == "admin":
+            user_query["assigned_admin_id"] = current_user["sub"]
+        karyakartas = await db.users.find(user_query, {"username": 1}).to_list(None)
+        if len(karyakartas) != len(set(assignment.karyakarta_ids)):
+            raise HTTPException(status_code=400, detail="Invalid karyakarta")
+    elif current_user["role"] == "admin":
+        karyakartas = await db.users.find(
+            {"role": "karyakarta", "assigned_admin_id": current_user["sub"], "active_status": {"$ne": False}},
+            {"username": 1}
+        ).to_list(None)
+    else:
+        raise HTTPException(status_code=400, detail="karyakarta_ids is required")
+    if not karyakartas:
+        raise HTTPException(status_code=400, detail="No karyakartas to assign to")
+    karyakarta_ids = [str(k["_id"]) for k in karyakartas]
+    
+    query = voter_filter_query(assignment.filter, current_user)
+    if assignment.voter_ids:
+        query["_id"] = {"$in": [ObjectId(vid) for vid in assignment.voter_ids]}
+    # Voters struck off the roll are no longer canvassed
+    query["removed_from_roll"] = {"$ne": True}
+    voters = await load_voters(db, query)
+    if voters.empty:
+        return {"message": "No voters matched", "assigned": 0, "plan": {}}
+    
+    plan = plan_assignment(voters, karyakarta_ids, assignment.keep_existing)
+    summary = summarize_plan(plan)
+    
+    modified = 0
+    if not assignment.dry_run:
+        modified = await apply_plan(db, plan, current_user["sub"])
+        # Owners on both sides of a move rebuild their counters
+        changed = plan[plan["target"] != plan["assigned_to"]]
+        await invalidate_activity_stats(
+            db, changed["assigned_to"].dropna().unique().tolist() + changed["target"].unique().tolist()
+        )
+        logger.info(f"Auto-assigned {modified} voters across {len(karyakarta_ids)} karyakartas")
+    
+    return {
+        "message": f"{modified} voters assigned successfully",
+        "assigned": modified,
+        "voters": len(plan),
+        "households": int(plan["household"].nunique()),
+        "dry_run": assignment.dry_run,
+        "plan": summary
+    }
+
 @router.post("/bulk-update")
 async def bulk_update_voters(
     bulk_update: VoterBulkUpdate,
+    response: Response,
     current_user: dict = Depends(require_role(["super_admin", "admin"])),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Bulk update voters"""
+    """
+    Bulk update voters selected by voter_ids and/or a filter.
+    Large selections run in the background; poll /voters/bulk-jobs/{job_id}.
+    """
     updates = bulk_update.updates
     updates["updated_at"] = datetime.utcnow()
-    
-    result = await db.voters.update_many(
-        {"_id": {"$in": [ObjectId(vid) for vid in bulk_update.voter_ids]}},
-        {"$set": updates}
-    )
-    
-    return {"message": f"{result.modified_count} voters updated successfully"}
+    query = _selection_query(bulk_update.voter_ids, bulk_update.filter, current_user)
+    
+    # Arbitrary updates can move counted fields; have affected users rebuild
+    affected_users = []
+    if COUNTED_VOTER_FIELDS.intersection(updates):
+        affected_users = await db.voters.distinct("assigned_to", query)
+        if updates.get("assigned_to"):
+            affected_users.append(updates["assigned_to"])
+    update = {"$set": updates}
+    if updates.get("family_id"):
+        # Selected voters may span admins and booths; scope the family id per
+        # voter in a pipeline update (other values stay literal)
+        family_expr = scoped_family_id_expr(updates["family_id"])
+        update = [{"$set": {
+            **{field: {"$literal": value} for field, value in updates.items()},
+            "family_id": family_expr,
+        }}]
+    affected_families = []  # (admin_id, family ids) per admin
+    if FAMILY_VOTER_FIELDS.intersection(updates):
+        family_group = {"_id": "$admin_id", "families": {"$addToSet": "$family_id"}}
+        if updates.get("family_id"):
+            family_group["moved_to"] = {"$addToSet": family_expr}
+        affected_families = [
+            (doc["_id"], doc["families"] + doc.get("moved_to", []))
+            async for doc in db.voters.aggregate([{"$match": query}, {"$group": family_group}])
+        ]
+    
+    async def finalize():
+        await invalidate_activity_stats(db, affected_users)
+        for admin_id, family_ids in affected_families:
+            await refresh_families(db, admin_id, family_ids)
+    
+    result = await run_bulk_write(db, "update", query, update, current_user["sub"], finalize)
+    return _bulk_response(response, result, "updated")
+
+@router.get("/bulk-jobs/{job_id}")
+async def get_bulk_job(
+    job_id: str,
+    current_user: dict = Depends(require_role(["super_admin", "admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get progress of a background bulk assign/update"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    await fail_abandoned_bulk_jobs(db, ObjectId(job_id))
+    job = await db.bulk_jobs.find_one({"_id": ObjectId(job_id)})
+    if not job or (current_user["role"] == "admin" and job["created_by"] != current_user["sub"]):
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    
+    job["_id"] = str(job["_id"])
+    job["percent"] = round(100.0 * job["matched"] / job["total"], 1) if job["total"] else 100.0
+    return job
 
 @router.post("/{voter_id}/mark-visited")
 async def mark_voter_visited(
@@ -266,19 +652,29 @@ async def mark_voter_visited(
         "$inc": {"visit_count": 1}
     }
     
-    result = await db.voters.update_one(
+    previous = await db.voters.find_one_and_update(
         {"_id": ObjectId(voter_id)},
-        {"$set": {k: v for k, v in update_data.items() if k != "$inc"}, "$inc": update_data["$inc"]}
+        {"$set": {k: v for k, v in update_data.items() if k != "$inc"}, "$inc": update_data["$inc"]},
+        projection={
+            "visited_status": 1, "visited_by": 1, "visited_date": 1,
+            "assigned_to": 1, "family_id": 1, "removed_from_roll": 1
+        },
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
+    if not previous:
         raise HTTPException(status_code=404, detail="Voter not found")
     
-    # Update user stats
-    await db.users.update_one(
-        {"_id": ObjectId(current_user["sub"])},
-        {"$inc": {"activity_stats.voters_visited": 1}}
-    )
+    # Update user stats: every counter change is written in one round trip
+    activity = ActivityUpdate(update_data["visited_date"])
+    activity.add(current_user["sub"], {"voters_visited": 1})
+    activity.add_visits(current_user["sub"], [previous])
+    if not previous.get("visited_status"):
+        activity.add(previous.get("assigned_to"), {"visited_voters": 1})
+        if not previous.get("removed_from_roll"):
+            await inc_family(db, previous.get("family_id"), visited=1)
+        await record_target_visits(db, [voter_id], activity)
+    await activity.apply(db)
     
     return {"message": "Voter marked as visited"}
 
@@ -289,19 +685,26 @@ async def mark_voter_voted(
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Mark voter as voted (election day)"""
-    result = await db.voters.update_one(
+    previous = await db.voters.find_one_and_update(
         {"_id": ObjectId(voter_id)},
         {
             "$set": {
                 "voted_status": True,
                 "voted_timestamp": datetime.utcnow()
             }
-        }
+        },
+        projection={"voted_status": 1, "assigned_to": 1, "family_id": 1, "removed_from_roll": 1},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
+    if not previous:
         raise HTTPException(status_code=404, detail="Voter not found")
     
+    if not previous.get("voted_status"):
+        await inc_activity(db, previous.get("assigned_to"), {"voted_voters": 1})
+        if not previous.get("removed_from_roll"):
+            await inc_family(db, previous.get("family_id"), voted=1)
+    
     return {"message": "Voter marked as voted"}
 
 @router.get("/stats/summary")
@@ -352,7 +755,7 @@ async def get_voter_stats(
 @router.get("/export")
 async def export_voters(
     search: Optional[str] = None,
-    gender: Optional[str] = None,
+    gender: Optional[Gender] = None,
     age_min: Optional[int] = None,
     age_max: Optional[int] = None,
     area: Optional[str] = None,
@@ -367,40 +770,11 @@ async def export_voters(
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Export filtered voters to CSV (returns CSV file)"""
-    query = {}
-    if current_user["role"] == "karyakarta":
-        query["assigned_to"] = current_user["sub"]
-    elif current_user["role"] == "admin":
-        query["admin_id"] = current_user["sub"]
-        if assigned_to:
-            query["assigned_to"] = assigned_to
-
-    if search:
-        query["$text"] = {"$search": search}
-    if gender:
-        query["gender"] = gender
-    if age_min is not None or age_max is not None:
-        query["age"] = {}
-        if age_min is not None:
-            query["age"]["$gte"] = age_min
-        if age_max is not None:
-            query["age"]["$lte"] = age_max
-    if area:
-        query["area"] = area
-    if ward:
-        query["ward"] = ward
-    if booth_number:
-        query["booth_number"] = booth_number
-    if caste:
-        query["caste"] = caste
-    if family_id:
-        query["family_id"] = family_id
-    if visited is not None:
-        query["visited_status"] = visited
-    if voted is not None:
-        query["voted_status"] = voted
-    if assigned_to:
-        query["assigned_to"] = assigned_to
+    query = voter_filter_query(VoterFilter(
+        search=search, gender=gender, age_min=age_min, age_max=age_max,
+        area=area, ward=ward, booth_number=booth_number, caste=caste,
+        family_id=family_id, visited=visited, voted=voted, assigned_user=assigned_to
+    ), current_user)
 
     cursor = db.voters.find(query)
     voters = await cursor.to_list(length=10000)
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from typing import List, Optional
+import logging
+
+from activity import day_key
+from auth import require_role
+from database import get_database
+from serialization import MsgPackRoute, fast_response
+from versions import make_etag, not_modified
+from walk_lists import build_walk_list, build_walk_lists
+
+router = APIRouter(prefix="/walk-lists", tags=["walk-lists"], route_class=MsgPackRoute)
+logger = logging.getLogger(__name__)
+
+async def _serve_walk_list(
+    karyakarta_id: str,
+    day: Optional[str],
+    request: Request,
+    response: Response,
+    db: AsyncIOMotorDatabase
+):
+    day = day or day_key()
+    walk_list = await db.walk_lists.find_one({"_id": f"{karyakarta_id}:{day}"})
+    if not walk_list and day == day_key():
+        # Not built yet today (new karyakarta, or before the nightly run)
+        walk_list = await build_walk_list(db, karyakarta_id, day)
+    if not walk_list:
+        raise HTTPException(status_code=404, detail="Walk list not found")
+    
+    cached = not_modified(request, response, make_etag(walk_list["_id"], walk_list["generated_at"]))
+    if cached:
+        return cached
+    
+    return fast_response(walk_list, response, request=request)
+
+@router.get("/me")
+async def get_my_walk_list(
+    request: Request,
+    response: Response,
+    day: Optional[str] = None,
+    current_user: dict = Depends(require_role(["karyakarta"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get today's walk list (stops in walking order) for the current karyakarta"""
+    return await _serve_walk_list(current_user["sub"], day, request, response, db)
+
+@router.post("/rebuild")
+async def rebuild_walk_lists(
+    karyakarta_ids: Optional[List[str]] = None,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Rebuild today's walk lists (an admin's own karyakartas by default)"""
+    if current_user["role"] == "admin":
+        team = {"role": "karyakarta", "assigned_admin_id": current_user["sub"]}
+        if karyakarta_ids:
+            team["_id"] = {"$in": [ObjectId(kid) for kid in karyakarta_ids if ObjectId.is_valid(kid)]}
+        users = await db.users.find(team, {"_id": 1}).to_list(length=None)
+        team_ids = {str(u["_id"]) for u in users}
+        if karyakarta_ids and not team_ids.issuperset(karyakarta_ids):
+            raise HTTPException(status_code=403, detail="Can only rebuild walk lists of your own karyakartas")
+        karyakarta_ids = karyakarta_ids or list(team_ids)
+    
+    count = await build_walk_lists(db, karyakarta_ids)
+    return {"message": f"{count} walk lists rebuilt"}
+
+@router.get("/{karyakarta_id}")
+async def get_walk_list(
+    karyakarta_id: str,
+    request: Request,
+    response: Response,
+    day: Optional[str] = None,
+    current_user: dict = Depends(require_role(["admin", "super_admin"])),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get a karyakarta's walk list"""
+    if current_user["role"] == "admin":
+        karyakarta = await db.users.find_one({"_id": ObjectId(karyakarta_id)}, {"assigned_admin_id": 1})
+        if not karyakarta or karyakarta.get("assigned_admin_id") != current_user["sub"]:
+            raise HTTPException(status_code=404, detail="Walk list not found")
+    return await _serve_walk_list(karyakarta_id, day, request, response, db)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark the import mapping stage against row-at-a-time Python producing the
+same output, stage by stage:
+
+- normalize: the original per-row loop of import_router (minus the database
+  write and the document defaults) vs import_pipeline._map_columns
+- keys: per-row sha1 row keys, content hashes and household ids vs the
+  column-wise digests of _row_keys/_household_ids
+- map_chunk: both of the above plus building the voter documents
+
+No database is needed.
+
+On one core with 50000 rows the column-wise stages run about 2.5x
+(normalize) and 3x (keys, map_chunk) faster than the row loop. That is
+well short of 10-50x: every mapped cell is still a Python str and every
+voter a dict, whether built by the loop or from the columns, and those
+allocations are most of the remaining time. pandas .str methods do not
+help, since object-dtype string columns run them in Python too (slower
+than one list comprehension here).
+
+    python backend/scripts/bench_import_mapping.py [rows]
+"""
+import gc
+import hashlib
+import pathlib
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BACKEND = str(pathlib.Path(__file__).resolve().parents[1])
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+from import_pipeline import StagedChunk, _household_ids, _map_columns, _row_keys, map_chunk
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+REPEATS = 3
+
+COLUMN_MAPPING = {
+    "name_english": "Name",
+    "name_marathi": "नाव",
+    "age": "Age",
+    "gender": "Gender",
+    "area_english": "Area",
+    "booth_number": "Booth",
+    "address": "Address",
+    "phone": "Phone",
+    "voter_id": "EPIC",
+}
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "Name": [f"Voter {i}" for i in range(rows)],
+        "नाव": [f"मतदार {i}" for i in range(rows)],
+        "Age": rng.integers(18, 90, rows).astype(str),
+        "Gender": rng.choice(["M", "F", "पुरुष", "स्त्री", "Male", "Female"], rows),
+        "Area": rng.choice([f"Ward {i}" for i in range(30)], rows),
+        "Booth": rng.integers(1, 200, rows).astype(str),
+        "Address": [f"House {i // 4}, Lane {i % 50}" for i in range(rows)],
+        "Phone": [f"98{i:08d}" for i in range(rows)],
+        "EPIC": [f"ABC{i:07d}" for i in range(rows)],
+    })
+
+
+def old_loop(records: list, column_mapping: dict, admin_id: str, defaults: bool = True) -> list:
+    """The pre-pipeline mapping loop, without insert_one"""
+    docs = []
+    for row in records:
+        voter_data = {}
+        name_en = row.get(column_mapping.get("name_english", ""), "")
+        name_mr = row.get(column_mapping.get("name_marathi", ""), "")
+        voter_data["name"] = name_en or name_mr
+        age_field = column_mapping.get("age")
+        if age_field:
+            try:
+                voter_data["age"] = int(row.get(age_field, 18))
+            except Exception:
+                voter_data["age"] = 18
+        gender_field = column_mapping.get("gender")
+        if gender_field:
+            gender_val = str(row.get(gender_field, "")).lower()
+            if "male" in gender_val or "पु" in gender_val:
+                voter_data["gender"] = "male"
+            elif "female" in gender_val or "स्त्री" in gender_val:
+                voter_data["gender"] = "female"
+            else:
+                voter_data["gender"] = "other"
+        else:
+            voter_data["gender"] = "male"
+        area_en = row.get(column_mapping.get("area_english", ""), "")
+        area_mr = row.get(column_mapping.get("area_marathi", ""), "")
+        voter_data["area"] = area_en or area_mr or "Unknown"
+        voter_data["booth_number"] = str(row.get(column_mapping["booth_number"], "1"))
+        for field in ("ward", "phone", "caste", "address"):
+            if field in column_mapping:
+                voter_data[field] = str(row.get(column_mapping[field], ""))
+        voter_data["full_name"] = voter_data["name"]
+        if column_mapping.get("voter_id"):
+            epic = str(row.get(column_mapping["voter_id"]) or "").strip().upper()
+            voter_data["voter_id"] = epic or None
+        if not defaults:
+            docs.append(voter_data)
+            continue
+        voter_data["favor_score"] = 50.0
+        voter_data["favor_category"] = "neutral"
+        voter_data["visited_status"] = False
+        voter_data["voted_status"] = False
+        voter_data["visit_count"] = 0
+        voter_data["tags"] = []
+        voter_data["notes"] = []
+        voter_data["survey_history"] = []
+        voter_data["created_at"] = datetime.utcnow()
+        voter_data["updated_at"] = datetime.utcnow()
+        voter_data["imported_at"] = datetime.utcnow()
+        voter_data["admin_id"] = admin_id
+        voter_data["assigned_to"] = None
+        docs.append(voter_data)
+    return docs
+
+
+def row_keys(docs: list, admin_id: str):
+    """Row keys, content hashes and household ids one row at a time (sha1)"""
+    for doc in docs:
+        composite = (doc["name"], doc["gender"], doc["booth_number"], doc.get("address", ""))
+        doc["import_key"] = f"epic:{doc['voter_id']}" if doc.get("voter_id") else "row:" + hashlib.sha1(
+            "\x1f".join(str(v).lower() for v in composite).encode("utf-8")
+        ).hexdigest()[:16]
+        doc["import_hash"] = hashlib.sha1(
+            "\x1f".join(str(doc[k]) for k in sorted(doc) if k != "import_key").encode("utf-8")
+        ).hexdigest()[:16]
+        if doc.get("address"):
+            household = f"{admin_id}\x1f{doc['booth_number']}\x1f{doc['address'].lower()}"
+            doc["family_id"] = "hh:" + hashlib.sha1(household.encode("utf-8")).hexdigest()[:16]
+
+
+def best_of(fn) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    frame = make_frame(ROWS)
+    records = frame.to_dict("records")
+    chunk = StagedChunk({"chunk_index": 0, "row_offset": 0, **StagedChunk.from_frame(frame)})
+    now = datetime.utcnow()
+    mapped = old_loop(records, COLUMN_MAPPING, "admin", defaults=False)
+    out, invalid = _map_columns(chunk, COLUMN_MAPPING)
+
+    def per_row():
+        docs = old_loop(records, COLUMN_MAPPING, "admin")
+        row_keys(docs, "admin")
+
+    stages = (
+        ("normalize", lambda: old_loop(records, COLUMN_MAPPING, "admin", defaults=False),
+         lambda: _map_columns(chunk, COLUMN_MAPPING)),
+        ("keys", lambda: row_keys([dict(doc) for doc in mapped], "admin"),
+         lambda: (_row_keys(out, invalid.copy()), _household_ids(out, "admin"))),
+        ("map_chunk", per_row, lambda: map_chunk(chunk, COLUMN_MAPPING, "admin", now)),
+    )
+    print(f"{ROWS} rows, best of {REPEATS}")
+    print(f"{'stage':>10} {'per-row s':>10} {'columns s':>10} {'speedup':>8}")
+    for name, row_fn, column_fn in stages:
+        gc.collect()
+        old, new = best_of(row_fn), best_of(column_fn)
+        print(f"{name:>10} {old:>10.3f} {new:>10.3f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark how a burst of logins affects unrelated requests: latency of a
+trivial endpoint polled while LOGINS concurrent password checks run, with
+bcrypt on the event loop (the previous login path) versus on the hashing
+pool (hashing.py).
+
+No database is needed; requests go through an in-process ASGI transport.
+
+    python backend/scripts/bench_login_storm.py
+"""
+import asyncio
+import pathlib
+import sys
+import time
+from typing import List
+
+import bcrypt
+import httpx
+from fastapi import FastAPI
+
+# Make backend modules importable the same way the routers import them
+BACKEND = str(pathlib.Path(__file__).resolve().parents[1])
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+# auth imports backend.database
+if str(pathlib.Path(BACKEND).parent) not in sys.path:
+    sys.path.insert(0, str(pathlib.Path(BACKEND).parent))
+
+from auth import verify_password, verify_password_async
+from hashing import hash_pool
+
+LOGINS = 32
+ROUNDS = 10  # bcrypt cost for the benchmark hash (production hashes use 12)
+PING_INTERVAL = 0.01
+PASSWORD = "karyakarta_pass123"
+HASHED = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(ROUNDS)).decode()
+
+app = FastAPI()
+
+
+@app.get("/ping")
+async def ping():
+    return {"ok": True}
+
+
+@app.post("/login/blocking")
+async def login_blocking():
+    return {"ok": verify_password(PASSWORD, HASHED)}
+
+
+@app.post("/login/pooled")
+async def login_pooled():
+    return {"ok": await verify_password_async(PASSWORD, HASHED)}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def poll(client: httpx.AsyncClient, stop: asyncio.Event) -> List[float]:
+    """
+    Ping on a fixed schedule; latency is measured from when the ping was due,
+    so time spent unable to even send it (a blocked loop) is counted
+    """
+    latencies = []
+    due = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        await client.get("/ping")
+        finished = time.perf_counter()
+        latencies.append(finished - due)
+        # Pings missed while blocked are due now, like clients that kept calling
+        due = max(due + PING_INTERVAL, finished - PING_INTERVAL * 10)
+    return latencies
+
+
+async def run(client: httpx.AsyncClient, login_path: str = None) -> tuple:
+    stop = asyncio.Event()
+    poller = asyncio.create_task(poll(client, stop))
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    if login_path:
+        await asyncio.gather(*[client.post(login_path) for _ in range(LOGINS)])
+    else:
+        await asyncio.sleep(1.0)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return await poller, elapsed
+
+
+async def main():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        verify_password(PASSWORD, HASHED)  # load the bcrypt backend before timing
+        print(f"{LOGINS} concurrent logins, bcrypt cost {ROUNDS}, {hash_pool.workers} hashing workers")
+        print(f"{'scenario':>10} {'pings':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'storm s':>8}")
+        for name, path in (("idle", None), ("blocking", "/login/blocking"), ("pooled", "/login/pooled")):
+            latencies, elapsed = await run(client, path)
+            print(
+                f"{name:>10} {len(latencies):>6} {percentile(latencies, 0.5) * 1000:>8.1f} "
+                f"{percentile(latencies, 0.99) * 1000:>8.1f} {max(latencies) * 1000:>8.1f} {elapsed:>8.2f}"
+            )
+        print(f"hashing pool: {hash_pool.metrics()}")
+    hash_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark list-response serialization: the previous path (build a pydantic
+model per row, then let FastAPI validate and JSON-encode it against the
+response_model) versus the trusted-data path in serialization.py.
+
+No database is needed; rows are synthetic voter documents as stored in Mongo.
+
+    python backend/scripts/bench_serialization.py
+"""
+import asyncio
+import pathlib
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+
+# Make backend modules importable the same way the routers import them
+BACKEND = str(pathlib.Path(__file__).resolve().parents[1])
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from fastapi.responses import JSONResponse
+
+from models import Voter
+from serialization import DocumentProjector, dumps
+
+SIZES = [50, 500, 5000]
+REPEAT = 5
+
+
+def make_voter_doc(i: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "voter_id": f"MH{i:08d}",
+        "name": f"Name{i}",
+        "surname": random.choice(["Patil", "Shinde", "Jadhav", "Pawar"]),
+        "full_name": f"Name{i} Patil",
+        "gender": random.choice(["male", "female"]),
+        "age": random.randint(18, 90),
+        "caste": random.choice(["Maratha", "OBC", "SC", "ST"]),
+        "area": random.choice(["Kothrud", "Hadapsar", "Aundh"]),
+        "ward": str(random.randint(1, 40)),
+        "booth_number": str(random.randint(1, 300)),
+        "address": f"{i} Main Road",
+        "phone": "9800000000",
+        "family_id": f"F{i // 4}",
+        "favor_score": 50.0,
+        "favor_category": "neutral",
+        "visited_status": bool(i % 2),
+        "visited_by": None,
+        "visited_date": now - timedelta(days=1) if i % 2 else None,
+        "visit_count": i % 3,
+        "voted_status": False,
+        "assigned_to": None,
+        "tags": [],
+        "notes": [],
+        "survey_history": [],
+        "created_at": now,
+        "updated_at": now,
+        "imported_at": now,
+        "admin_id": "000000000000000000000000",
+    }
+
+
+async def before(docs: List[dict], field) -> bytes:
+    rows = []
+    for doc in docs:
+        doc = dict(doc)
+        doc["_id"] = str(doc["_id"])
+        rows.append(Voter(**doc))
+    content = await serialize_response(field=field, response_content={"voters": rows, "total": len(rows)})
+    return JSONResponse(content).body
+
+
+def after(docs: List[dict], projector: DocumentProjector) -> bytes:
+    return dumps({"voters": projector.project_many(docs), "total": len(docs)})
+
+
+async def main():
+    field = create_response_field(name="Response_get_voters", type_=dict)
+    projector = DocumentProjector(Voter)
+    print(f"{'rows':>6} {'before us/row':>14} {'after us/row':>13} {'speedup':>8}")
+    for size in SIZES:
+        docs = [make_voter_doc(i) for i in range(size)]
+        t_before = t_after = float("inf")
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            await before(docs, field)
+            t_before = min(t_before, time.perf_counter() - start)
+            start = time.perf_counter()
+            after(docs, projector)
+            t_after = min(t_after, time.perf_counter() - start)
+        print(f"{size:>6} {t_before / size * 1e6:>14.2f} {t_after / size * 1e6:>13.2f} {t_before / t_after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
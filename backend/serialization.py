@@ -0,0 +1,246 @@
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter
+from bson import ObjectId
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from types import UnionType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type, Union, get_args, get_origin
+import msgpack
+import orjson
+
+# Trusted-data response path: documents read back from our own collections are
+# already shaped by the write paths, so list endpoints project them onto the
+# response model's fields and encode them with orjson instead of building a
+# pydantic object per row and having FastAPI validate and encode it again.
+# Scalar fields still get the model's coercion when a stored value has another
+# type (an int age stored as 45.0, an int favor_score); nested models and lists
+# are passed through as stored.
+
+SCALAR_TYPES = (bool, int, float, str, datetime)
+
+def _scalar_type(annotation: Any) -> Optional[type]:
+    """The scalar (or enum) type of a field, unwrapping Optional; None for anything else"""
+    if get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None
+        annotation = args[0]
+    if isinstance(annotation, type) and (issubclass(annotation, Enum) or annotation in SCALAR_TYPES):
+        return annotation
+    return None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """Encode content (ObjectId/datetime aware) to JSON bytes"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class DocumentProjector:
+    """
+    Project raw Mongo documents onto a response model's fields, filling the
+    model's defaults for missing keys and dropping everything else (e.g.
+    password_hash). Values of scalar fields that are not already of the
+    declared type are coerced (or rejected) by pydantic like the model would;
+    other fields are not validated. None is passed through.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.defaults: Dict[str, Any] = {}
+        self.factories: Dict[str, Any] = {}
+        for name, field in model.model_fields.items():
+            key = field.alias or name
+            if field.default_factory is not None:
+                self.factories[key] = field.default_factory
+            elif not field.is_required():
+                self.defaults[key] = field.default
+            else:
+                self.defaults[key] = None
+        self.keys = list(self.defaults) + list(self.factories)
+        # Mongo projection so unused fields are never decoded from BSON
+        self.projection = {key: 1 for key in self.keys}
+
+        # (key, values or exact types already in shape, validator) per scalar field
+        self.enum_fields = []
+        self.typed_fields = []
+        for name, field in model.model_fields.items():
+            scalar = _scalar_type(field.annotation)
+            if scalar is None:
+                continue
+            validate = TypeAdapter(field.annotation).validate_python
+            if issubclass(scalar, Enum):
+                values = frozenset(member.value for member in scalar)
+                self.enum_fields.append((field.alias or name, values, validate))
+            else:
+                # ObjectIds are encoded as their hex string
+                types = frozenset((scalar, ObjectId) if scalar is str else (scalar,)) | {type(None)}
+                self.typed_fields.append((field.alias or name, types, validate))
+
+    def project(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        out = {}
+        for key, default in self.defaults.items():
+            out[key] = doc.get(key, default)
+        for key, factory in self.factories.items():
+            value = doc.get(key)
+            out[key] = factory() if value is None else value
+        for key, types, validate in self.typed_fields:
+            if type(out[key]) not in types:
+                out[key] = validate(out[key])
+        for key, values, validate in self.enum_fields:
+            value = out[key]
+            if value is not None and not (isinstance(value, str) and value in values):
+                out[key] = validate(value)
+        return out
+
+    def project_many(self, docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        project = self.project
+        return [project(doc) for doc in docs]
+
+    def columnar(self, docs: Iterable[Dict[str, Any]], dictionary_columns: Iterable[str] = ()) -> Dict[str, Any]:
+        """Project docs straight into the columnar layout"""
+        return to_columnar(self.project_many(docs), self.keys, dictionary_columns)
+
+def fast_response(
+    content: Any,
+    response: Optional[Response] = None,
+    status_code: int = 200,
+    request: Optional[Request] = None
+) -> Response:
+    """
+    Wrap content in a FastJSONResponse (or MsgPackResponse when the request
+    accepts it), keeping headers set on the injected response
+    """
+    if request is not None and accepts_msgpack(request):
+        fast = MsgPackResponse(content, status_code=status_code)
+    else:
+        fast = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        for key, value in response.headers.items():
+            if key.lower() not in ("content-length", "content-type"):
+                fast.headers[key] = value
+    return fast
+
+# MessagePack wire format. Datetimes use the standard timestamp extension
+# (-1, naive values are UTC) and ObjectIds travel as 12 raw bytes in ext 1.
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+OBJECTID_EXT = 1
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return msgpack.ExtType(OBJECTID_EXT, value.binary)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return msgpack.Timestamp.from_datetime(value)
+    return _default(value)
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == OBJECTID_EXT:
+        return ObjectId(data)
+    return msgpack.ExtType(code, data)
+
+def packb(content: Any) -> bytes:
+    """Encode content to MessagePack bytes"""
+    return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+
+def unpackb(data: bytes) -> Any:
+    """Decode MessagePack bytes (timestamps become aware datetimes)"""
+    return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, timestamp=3, raw=False)
+
+def _is_msgpack(media_type: Optional[str]) -> bool:
+    return bool(media_type) and media_type.split(";")[0].strip() in (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+def accepts_msgpack(request: Request) -> bool:
+    """True if the client asked for a MessagePack response"""
+    accept = request.headers.get("accept", "")
+    return any(_is_msgpack(part) for part in accept.split(","))
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return packb(content)
+
+class MsgPackRoute(APIRoute):
+    """
+    Route class that accepts MessagePack request bodies. The body is decoded
+    and handed to FastAPI as JSON, so endpoints keep their pydantic body
+    parameters and validation unchanged.
+    """
+
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+
+        async def handler(request: Request) -> Response:
+            if _is_msgpack(request.headers.get("content-type")):
+                payload = unpackb(await request.body())
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (k, v) for k, v in request.scope["headers"] if k != b"content-type"
+                ] + [(b"content-type", b"application/json")]
+                request = Request(scope, request.receive)
+                request._body = dumps(payload)
+            return await original_handler(request)
+
+        return handler
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.columnar+json"
+
+def wants_columnar(request: Request, layout: Optional[str]) -> bool:
+    """True if the client opted into the columnar layout (query or Accept)"""
+    if layout:
+        return layout == "columnar"
+    return COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+
+def to_columnar(
+    rows: List[Dict[str, Any]],
+    columns: List[str],
+    dictionary_columns: Iterable[str] = ()
+) -> Dict[str, Any]:
+    """
+    Encode rows as {columns, rows, dictionaries}. Values of dictionary-coded
+    columns are replaced by an index into dictionaries[column].
+    """
+    dictionary_columns = set(dictionary_columns)
+    coded = [c for c in columns if c in dictionary_columns]
+    dictionaries: Dict[str, List[Any]] = {c: [] for c in coded}
+    lookups: Dict[str, Dict[Any, int]] = {c: {} for c in coded}
+    coders = [(i, lookups[c], dictionaries[c]) for i, c in enumerate(columns) if c in lookups]
+
+    encoded = []
+    for row in rows:
+        values = [row.get(c) for c in columns]
+        for i, lookup, values_seen in coders:
+            value = values[i]
+            if value is None:
+                continue
+            index = lookup.get(value)
+            if index is None:
+                index = lookup[value] = len(values_seen)
+                values_seen.append(value)
+            values[i] = index
+        encoded.append(values)
+
+    return {"columns": columns, "rows": encoded, "dictionaries": dictionaries}
@@ -6,7 +6,7 @@ import os
 import logging
 from pathlib import Path
 from contextlib import asynccontextmanager
-from .database import connect_to_mongo, close_mongo_connection
+from .database import connect_to_mongo, close_mongo_connection, get_database
 from .models import UserRole, Gender, FavorCategory, TaskStatus, IssueStatus, QuestionType
 
 # Load environment variables
@@ -17,12 +17,19 @@ load_dotenv(ROOT_DIR / '.env')
 from .database import connect_to_mongo, close_mongo_connection
 
 # Import routers
-from .routers.auth_router import router as auth_router
+from .routers.auth_router import router as auth_router, revocation_list
+from .hashing import bulk_hasher, hash_pool
 from .routers.voter_router import router as voter_router
 from .routers.survey_router import router as survey_router
 from .routers.task_router import router as task_router
 from .routers.dashboard_router import router as dashboard_router
-from .routers.import_router import router as import_router
+from .routers.import_router import router as import_router, import_worker
+from .routers.family_router import router as family_router
+from .routers.influencer_router import router as influencer_router
+from .routers.issue_router import router as issue_router
+from .routers.walk_list_router import router as walk_list_router
+from .walk_lists import walk_list_scheduler
+from .bulk_ops import fail_abandoned_bulk_jobs
 
 # Configure logging
 logging.basicConfig(
@@ -38,9 +45,22 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Political Voter Management Platform API...")
     await connect_to_mongo()
     logger.info("Database connected and indexes created")
+    # Bulk writes interrupted by the last shutdown cannot resume
+    await fail_abandoned_bulk_jobs(await get_database())
+    # Background import jobs (resumes any interrupted ones)
+    import_worker.start(await get_database())
+    # Nightly walk lists
+    walk_list_scheduler.start(await get_database())
+    # Token revocations of deactivated users
+    revocation_list.start(await get_database())
     yield
     # Shutdown
     logger.info("Shutting down...")
+    await revocation_list.stop()
+    await walk_list_scheduler.stop()
+    await import_worker.stop()
+    hash_pool.shutdown()
+    bulk_hasher.shutdown()
     await close_mongo_connection()
     logger.info("Database connection closed")
 
@@ -66,7 +86,7 @@ async def root():
 
 @api_router.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "hash_pool": hash_pool.metrics()}
 
 # Include routers
 api_router.include_router(auth_router)
@@ -75,6 +95,10 @@ api_router.include_router(survey_router)
 api_router.include_router(task_router)
 api_router.include_router(dashboard_router)
 api_router.include_router(import_router)
+api_router.include_router(family_router)
+api_router.include_router(influencer_router)
+api_router.include_router(issue_router)
+api_router.include_router(walk_list_router)
 
 # Include the api_router in the main app
 app.include_router(api_router)
@@ -86,6 +110,8 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset cursor of paginated lists (e.g. the issue queue)
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Global exception handler
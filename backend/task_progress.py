@@ -0,0 +1,90 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from datetime import datetime
+from typing import Iterable, List, Optional
+import logging
+
+from activity import ActivityUpdate
+
+logger = logging.getLogger(__name__)
+
+# Tasks with target_voters track their own progress: visited_targets counts
+# the targets visited so far and is bumped as voters are first visited,
+# found through the (target_voters, status) multikey index (voter -> open
+# tasks). completion_percentage follows it, and a task whose targets are all
+# visited completes itself.
+OPEN_TASK_STATUSES = ["pending", "in_progress"]
+
+def task_scope(user_id: str) -> str:
+    """Version scope covering the tasks assigned to a user"""
+    return f"tasks:{user_id}"
+
+def progress_fields(visited: int, targets: int) -> dict:
+    """Progress fields for a task with visited of its targets visited"""
+    fields = {"visited_targets": visited}
+    if targets:
+        fields["completion_percentage"] = round(100.0 * visited / targets, 1)
+        if visited >= targets:
+            fields["status"] = "completed"
+            fields["completed_at"] = datetime.utcnow()
+    return fields
+
+async def record_target_visits(
+    db: AsyncIOMotorDatabase,
+    voter_ids: Iterable[str],
+    activity: Optional[ActivityUpdate] = None
+):
+    """
+    Count newly visited voters towards every open task targeting them. Counter
+    and version changes are added to activity when given (the caller applies
+    it), otherwise applied here.
+    """
+    voter_ids = list({str(vid) for vid in voter_ids if vid})
+    if not voter_ids:
+        return
+    match = {"target_voters": {"$in": voter_ids}, "status": {"$in": OPEN_TASK_STATUSES}}
+    tasks = await db.tasks.find(match, {"assigned_to": 1, "status": 1}).to_list(None)
+    if not tasks:
+        return
+
+    now = datetime.utcnow()
+    visited = {"$min": [
+        {"$size": "$target_voters"},
+        {"$add": [
+            {"$ifNull": ["$visited_targets", 0]},
+            {"$size": {"$setIntersection": ["$target_voters", voter_ids]}},
+        ]},
+    ]}
+    done = {"$gte": ["$visited_targets", {"$size": "$target_voters"}]}
+    await db.tasks.update_many({**match, "_id": {"$in": [t["_id"] for t in tasks]}}, [
+        {"$set": {"visited_targets": visited}},
+        {"$set": {
+            "completion_percentage": {"$round": [
+                {"$multiply": [100, {"$divide": ["$visited_targets", {"$size": "$target_voters"}]}]}, 1
+            ]},
+            "status": {"$cond": [done, "completed", "$status"]},
+            "completed_at": {"$cond": [done, now, "$completed_at"]},
+        }},
+    ])
+
+    # Tasks this update completed leave the assignee's pending counter
+    completed = await db.tasks.find(
+        {"_id": {"$in": [t["_id"] for t in tasks]}, "status": "completed", "completed_at": now},
+        {"_id": 1}
+    ).to_list(None)
+    completed = {t["_id"] for t in completed}
+    pending = activity or ActivityUpdate(now)
+    for task in tasks:
+        if task["_id"] in completed and task.get("status") == "pending":
+            pending.add(task.get("assigned_to"), {"pending_tasks": -1})
+    pending.scopes.update(task_scope(t["assigned_to"]) for t in tasks if t.get("assigned_to"))
+    if activity is None:
+        await pending.apply(db)
+    if completed:
+        logger.info(f"{len(completed)} tasks completed by visits")
+
+async def initial_progress(db: AsyncIOMotorDatabase, target_voters: List[str]) -> dict:
+    """Progress fields for a new task whose targets may already be visited"""
+    ids = [ObjectId(vid) for vid in target_voters if ObjectId.is_valid(vid)]
+    visited = await db.voters.count_documents({"_id": {"$in": ids}, "visited_status": True}) if ids else 0
+    return progress_fields(visited, len(target_voters))
@@ -0,0 +1,9 @@
+import pathlib
+import sys
+
+# Backend modules import each other flat (from families import ...); auth
+# also imports the backend package itself (from backend.database import ...)
+BACKEND = pathlib.Path(__file__).resolve().parents[1]
+for path in (str(BACKEND.parent), str(BACKEND)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
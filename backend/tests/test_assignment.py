@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from assignment import _fill_targets, plan_assignment, summarize_plan
+
+
+def voters(n, family_size=3, booths=7, assigned_to=None, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, family_size + 1, n)
+    family = np.repeat(np.arange(n), sizes)[:n]
+    return pd.DataFrame({
+        "_id": [f"v{i}" for i in range(n)],
+        "family_id": [f"f{f}" for f in family],
+        "booth_number": [str(f % booths) for f in family],
+        "turf_id": [None] * n,
+        "assigned_to": assigned_to if assigned_to is not None else [None] * n,
+    }, dtype=object)
+
+
+@pytest.mark.parametrize("loads, free, expected", [
+    ([0, 0, 0], 5, [2, 2, 1]),
+    ([10, 0, 3], 6, [10, 5, 4]),
+    ([10, 0, 3], 20, [11, 11, 11]),
+    ([5, 5], 0, [5, 5]),
+    ([167, 0, 0], 301, [167, 151, 150]),
+])
+def test_fill_targets(loads, free, expected):
+    targets = _fill_targets(loads, free)
+    assert targets == expected
+    assert sum(targets) == sum(loads) + free
+
+
+@pytest.mark.parametrize("karyakartas", [2, 3, 7])
+def test_households_are_never_split(karyakartas):
+    plan = plan_assignment(voters(1000), [f"k{i}" for i in range(karyakartas)])
+    assert plan["target"].notna().all()
+    assert (plan.groupby("household")["target"].nunique() == 1).all()
+
+
+@pytest.mark.parametrize("karyakartas", [2, 3, 7])
+def test_household_loads_are_balanced(karyakartas):
+    ids = [f"k{i}" for i in range(karyakartas)]
+    plan = plan_assignment(voters(1000), ids)
+    households = [summarize_plan(plan)[kid]["households"] for kid in ids]
+    assert max(households) - min(households) <= 1
+
+
+def test_existing_owners_keep_their_households():
+    frame = voters(300)
+    frame.loc[:59, "assigned_to"] = "k0"
+    plan = plan_assignment(frame, ["k0", "k1", "k2"])
+    kept = plan[plan["household"].isin(plan.loc[:59, "household"])]
+    assert (kept["target"] == "k0").all()
+    households = [summarize_plan(plan)[kid]["households"] for kid in ("k0", "k1", "k2")]
+    assert max(households) - min(households) <= 1
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from auth import TokenCache, create_access_token, get_current_user, revocation_list, token_cache
+from revocations import RevocationList
+
+
+class _Revocations:
+    async def update_one(self, query, update, upsert=False):
+        pass
+
+
+class _Db:
+    revocations = _Revocations()
+
+
+def authenticate(token):
+    return asyncio.run(get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)))
+
+
+def test_token_cache_drops_expired_claims():
+    cache = TokenCache(size=10)
+    cache.put("live", {"sub": "u", "exp": time.time() + 60})
+    cache.put("expired", {"sub": "u", "exp": time.time() - 1})
+    assert cache.get("live")["sub"] == "u"
+    assert cache.get("expired") is None
+    assert "expired" not in cache._claims
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(size=2)
+    exp = time.time() + 60
+    cache.put("a", {"exp": exp})
+    cache.put("b", {"exp": exp})
+    cache.get("a")
+    cache.put("c", {"exp": exp})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+@pytest.mark.parametrize("payload, revoked", [
+    ({"sub": "u1", "iat": 999}, True),
+    ({"sub": "u1", "iat": 1000}, True),
+    ({"sub": "u1", "iat": 1001}, False),
+    # Tokens without iat cannot prove they were issued after the revocation
+    ({"sub": "u1"}, True),
+    ({"sub": "u2", "iat": 0}, False),
+    ({"sub": "u2"}, False),
+])
+def test_revocation_compares_issue_time(payload, revoked):
+    revocations = RevocationList()
+    revocations.revoked = {"u1": 1000.0}
+    assert revocations.is_revoked(payload) is revoked
+
+
+def test_revoked_user_is_rejected_even_with_a_cached_token(monkeypatch):
+    monkeypatch.setattr(revocation_list, "revoked", {})
+    token = create_access_token({"sub": "u1", "role": "karyakarta"}, timedelta(minutes=5))
+    assert authenticate(token)["sub"] == "u1"
+    assert token_cache.get(token) is not None
+
+    asyncio.run(revocation_list.revoke(_Db(), "u1"))
+    with pytest.raises(HTTPException) as rejected:
+        authenticate(token)
+    assert rejected.value.status_code == 401
+
+    # A token issued after the revocation is accepted again
+    payload = {**token_cache.get(token), "iat": revocation_list.revoked["u1"] + 1}
+    assert not revocation_list.is_revoked(payload)
@@ -0,0 +1,89 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+from cache import SnapshotCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Only the cache's clock: the event loop keeps the real one
+    now = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def counter(delay=0.0):
+    calls = []
+
+    async def compute():
+        calls.append(len(calls))
+        await asyncio.sleep(delay)
+        return len(calls)
+
+    return compute, calls
+
+
+def test_concurrent_misses_share_one_computation(clock):
+    snapshots = SnapshotCache(fresh_for=10, max_stale=60)
+    compute, calls = counter(delay=0.01)
+
+    async def run():
+        return await asyncio.gather(*[snapshots.get("admin", compute) for _ in range(5)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert [value for value, _ in results] == [1] * 5
+
+
+def test_stale_entries_are_served_while_refreshing(clock):
+    snapshots = SnapshotCache(fresh_for=10, max_stale=60)
+    compute, calls = counter()
+
+    async def run():
+        first, _ = await snapshots.get("admin", compute)
+        clock[0] += 5
+        fresh, _ = await snapshots.get("admin", compute)
+        clock[0] += 10
+        # Stale: the old value comes back at once, one refresh runs behind it
+        stale, age = await snapshots.get("admin", compute)
+        again, _ = await snapshots.get("admin", compute)
+        await asyncio.sleep(0.01)  # let the refresh finish
+        refreshed, _ = await snapshots.get("admin", compute)
+        return first, fresh, stale, age, again, refreshed
+
+    first, fresh, stale, age, again, refreshed = asyncio.run(run())
+    assert (first, fresh, stale, again) == (1, 1, 1, 1)
+    assert age == 15
+    assert refreshed == 2
+    assert len(calls) == 2
+
+
+def test_entries_past_max_stale_are_recomputed_before_serving(clock):
+    snapshots = SnapshotCache(fresh_for=10, max_stale=60)
+    compute, calls = counter()
+
+    async def run():
+        await snapshots.get("admin", compute)
+        clock[0] += 61
+        return await snapshots.get("admin", compute)
+
+    assert asyncio.run(run()) == (2, 0)
+    assert len(calls) == 2
+
+
+def test_invalidate_drops_entries(clock):
+    snapshots = SnapshotCache(fresh_for=10, max_stale=60)
+    compute, calls = counter()
+
+    async def run():
+        await snapshots.get("a", compute)
+        await snapshots.get("b", compute)
+        snapshots.invalidate("a")
+        await snapshots.get("a", compute)
+        await snapshots.get("b", compute)
+
+    asyncio.run(run())
+    assert len(calls) == 3
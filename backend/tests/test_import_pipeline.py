@@ -0,0 +1,138 @@
+import asyncio
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from families import scoped_family_id
+from import_pipeline import StagedChunk, _gender_token, chunk_keys, find_removed, map_chunk
+
+MAPPING = {
+    "name_english": "Name",
+    "name_marathi": "नाव",
+    "age": "Age",
+    "gender": "Gender",
+    "area_english": "Area",
+    "booth_number": "Booth",
+    "address": "Address",
+    "voter_id": "EPIC",
+}
+NOW = datetime(2026, 1, 1)
+
+
+def staged(rows, chunk_index=0):
+    frame = pd.DataFrame(rows)
+    return StagedChunk({"chunk_index": chunk_index, "row_offset": 0, **StagedChunk.from_frame(frame)})
+
+
+def row(**cells):
+    base = {"Name": "Asha", "नाव": "", "Age": "40", "Gender": "F", "Area": "Ward 1",
+            "Booth": "7", "Address": "House 1", "EPIC": ""}
+    return {**base, **cells}
+
+
+@pytest.mark.parametrize("value, gender", [
+    ("M", "male"), ("male", "male"), (" Male ", "male"), ("पुरुष", "male"), ("पु", "male"),
+    ("F", "female"), ("FEMALE", "female"), ("स्त्री", "female"), ("महिला", "female"),
+    ("O", "other"), ("तृतीयपंथी", "other"), ("", "other"), (None, "other"),
+    ("female (f)", "female"), ("m / पुरुष", "male"),
+])
+def test_gender_tokens(value, gender):
+    assert _gender_token(value) == gender
+
+
+def test_map_chunk_normalizes_columns():
+    chunk = staged([
+        row(Name="", **{"नाव": "आशा"}, Age="45.0", EPIC="abc123 "),
+        row(Name="Ravi", Gender="पुरुष", Age="", Area="", Booth=""),
+        row(Name="Bad", Age="forty", Address="House 2"),
+        row(Name="", **{"नाव": ""}, Address="House 3"),
+    ])
+    docs, errors = map_chunk(chunk, MAPPING, "admin", NOW)
+    by_pos = dict(docs)
+
+    assert by_pos[0]["name"] == by_pos[0]["full_name"] == "आशा"
+    assert by_pos[0]["age"] == 45
+    assert by_pos[0]["gender"] == "female"
+    assert by_pos[0]["voter_id"] == "ABC123"
+    assert by_pos[0]["import_key"] == "epic:ABC123"
+
+    assert by_pos[1]["gender"] == "male"
+    assert by_pos[1]["age"] == 18
+    assert by_pos[1]["area"] == "Unknown"
+    assert by_pos[1]["booth_number"] == "1"
+    assert by_pos[1]["voter_id"] is None
+    assert by_pos[1]["import_key"].startswith("row:")
+
+    assert dict(errors) == {2: "Invalid age", 3: "Missing name"}
+    assert all(doc["admin_id"] == "admin" and doc["favor_score"] == 50.0 for doc in by_pos.values())
+
+
+def test_keys_and_households_do_not_depend_on_the_chunk():
+    rows = [row(Name=f"Voter {i}", Address=f"House {i // 2}") for i in range(6)]
+    whole, _ = map_chunk(staged(rows), MAPPING, "admin", NOW)
+    split = map_chunk(staged(rows[:3]), MAPPING, "admin", NOW)[0] + \
+        map_chunk(staged(rows[3:], chunk_index=1), MAPPING, "admin", NOW)[0]
+
+    fields = ("import_key", "import_hash", "family_id")
+    assert [tuple(doc[f] for f in fields) for _, doc in whole] == \
+        [tuple(doc[f] for f in fields) for _, doc in split]
+    # Voters sharing booth and address share a household
+    families = [doc["family_id"] for _, doc in whole]
+    assert families[0] == families[1] != families[2]
+
+
+def test_repeated_row_keys_are_flagged():
+    chunk = staged([row(EPIC="X1"), row(Name="Other", EPIC="x1"), row(EPIC="X2")])
+    docs, errors = map_chunk(chunk, MAPPING, "admin", NOW)
+    assert [pos for pos, _ in docs] == [0, 2]
+    assert errors == [(1, "Duplicate row key")]
+    assert chunk_keys(chunk, MAPPING) == ["epic:X1", "epic:X2"]
+
+
+def test_family_numbers_are_scoped_by_admin_and_booth():
+    mapping = {**MAPPING, "family_id": "House No"}
+    chunk = staged([row(**{"House No": "12"}), row(Name="B", Booth="8", **{"House No": "12"}),
+                    row(Name="C", **{"House No": ""})])
+    docs = [doc for _, doc in map_chunk(chunk, mapping, "admin", NOW)[0]]
+    assert [doc["family_id"] for doc in docs] == ["admin:7:12", "admin:8:12", None]
+    # Hand-entered family numbers land in the same household ids
+    assert [scoped_family_id("admin", booth, "12") for booth in ("7", "8")] == ["admin:7:12", "admin:8:12"]
+    assert scoped_family_id("other", "7", "12") != "admin:7:12"
+    assert scoped_family_id("admin", "9", "admin:7:12") == "admin:7:12"
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _Voters:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return _Cursor([doc for doc in self.docs if doc["admin_id"] == query["admin_id"]])
+
+
+def test_sync_keeps_voters_whose_row_fails_validation():
+    chunk = staged([row(EPIC="X1"), row(EPIC="X2", Age="forty"), row(Name="", EPIC="X3")])
+    docs, errors = map_chunk(chunk, MAPPING, "admin", NOW)
+    assert [pos for pos, _ in docs] == [0]
+    assert dict(errors) == {1: "Invalid age", 2: "Missing name"}
+
+    stored = [{"_id": f"v{i}", "admin_id": "admin", "import_key": key}
+              for i, key in enumerate(["epic:X1", "epic:X2", "epic:X3", "epic:X4"])]
+
+    class DB:
+        voters = _Voters(stored)
+
+    removed = asyncio.run(find_removed(DB(), "admin", set(chunk_keys(chunk, MAPPING))))
+    assert removed == ["v3"]
@@ -0,0 +1,84 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+import pytest
+from bson import ObjectId
+from pydantic import BaseModel, Field, ValidationError
+
+from serialization import DocumentProjector, dumps, to_columnar
+
+
+class Status(str, Enum):
+    OPEN = "open"
+    CLOSED = "closed"
+
+
+class Item(BaseModel):
+    id: str = Field(alias="_id")
+    name: str
+    count: int = 0
+    score: Optional[float] = None
+    status: Status = Status.OPEN
+    created_at: Optional[datetime] = None
+    tags: List[str] = Field(default_factory=list)
+
+
+projector = DocumentProjector(Item)
+
+
+def from_columnar(table):
+    """Rows back from the columnar layout (dictionary codes resolved)"""
+    dictionaries = table["dictionaries"]
+    return [
+        {
+            column: dictionaries[column][value] if column in dictionaries and value is not None else value
+            for column, value in zip(table["columns"], row)
+        }
+        for row in table["rows"]
+    ]
+
+
+def test_projection_fills_defaults_and_drops_unknown_fields():
+    oid = ObjectId()
+    doc = projector.project({"_id": oid, "name": "A", "password_hash": "x"})
+    assert doc == {"_id": oid, "name": "A", "count": 0, "score": None, "status": Status.OPEN,
+                   "created_at": None, "tags": []}
+    assert dumps(doc) == Item(_id=str(oid), name="A").model_dump_json(by_alias=True).encode()
+
+
+def test_off_type_values_are_coerced_like_the_model():
+    doc = projector.project({"_id": "1", "name": "A", "count": 3.0, "score": 2, "status": "closed"})
+    assert doc["count"] == 3 and type(doc["count"]) is int
+    assert doc["score"] == 2.0
+    assert doc["status"] == "closed"
+
+
+@pytest.mark.parametrize("field, value", [
+    ("count", "many"),
+    ("count", 2.5),
+    ("status", "archived"),
+    ("created_at", "yesterday"),
+    ("name", ["A"]),
+])
+def test_values_the_model_would_reject_are_rejected(field, value):
+    with pytest.raises(ValidationError):
+        projector.project({"_id": "1", "name": "A", field: value})
+
+
+def test_columnar_round_trip():
+    docs = [
+        {"_id": "1", "name": "A", "status": "open", "tags": ["x"]},
+        {"_id": "2", "name": "B", "status": "closed", "count": 4},
+        {"_id": "3", "name": "C", "status": "open", "score": 1.5},
+    ]
+    table = projector.columnar(docs, dictionary_columns=("status",))
+    assert table["columns"] == projector.keys
+    assert table["dictionaries"] == {"status": ["open", "closed"]}
+    assert from_columnar(table) == projector.project_many(docs)
+
+
+def test_columnar_dictionary_skips_missing_values():
+    table = to_columnar([{"a": None, "b": 1}, {"a": "x", "b": 2}], ["a", "b"], ["a"])
+    assert table["rows"] == [[None, 1], [0, 2]]
+    assert from_columnar(table) == [{"a": None, "b": 1}, {"a": "x", "b": 2}]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from turfs import cluster_points, household_points, turf_bounds
+
+
+def clustered_points(n, centres, seed):
+    """Households bunched around a few uneven hot spots, in metres"""
+    rng = np.random.default_rng(seed)
+    hubs = rng.random((centres, 2)) * 5000
+    weights = rng.random(centres) ** 3
+    picks = rng.choice(centres, n, p=weights / weights.sum())
+    return hubs[picks] + rng.normal(scale=150, size=(n, 2))
+
+
+@pytest.mark.parametrize("n, k, seed", [(500, 4, 0), (3000, 12, 1), (30000, 25, 2)])
+def test_turf_sizes_stay_within_bounds(n, k, seed):
+    labels, centres = cluster_points(clustered_points(n, 8, seed), k)
+    sizes = np.bincount(labels, minlength=k)
+    floor, cap = turf_bounds(n, k)
+    assert len(centres) == k
+    assert sizes.sum() == n
+    assert sizes.min() >= floor
+    assert sizes.max() <= cap
+
+
+def test_turfs_are_compact():
+    # Two far apart towns and two turfs: each turf is one town
+    rng = np.random.default_rng(0)
+    towns = np.vstack([rng.normal(0, 100, (400, 2)), rng.normal(20000, 100, (400, 2))])
+    labels, _ = cluster_points(towns, 2)
+    assert len(set(labels[:400])) == 1
+    assert len(set(labels[400:])) == 1
+
+
+def test_household_points_average_members():
+    voters = [
+        {"_id": ObjectId(), "family_id": "f1", "location": {"coordinates": [73.0, 18.0]}},
+        {"_id": ObjectId(), "family_id": "f1", "location": {"coordinates": [73.2, 18.2]}},
+        {"_id": ObjectId(), "family_id": "f2"},
+        {"_id": ObjectId(), "location": {"coordinates": [74.0, 19.0]}},
+    ]
+    household, points, has_point = household_points(voters)
+    assert household[0] == household[1] != household[2]
+    assert len(points) == 3
+    assert has_point.sum() == 2
+    assert np.allclose(points[household[0]], [73.1, 18.1])
+    assert not has_point[household[2]]
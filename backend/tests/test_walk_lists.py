@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from geo import to_metres
+from walk_lists import compute_walk_list, order_route
+
+
+def path_length(points, route):
+    xy = to_metres(points[route])
+    return float(np.sqrt((np.diff(xy, axis=0) ** 2).sum(axis=1)).sum())
+
+
+def nearest_neighbour(points, start):
+    xy = to_metres(points)
+    route, left = [start], set(range(len(points))) - {start}
+    while left:
+        last = xy[route[-1]]
+        route.append(min(left, key=lambda i: ((xy[i] - last) ** 2).sum()))
+        left.discard(route[-1])
+    return np.array(route)
+
+
+def city_points(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([73.85 + rng.random(n) * 0.02, 18.52 + rng.random(n) * 0.02])
+
+
+@pytest.mark.parametrize("n, seed", [(3, 0), (10, 1), (60, 2), (200, 3)])
+def test_route_visits_every_stop_once(n, seed):
+    route = order_route(city_points(n, seed))
+    assert sorted(route.tolist()) == list(range(n))
+
+
+@pytest.mark.parametrize("n, seed", [(10, 1), (60, 2), (200, 3)])
+def test_route_is_no_longer_than_nearest_neighbour(n, seed):
+    points = city_points(n, seed)
+    route = order_route(points)
+    xy = to_metres(points)
+    start = int(np.argmax(((xy - xy.mean(axis=0)) ** 2).sum(axis=1)))
+    assert path_length(points, route) <= path_length(points, nearest_neighbour(points, start)) + 1e-6
+
+
+def test_large_routes_are_cut_into_strips(monkeypatch):
+    import walk_lists
+
+    points = city_points(250, 4)
+    monkeypatch.setattr(walk_lists, "WALK_LIST_MAX_ROUTED_STOPS", 60)
+    route = order_route(points)
+    assert sorted(route.tolist()) == list(range(250))
+    # Strips go west to east: every stop of a strip lies west of the next strip
+    xy = to_metres(points)
+    strips = [route[i:i + 50] for i in range(0, 250, 50)]  # 5 strips of 50
+    assert all(xy[a, 0].max() <= xy[b, 0].min() for a, b in zip(strips, strips[1:]))
+
+
+def test_walk_list_stops_are_households():
+    lng, lat = 73.85, 18.52
+    voters = [
+        {"_id": ObjectId(), "name": "A", "family_id": "f1", "booth_number": "1",
+         "location": {"type": "Point", "coordinates": [lng, lat]}},
+        {"_id": ObjectId(), "name": "B", "family_id": "f1", "booth_number": "1"},
+        {"_id": ObjectId(), "name": "C", "address": "House 10", "booth_number": "1"},
+        {"_id": ObjectId(), "name": "D", "address": "house 10 ", "booth_number": "1"},
+        {"_id": ObjectId(), "name": "E", "address": "House 9", "booth_number": "1"},
+        {"_id": ObjectId(), "name": "F", "booth_number": "2",
+         "location": {"type": "Point", "coordinates": [lng + 0.001, lat]}},
+    ]
+    walk = compute_walk_list("k1", "2026-01-01", voters)
+    assert walk["voter_count"] == 6
+    assert walk["stop_count"] == 4
+    assert walk["routed_stops"] == 2
+    assert [stop["names"] for stop in walk["stops"][2:]] == [["E"], ["C", "D"]]
+    assert 90 < walk["distance_m"] < 120
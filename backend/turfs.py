@@ -0,0 +1,259 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateMany
+from bson import ObjectId
+from datetime import datetime
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+import math
+import os
+
+import numpy as np
+
+from assignment import ASSIGN_BATCH_SIZE, ASSIGN_OPS_PER_WRITE
+from geo import geo_point, to_metres
+
+logger = logging.getLogger(__name__)
+
+# Turf cutting clusters households (family_id, or the voter alone) by
+# location into K compact turfs of nearly equal household counts. Each
+# k-means step labels households in bidding rounds against an upper cap
+# (a turf takes the bidders that would lose most by going elsewhere), then
+# tops up turfs below the lower bound with the border households of their
+# neighbours that are cheapest to move. Turf ids are written to voters so a
+# filter on turf_id (or auto-assignment, which keeps turfs whole) can use them.
+TURF_MAX_ITER = int(os.environ.get("TURF_MAX_ITER", "30"))
+# Allowed households per turf above and below the exact share
+TURF_SLACK = float(os.environ.get("TURF_SLACK", "0.02"))
+# Centres are fitted on a sample, then refined over every household
+TURF_SAMPLE_SIZE = 20000
+TURF_REFINE_ITER = 3
+
+TURF_VOTER_FIELDS = {"_id": 1, "family_id": 1, "turf_id": 1, "location.coordinates": 1}
+
+def _distances(xy: np.ndarray, centres: np.ndarray) -> np.ndarray:
+    """(n, k) euclidean distances, in float32 to keep 200k x K cheap"""
+    dx = xy[:, 0, None] - centres[None, :, 0]
+    dy = xy[:, 1, None] - centres[None, :, 1]
+    return np.sqrt(dx * dx + dy * dy)
+
+def _seed_centres(sample: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding"""
+    centres = [sample[rng.integers(len(sample))]]
+    nearest = ((sample - centres[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = nearest.sum()
+        pick = rng.choice(len(sample), p=nearest / total) if total > 0 else rng.integers(len(sample))
+        centres.append(sample[pick])
+        nearest = np.minimum(nearest, ((sample - sample[pick]) ** 2).sum(axis=1))
+    return np.array(centres, dtype=sample.dtype)
+
+def _balanced_labels(dist: np.ndarray, cap: int) -> np.ndarray:
+    """
+    Label each point with its nearest turf that has room, at most cap points
+    per turf. Done in rounds: every unplaced point bids for its nearest open
+    turf and each turf takes the bidders that would lose most by going to
+    their next choice; the rest bid again once full turfs are closed.
+    """
+    n, k = dist.shape
+    labels = np.full(n, -1)
+    counts = np.zeros(k, dtype=np.int64)
+    pending = np.arange(n)
+    while len(pending):
+        open_turfs = np.flatnonzero(counts < cap)
+        options = dist if len(pending) == n else dist[np.ix_(pending, open_turfs)]
+        if len(open_turfs) > 1:
+            two = np.partition(options, 1, axis=1)
+            regret = two[:, 1] - two[:, 0]
+        else:
+            regret = np.zeros(len(pending), dtype=dist.dtype)
+        choice = open_turfs[options.argmin(axis=1)]
+
+        # Bidders ordered by turf, then by regret (largest first)
+        order = np.lexsort((-regret, choice))
+        by_turf = choice[order]
+        first = np.searchsorted(by_turf, by_turf)
+        rank = np.arange(len(order)) - first
+        won = order[rank < (cap - counts)[by_turf]]
+
+        labels[pending[won]] = choice[won]
+        counts += np.bincount(choice[won], minlength=k)
+        lost = np.ones(len(pending), dtype=bool)
+        lost[won] = False
+        pending = pending[lost]
+    return labels
+
+def _fill_short(dist: np.ndarray, labels: np.ndarray, floor: int) -> np.ndarray:
+    """
+    Bring every turf up to floor points by moving in the points whose
+    distance grows least, taken only from turfs that stay at or above floor.
+    """
+    k = dist.shape[1]
+    labels = labels.copy()
+    counts = np.bincount(labels, minlength=k)
+    for _ in range(k):
+        short = np.flatnonzero(counts < floor)
+        if not len(short):
+            break
+        turf = short[np.argmin(counts[short])]
+        candidates = np.flatnonzero((counts[labels] > floor) & (labels != turf))
+        cost = dist[candidates, turf] - dist[candidates, labels[candidates]]
+        candidates = candidates[np.argsort(cost, kind="stable")]
+
+        # Each donor gives at most its surplus, cheapest points first
+        donors = labels[candidates]
+        by_donor = np.argsort(donors, kind="stable")
+        first = np.searchsorted(donors[by_donor], donors[by_donor])
+        rank = np.empty(len(candidates), dtype=np.int64)
+        rank[by_donor] = np.arange(len(candidates)) - first
+        movable = candidates[rank < (counts - floor)[donors]]
+        moved = movable[:floor - counts[turf]]
+
+        counts -= np.bincount(labels[moved], minlength=k)
+        labels[moved] = turf
+        counts[turf] += len(moved)
+    return labels
+
+def _kmeans(
+    xy: np.ndarray,
+    centres: np.ndarray,
+    bounds: Tuple[int, int],
+    iterations: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    k = len(centres)
+    floor, cap = bounds
+    labels = np.full(len(xy), -1)
+    for _ in range(iterations):
+        dist = _distances(xy, centres)
+        new_labels = _fill_short(dist, _balanced_labels(dist, cap), floor)
+        changed = int((new_labels != labels).sum())
+        labels = new_labels
+
+        counts = np.bincount(labels, minlength=k)
+        filled = counts > 0
+        sums = np.stack([np.bincount(labels, weights=xy[:, d], minlength=k) for d in (0, 1)], axis=1)
+        centres[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+        if changed <= len(xy) // 500:
+            break
+    return labels, centres
+
+def turf_bounds(n: int, k: int) -> Tuple[int, int]:
+    """Smallest and largest allowed size of each of k clusters over n points"""
+    return math.floor(n / k * (1 - TURF_SLACK)), math.ceil(n / k * (1 + TURF_SLACK))
+
+def cluster_points(xy: np.ndarray, k: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Capacity-constrained k-means over (n, 2) metre coordinates. Returns a
+    label per point and the (k, 2) centres; every cluster size is within
+    turf_bounds(n, k). Centres are first settled on a sample, then refined
+    for a few rounds over all points.
+    """
+    n = len(xy)
+    xy = (xy - xy.mean(axis=0)).astype(np.float32)
+    rng = np.random.default_rng(seed)
+    sample = xy[rng.choice(n, min(n, TURF_SAMPLE_SIZE), replace=False)]
+    centres = _seed_centres(sample, k, rng)
+    if len(sample) < n:
+        _, centres = _kmeans(sample, centres, turf_bounds(len(sample), k), TURF_MAX_ITER)
+    return _kmeans(xy, centres, turf_bounds(n, k), TURF_REFINE_ITER)
+
+def household_points(voters: List[dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group voters into households and place each household at the mean of
+    its members' [lng, lat]. Returns the household index of every voter, the
+    household points and a mask of households with a known location.
+    """
+    keys = [v.get("family_id") or f"v:{v['_id']}" for v in voters]
+    _, household, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+    coords = np.array(
+        [v["location"]["coordinates"] if v.get("location") else (np.nan, np.nan) for v in voters],
+        dtype=float
+    ).reshape(-1, 2)
+    located = ~np.isnan(coords[:, 0])
+    n = len(sizes)
+    members = np.bincount(household[located], minlength=n)
+    points = np.stack([
+        np.bincount(household[located], weights=coords[located, d], minlength=n) for d in (0, 1)
+    ], axis=1)
+    has_point = members > 0
+    points[has_point] /= members[has_point, None]
+    return household, points, has_point
+
+async def cut_turfs(
+    db: AsyncIOMotorDatabase,
+    query: dict,
+    k: int,
+    admin_id: Optional[str],
+    created_by: str,
+    name_prefix: str = "Turf",
+    dry_run: bool = False
+) -> dict:
+    """
+    Cut the voters matching query into k turfs, store the turfs and write
+    turf_id onto every voter of a located household. Voters whose household
+    has no location lose any previous turf_id.
+    """
+    voters = await db.voters.find(query, TURF_VOTER_FIELDS).to_list(length=None)
+    household, points, has_point = household_points(voters)
+    households = int(has_point.sum())
+    if households < k:
+        raise ValueError(f"{households} located households cannot be cut into {k} turfs")
+
+    # Clustering is CPU bound; keep it off the event loop
+    labels, _ = await asyncio.to_thread(cluster_points, to_metres(points[has_point]), k)
+    household_turf = np.full(len(points), -1)
+    household_turf[has_point] = labels
+    voter_turf = household_turf[household]
+
+    now = datetime.utcnow()
+    cut_id = str(ObjectId())
+    turfs, turf_labels = [], []
+    for i in range(k):
+        turf_points = points[has_point][labels == i]
+        if not len(turf_points):
+            continue
+        centre = turf_points.mean(axis=0)
+        xy = to_metres(np.vstack([centre, turf_points]))
+        turf_labels.append(i)
+        turfs.append({
+            "_id": ObjectId(),
+            "name": f"{name_prefix} {len(turfs) + 1}",
+            "cut_id": cut_id,
+            "admin_id": admin_id,
+            "household_count": len(turf_points),
+            "voter_count": int((voter_turf == i).sum()),
+            "centroid": geo_point(centre[1], centre[0]),
+            "radius_m": round(float(np.sqrt(((xy[1:] - xy[0]) ** 2).sum(axis=1)).max()), 1),
+            "created_by": created_by,
+            "created_at": now,
+        })
+    summary = {
+        "cut_id": cut_id,
+        "voters": len(voters),
+        "households": households,
+        "unlocated_voters": int((voter_turf < 0).sum()),
+        "turfs": turfs,
+    }
+    if dry_run:
+        return summary
+
+    await db.turfs.insert_many(turfs)
+    ids = np.array([v["_id"] for v in voters], dtype=object)
+    groups = [(i, {"$set": {"turf_id": str(turf["_id"])}}) for i, turf in zip(turf_labels, turfs)]
+    groups.append((-1, {"$unset": {"turf_id": ""}}))
+    ops = []
+    for label, update in groups:
+        members = ids[voter_turf == label].tolist()
+        for start in range(0, len(members), ASSIGN_BATCH_SIZE):
+            ops.append(UpdateMany({"_id": {"$in": members[start:start + ASSIGN_BATCH_SIZE]}}, update))
+    for start in range(0, len(ops), ASSIGN_OPS_PER_WRITE):
+        await db.voters.bulk_write(ops[start:start + ASSIGN_OPS_PER_WRITE], ordered=False)
+
+    # Turfs from earlier cuts that no longer hold any voter
+    previous = {v["turf_id"] for v in voters if v.get("turf_id")}
+    for turf_id in previous:
+        if not await db.voters.find_one({"turf_id": turf_id}, {"_id": 1}):
+            await db.turfs.delete_one({"_id": ObjectId(turf_id)})
+
+    logger.info(f"Cut {households} households into {k} turfs ({cut_id})")
+    return summary
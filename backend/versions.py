@@ -0,0 +1,68 @@
+from fastapi import Request, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import UpdateOne
+from typing import Dict, Iterable, List, Optional
+import hashlib
+
+# Per-scope version counters backing ETags. A scope is a short string such as
+# "survey_templates" or "tasks:<user_id>"; every write that changes what a
+# scope's readers would see bumps its counter.
+
+async def bump_version(db: AsyncIOMotorDatabase, *scopes: Optional[str]):
+    """Increment the version counter of each scope"""
+    ops = [
+        UpdateOne(
+            {"_id": scope},
+            {"$inc": {"v": 1}, "$setOnInsert": {"epoch": str(ObjectId())}},
+            upsert=True
+        )
+        for scope in set(scopes) if scope
+    ]
+    if ops:
+        await db.versions.bulk_write(ops, ordered=False)
+
+async def get_versions(db: AsyncIOMotorDatabase, scopes: Iterable[str]) -> Dict[str, str]:
+    """Return the current version token of each scope"""
+    scopes = list(scopes)
+    docs = await db.versions.find({"_id": {"$in": scopes}}).to_list(len(scopes))
+    found = {d["_id"]: f"{d.get('epoch', '')}.{d.get('v', 0)}" for d in docs}
+    return {scope: found.get(scope, "0") for scope in scopes}
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from arbitrary identifying parts"""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or etag in candidates or bare in candidates
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Attach the ETag to the outgoing response and return a 304 response when
+    the client already holds this version, otherwise None.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    if _matches(request, etag):
+        return Response(
+            status_code=304,
+            headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+        )
+    return None
+
+async def check_versions(
+    request: Request,
+    response: Response,
+    db: AsyncIOMotorDatabase,
+    scopes: List[str],
+    *extra
+) -> Optional[Response]:
+    """Conditional GET against scope version counters (one small query)"""
+    versions = await get_versions(db, scopes)
+    return not_modified(request, response, make_etag(sorted(versions.items()), *extra))
@@ -0,0 +1,265 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+
+import numpy as np
+
+from activity import day_key
+from geo import to_metres
+
+logger = logging.getLogger(__name__)
+
+# Daily walk lists: each karyakarta's unvisited voters grouped into stops
+# (one per household) and put in walking order. Stops with GPS are routed
+# with nearest neighbour + 2-opt; the rest follow in booth/address order.
+WALK_LIST_HOUR = int(os.environ.get("WALK_LIST_HOUR", "1"))  # UTC
+WALK_LIST_WORKERS = int(os.environ.get("WALK_LIST_WORKERS", str(os.cpu_count() or 2)))
+# Routing keeps an n x n distance matrix; larger lists are routed in strips
+# of at most this many stops (1500 stops is an 18 MB matrix)
+WALK_LIST_MAX_ROUTED_STOPS = int(os.environ.get("WALK_LIST_MAX_ROUTED_STOPS", "1500"))
+TWO_OPT_MAX_PASSES = 20
+
+WALK_VOTER_FIELDS = {
+    "_id": 1, "name": 1, "family_id": 1, "address": 1, "booth_number": 1, "location": 1,
+}
+
+_number = re.compile(r"(\d+)")
+
+def _address_key(address: str) -> list:
+    """Natural sort key so "House 9" comes before "House 10" """
+    return [int(part) if part.isdigit() else part for part in _number.split(address.lower())]
+
+def _group_stops(voters: List[dict]) -> List[dict]:
+    """One stop per household (family_id, else address, else the voter alone)"""
+    stops: Dict[str, dict] = {}
+    for voter in voters:
+        address = (voter.get("address") or "").strip()
+        key = voter.get("family_id") or (f"{voter.get('booth_number')}|{address.lower()}" if address else str(voter["_id"]))
+        stop = stops.get(key)
+        if stop is None:
+            stop = stops[key] = {
+                "household": key,
+                "voter_ids": [],
+                "names": [],
+                "address": address or None,
+                "booth_number": voter.get("booth_number"),
+                "point": None,
+            }
+        stop["voter_ids"].append(str(voter["_id"]))
+        stop["names"].append(voter.get("name"))
+        location = voter.get("location")
+        if stop["point"] is None and location:
+            stop["point"] = location["coordinates"]
+    return list(stops.values())
+
+def _route_length(dist: np.ndarray, route: np.ndarray) -> float:
+    return float(dist[route[:-1], route[1:]].sum())
+
+def order_route(points: np.ndarray) -> np.ndarray:
+    """
+    Open walking path through [lng, lat] points: nearest neighbour from the
+    stop furthest from the centre, improved with 2-opt. Returns point indexes.
+    More than WALK_LIST_MAX_ROUTED_STOPS points are cut into west-to-east
+    strips that are routed one by one and joined end to end.
+    """
+    n = len(points)
+    if n <= WALK_LIST_MAX_ROUTED_STOPS:
+        return _route_strip(to_metres(points))
+    xy = to_metres(points)
+    strips = np.array_split(np.argsort(xy[:, 0], kind="stable"), -(-n // WALK_LIST_MAX_ROUTED_STOPS))
+    route = []
+    for strip in strips:
+        part = strip[_route_strip(xy[strip])]
+        # Walk the strip from whichever end is closer to where the last one ended
+        if route and ((xy[part[-1]] - xy[route[-1]]) ** 2).sum() < ((xy[part[0]] - xy[route[-1]]) ** 2).sum():
+            part = part[::-1]
+        route.extend(part.tolist())
+    return np.array(route)
+
+def _route_strip(xy: np.ndarray) -> np.ndarray:
+    """order_route over points already projected to metres"""
+    n = len(xy)
+    if n < 3:
+        return np.arange(n)
+    dist = np.sqrt(((xy[:, None, :] - xy[None, :, :]) ** 2).sum(axis=2))
+
+    # Nearest neighbour, vectorized over the unvisited stops
+    start = int(np.argmax(((xy - xy.mean(axis=0)) ** 2).sum(axis=1)))
+    route = [start]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[start] = False
+    for _ in range(n - 1):
+        candidates = np.where(unvisited, dist[route[-1]], np.inf)
+        nxt = int(np.argmin(candidates))
+        route.append(nxt)
+        unvisited[nxt] = False
+    route = np.array(route)
+
+    # 2-opt on the open path: reverse route[i:j+1] when it shortens the walk
+    for _ in range(TWO_OPT_MAX_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:]
+            d = np.append(route[i + 2:], -1)
+            after = dist[a, c] + np.where(d >= 0, dist[b, d], 0.0)
+            before = dist[a, b] + np.where(d >= 0, dist[c, d], 0.0)
+            gain = before - after
+            j = int(np.argmax(gain))
+            if gain[j] > 1e-6:
+                route[i:i + j + 2] = route[i:i + j + 2][::-1]
+                improved = True
+        if not improved:
+            break
+    return route
+
+def compute_walk_list(karyakarta_id: str, day: str, voters: List[dict]) -> dict:
+    """Walk list document for one karyakarta (CPU-bound; run off the event loop)"""
+    stops = _group_stops(voters)
+    located = [s for s in stops if s["point"] is not None]
+    unlocated = [s for s in stops if s["point"] is None]
+
+    distance = 0.0
+    if located:
+        points = np.array([s["point"] for s in located], dtype=float)
+        route = order_route(points)
+        located = [located[i] for i in route]
+        if len(route) > 1:
+            xy = to_metres(points[route])
+            distance = float(np.sqrt((np.diff(xy, axis=0) ** 2).sum(axis=1)).sum())
+    unlocated.sort(key=lambda s: (str(s["booth_number"] or ""), _address_key(s["address"] or "")))
+
+    return {
+        "_id": f"{karyakarta_id}:{day}",
+        "karyakarta_id": karyakarta_id,
+        "day": day,
+        "generated_at": datetime.utcnow(),
+        "stop_count": len(stops),
+        "voter_count": len(voters),
+        "routed_stops": len(located),
+        "distance_m": round(distance, 1),
+        "stops": located + unlocated,
+    }
+
+async def _karyakarta_voters(db: AsyncIOMotorDatabase, karyakarta_id: str) -> List[dict]:
+    voters = await db.voters.find(
+        {"assigned_to": karyakarta_id, "visited_status": {"$ne": True}, "removed_from_roll": {"$ne": True}},
+        WALK_VOTER_FIELDS
+    ).to_list(length=None)
+    for voter in voters:
+        voter["_id"] = str(voter["_id"])
+    return voters
+
+async def build_walk_list(db: AsyncIOMotorDatabase, karyakarta_id: str, day: Optional[str] = None) -> dict:
+    """
+    Build and store one karyakarta's walk list on a thread. Used on demand,
+    where starting a process pool for a single list would cost more than routing it.
+    """
+    day = day or day_key()
+    voters = await _karyakarta_voters(db, karyakarta_id)
+    walk_list = await asyncio.to_thread(compute_walk_list, karyakarta_id, day, voters)
+    await db.walk_lists.replace_one({"_id": walk_list["_id"]}, walk_list, upsert=True)
+    return walk_list
+
+async def build_walk_lists(
+    db: AsyncIOMotorDatabase,
+    karyakarta_ids: Optional[List[str]] = None,
+    day: Optional[str] = None
+) -> int:
+    """
+    Build walk lists for the given karyakartas (default: all active ones),
+    routing them in parallel in a process pool. Returns lists written.
+    """
+    day = day or day_key()
+    if karyakarta_ids is None:
+        users = await db.users.find(
+            {"role": "karyakarta", "active_status": {"$ne": False}}, {"_id": 1}
+        ).to_list(length=None)
+        karyakarta_ids = [str(u["_id"]) for u in users]
+    if not karyakarta_ids:
+        return 0
+
+    loop = asyncio.get_running_loop()
+    # spawn: the server process runs driver threads, which fork does not mix well with
+    with ProcessPoolExecutor(
+        max_workers=min(WALK_LIST_WORKERS, len(karyakarta_ids)),
+        mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = []
+        for karyakarta_id in karyakarta_ids:
+            voters = await _karyakarta_voters(db, karyakarta_id)
+            futures.append(loop.run_in_executor(pool, compute_walk_list, karyakarta_id, day, voters))
+        walk_lists = await asyncio.gather(*futures)
+
+    await db.walk_lists.bulk_write(
+        [ReplaceOne({"_id": wl["_id"]}, wl, upsert=True) for wl in walk_lists],
+        ordered=False
+    )
+    logger.info(f"Built {len(walk_lists)} walk lists for {day}")
+    return len(walk_lists)
+
+class WalkListScheduler:
+    """Builds everyone's walk lists once a day at WALK_LIST_HOUR (UTC)"""
+
+    def __init__(self):
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            now = datetime.utcnow()
+            next_run = now.replace(hour=WALK_LIST_HOUR, minute=0, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            await asyncio.sleep((next_run - now).total_seconds())
+            day = day_key()
+            lock_id = f"walk_lists:{day}"
+            if not await self._acquire(lock_id):
+                continue
+            outcome = {"status": "failed", "error": "interrupted"}
+            try:
+                count = await build_walk_lists(self.db, day=day)
+                outcome = {"status": "done", "error": None, "walk_lists": count}
+            except Exception as e:
+                outcome["error"] = str(e)
+                logger.error(f"Nightly walk list build failed: {str(e)}")
+            finally:
+                # A failed build releases the lock so another process can retry it
+                await asyncio.shield(self.db.job_locks.update_one(
+                    {"_id": lock_id}, {"$set": {**outcome, "finished_at": datetime.utcnow()}}
+                ))
+
+    async def _acquire(self, lock_id: str) -> bool:
+        """Take the day's build lock: unclaimed, or left behind by a failed build"""
+        claim = {"status": "running", "error": None, "created_at": datetime.utcnow()}
+        try:
+            # Only one server process builds each day's lists
+            await self.db.job_locks.insert_one({"_id": lock_id, **claim})
+            return True
+        except DuplicateKeyError:
+            result = await self.db.job_locks.update_one({"_id": lock_id, "status": "failed"}, {"$set": claim})
+            return bool(result.modified_count)
+
+walk_list_scheduler = WalkListScheduler()
@@ -56,8 +56,10 @@ export default function FamiliesScreen() {
         ) : (
           families.map((family: any) => (
             <View key={family._id} style={styles.familyCard}>
-              <Text style={styles.familyName}>{family.family_name}</Text>
-              <Text style={styles.familyMembers}>Members: {family.members.length}</Text>
+              <Text style={styles.familyName}>{family.family_head_name}</Text>
+              <Text style={styles.familyMembers}>
+                Members: {family.total_members} · Visited: {family.visited_members} · Voted: {family.voted_members}
+              </Text>
               <TouchableOpacity
                 style={styles.viewButton}
                 onPress={() => router.push({ pathname: '/admin/family-detail', params: { family_id: family._id } })}
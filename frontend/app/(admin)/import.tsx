@@ -12,6 +12,7 @@ export default function ImportScreen() {
   const [columns, setColumns] = useState<string[]>([]);
   const [sessionId, setSessionId] = useState<string | null>(null);
   const [mapping, setMapping] = useState<any>({
+    voter_id: '',
     name_english: '',
     name_marathi: '',
     age: '',
@@ -23,6 +24,8 @@ export default function ImportScreen() {
     phone: '',
     caste: '',
     address: '',
+    family_id: '',
+    relation_to_head: '',
   });
   const [pasteCsv, setPasteCsv] = useState('');
   const fileInputRef = useRef<HTMLInputElement | null>(null);
@@ -55,7 +58,16 @@ export default function ImportScreen() {
   const onMapAndImport = async () => {
     if (!sessionId) return alert('No import session');
     try {
-      const res = await apiService.mapColumns(sessionId, mapping, user?.id || user?._id);
+      let res = await apiService.mapColumns(sessionId, mapping, user?.id || user?._id);
+      // The import runs in the background; poll until it finishes
+      while (res.status === 'queued' || res.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        res = await apiService.getImportProgress(sessionId);
+      }
+      if (res.status !== 'completed') {
+        alert(`Import ${res.status}: ${res.imported_count} imported, ${res.error_count} errors${res.error ? ' (' + res.error + ')' : ''}`);
+        return;
+      }
       alert(`Import completed: ${res.imported_count} imported, ${res.error_count} errors`);
       router.replace('/admin/dashboard');
     } catch (e: any) {
@@ -84,6 +96,7 @@ export default function ImportScreen() {
           <View style={styles.mapping}>
             <Text style={styles.subtitle}>Column Mapping</Text>
             {[
+              { key: 'voter_id', label: 'Voter ID (EPIC)' },
               { key: 'name_english', label: 'Name (English)' },
               { key: 'name_marathi', label: 'Name (Marathi)' },
               { key: 'age', label: 'Age' },
@@ -95,6 +108,8 @@ export default function ImportScreen() {
               { key: 'phone', label: 'Phone' },
               { key: 'caste', label: 'Caste' },
               { key: 'address', label: 'Address' },
+              { key: 'family_id', label: 'Family / House No.' },
+              { key: 'relation_to_head', label: 'Relation to Head' },
             ].map((m) => (
               <View key={m.key} style={styles.mapRow}>
                 <Text style={styles.mapLabel}>{m.label}</Text>
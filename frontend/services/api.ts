@@ -10,6 +10,23 @@ const runtimeExtra = (Constants.expoConfig && (Constants.expoConfig.extra as any
 const BACKEND_HOST = runtimeExtra.backendUrl || process.env.EXPO_PUBLIC_BACKEND_URL || 'http://10.0.2.2:8004';
 const API_URL = `${BACKEND_HOST.replace(/\/$/, '')}/api`;
 
+// Decode the compact `layout=columnar` list format ({columns, rows, dictionaries})
+// back into plain objects. Dictionary-coded columns hold indexes into dictionaries[col].
+export function decodeColumnar(table: any): any[] {
+  if (!table || !Array.isArray(table.columns)) return table;
+  const { columns, rows, dictionaries = {} } = table;
+  return rows.map((row: any[]) => {
+    const obj: any = {};
+    for (let i = 0; i < columns.length; i++) {
+      const col = columns[i];
+      const dict = dictionaries[col];
+      const value = row[i];
+      obj[col] = dict && value !== null && value !== undefined ? dict[value] : value;
+    }
+    return obj;
+  });
+}
+
 // Debug: print resolved API URL at runtime to help diagnose emulator network issues
 try {
   // eslint-disable-next-line no-console
@@ -66,6 +83,20 @@ class ApiService {
     return response.data;
   }
 
+  async registerUsersBulk(users: any[]) {
+    const response = await this.api.post('/auth/register/bulk', { users });
+    return response.data;
+  }
+
+  async registerUsersBulkCsv(formData: FormData) {
+    const response = await this.api.post('/auth/register/bulk-csv', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  }
+
   async getCurrentUser() {
     const response = await this.api.get('/auth/me');
     return response.data;
@@ -86,6 +117,9 @@ class ApiService {
   // Voter APIs
   async getVoters(params: any = {}) {
     const response = await this.api.get('/voters', { params });
+    if (params.layout === 'columnar') {
+      return { ...response.data, voters: decodeColumnar(response.data.voters) };
+    }
     return response.data;
   }
 
@@ -128,6 +162,21 @@ class ApiService {
     return response.data;
   }
 
+  async getNearbyVoters(lat: number, lng: number, radius: number = 500, params: any = {}) {
+    const response = await this.api.get('/voters/nearby', { params: { lat, lng, radius, ...params } });
+    return response.data;
+  }
+
+  async autoAssignVoters(filter: any, karyakartaIds?: string[], dryRun: boolean = false) {
+    const response = await this.api.post('/voters/assign', {
+      mode: 'auto',
+      filter,
+      karyakarta_ids: karyakartaIds,
+      dry_run: dryRun,
+    });
+    return response.data;
+  }
+
   async bulkUpdateVoters(voterIds: string[], updates: any) {
     const response = await this.api.post('/voters/bulk-update', {
       voter_ids: voterIds,
@@ -136,6 +185,43 @@ class ApiService {
     return response.data;
   }
 
+  async assignVotersByFilter(filter: any, karyakartaId: string) {
+    const response = await this.api.post('/voters/assign', {
+      filter,
+      karyakarta_id: karyakartaId,
+    });
+    return response.data;
+  }
+
+  async bulkUpdateVotersByFilter(filter: any, updates: any) {
+    const response = await this.api.post('/voters/bulk-update', {
+      filter,
+      updates,
+    });
+    return response.data;
+  }
+
+  async getBulkJob(jobId: string) {
+    const response = await this.api.get(`/voters/bulk-jobs/${jobId}`);
+    return response.data;
+  }
+
+  async cutTurfs(filter: any, turfs: number, dryRun: boolean = false) {
+    const response = await this.api.post('/voters/turfs/cut', { filter, turfs, dry_run: dryRun });
+    return response.data;
+  }
+
+  async getTurfs(cutId?: string) {
+    const response = await this.api.get('/voters/turfs', { params: cutId ? { cut_id: cutId } : {} });
+    return response.data;
+  }
+
+  // Walk list endpoints
+  async getMyWalkList(day?: string) {
+    const response = await this.api.get('/walk-lists/me', { params: day ? { day } : {} });
+    return response.data;
+  }
+
   async exportVoters(filters: any) {
     const response = await this.api.get('/voters/export', { params: filters, responseType: 'blob' as any });
     return response.data;
@@ -162,6 +248,16 @@ class ApiService {
     return response.data;
   }
 
+  async getImportProgress(sessionId: string) {
+    const response = await this.api.get(`/import/sessions/${sessionId}/progress`);
+    return response.data;
+  }
+
+  async cancelImport(sessionId: string) {
+    const response = await this.api.post(`/import/sessions/${sessionId}/cancel`);
+    return response.data;
+  }
+
   // Survey APIs
 
   async getSurveyTemplates() {
@@ -205,6 +301,11 @@ class ApiService {
     return response.data;
   }
 
+  async createTasksBulk(bulkData: any) {
+    const response = await this.api.post('/tasks/bulk', bulkData);
+    return response.data;
+  }
+
   async getMyTasks() {
     const response = await this.api.get('/tasks/assigned-to-me');
     return response.data;
@@ -282,6 +383,26 @@ class ApiService {
     return response.data;
   }
 
+  async updateInfluencer(influencerId: string, influencerData: any) {
+    const response = await this.api.put(`/influencers/${influencerId}`, influencerData);
+    return response.data;
+  }
+
+  async deleteInfluencer(influencerId: string) {
+    const response = await this.api.delete(`/influencers/${influencerId}`);
+    return response.data;
+  }
+
+  async getTopInfluencers(params: any = {}) {
+    const response = await this.api.get('/influencers/top', { params });
+    return response.data;
+  }
+
+  async getInfluencerReach(influencerId: string, hops: number = 2) {
+    const response = await this.api.get(`/influencers/${influencerId}/reach`, { params: { hops } });
+    return response.data;
+  }
+
   // Issue APIs
   async getIssues(params: any = {}) {
     const response = await this.api.get('/issues', { params });
@@ -297,6 +418,17 @@ class ApiService {
     const response = await this.api.put(`/issues/${issueId}/resolve`);
     return response.data;
   }
+
+  // Issue queue page plus the cursor for the next one (null on the last page)
+  async getIssueQueue(params: any = {}) {
+    const response = await this.api.get('/issues', { params });
+    return { issues: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+  }
+
+  async getIssueHotspots(params: any = {}) {
+    const response = await this.api.get('/issues/hotspots', { params });
+    return response.data;
+  }
 }
 
 export default new ApiService();